@@ -3,11 +3,11 @@ Analytics Agent — generates a personalized AI weekly study report
 based on real tracked data: sessions, quiz scores, deadlines, topics.
 """
 
-import os
 import json
-from langchain_mistralai import ChatMistralAI
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from tools.llm import get_llm as get_shared_llm
+
 
 REPORT_PROMPT = """You are an expert academic coach and learning analyst.
 You have access to a student's real study data for the past 30 days.
@@ -40,12 +40,8 @@ Be specific, data-driven, and genuinely helpful. Reference actual numbers from t
 Avoid generic advice. Every recommendation must be tied to the actual student data provided."""
 
 
-def get_llm():
-    return ChatMistralAI(
-        model="mistral-large-latest",
-        mistral_api_key=os.getenv("MISTRAL_API_KEY"),
-        temperature=0.4,
-    )
+def get_llm(task: str = None):
+    return get_shared_llm("analytics_agent", temperature=0.4, task=task)
 
 
 def generate_weekly_report(analytics_data: dict) -> str:
@@ -116,7 +112,7 @@ Deadlines:
 
 def get_quick_insight(analytics_data: dict) -> str:
     """Generate a short 2-sentence AI insight for the dashboard header."""
-    llm = get_llm()
+    llm = get_llm("quick_insight")
 
     streak = analytics_data.get("streak", {})
     quiz_stats = analytics_data.get("quiz_stats", {})
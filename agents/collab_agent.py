@@ -3,19 +3,14 @@ Collab Agent — AI agent for multi-student study rooms.
 Generates group quizzes, shared summaries, and answers from merged content.
 """
 
-import os
-import json
-import re
-from langchain_mistralai import ChatMistralAI
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from tools.llm import get_llm as get_shared_llm
+from tools import structured, context_budget
 
-def get_llm():
-    return ChatMistralAI(
-        model="mistral-large-latest",
-        mistral_api_key=os.getenv("MISTRAL_API_KEY"),
-        temperature=0.3,
-    )
+
+def get_llm(task: str = None):
+    return get_shared_llm("collab_agent", temperature=0.3, task=task)
 
 
 GROUP_QUIZ_PROMPT = """You are generating a group quiz for a collaborative study session.
@@ -51,40 +46,38 @@ Format your response as structured markdown with:
 Be thorough but organized. This is for group study."""
 
 
+ROOM_QUESTION_PROMPT = """You are a collaborative AI tutor for a group study session.
+Multiple students are studying together and have uploaded their materials.
+Answer questions clearly and relate answers to the uploaded content when possible.
+Be encouraging and mention when different students' materials complement each other."""
+
+
 def generate_group_quiz(merged_content: str, member_names: list) -> dict:
     """Generate a quiz covering all uploaded materials."""
     llm = get_llm()
 
-    content = merged_content[:12000] if len(merged_content) > 12000 else merged_content
     members_str = ", ".join(member_names)
+    content = context_budget.fit("collab_agent", [
+        context_budget.part("instructions", GROUP_QUIZ_PROMPT + members_str, fixed=True),
+        context_budget.part("content", merged_content),
+    ])["content"]
 
-    response = llm.invoke([
+    quiz, _ = structured.invoke_structured(llm, [
         SystemMessage(content=GROUP_QUIZ_PROMPT),
         HumanMessage(content=f"Study room members: {members_str}\n\n{content}\n\nGenerate the group quiz.")
-    ])
-
-    raw = response.content.strip()
-    raw = re.sub(r'^```(?:json)?\s*', '', raw)
-    raw = re.sub(r'\s*```$', '', raw)
-
-    try:
-        return json.loads(raw)
-    except Exception:
-        match = re.search(r'\{.*\}', raw, re.DOTALL)
-        if match:
-            try:
-                return json.loads(match.group())
-            except Exception:
-                pass
-    return {"title": "Group Quiz", "questions": []}
+    ], "group_quiz")
+    return quiz or {"title": "Group Quiz", "questions": []}
 
 
 def generate_group_summary(merged_content: str, member_names: list) -> str:
     """Generate a unified summary of all uploaded materials."""
-    llm = get_llm()
+    llm = get_llm("summary")
 
-    content = merged_content[:12000] if len(merged_content) > 12000 else merged_content
     members_str = ", ".join(member_names)
+    content = context_budget.fit("collab_agent", [
+        context_budget.part("instructions", GROUP_SUMMARY_PROMPT + members_str, fixed=True),
+        context_budget.part("content", merged_content),
+    ], task="summary")["content"]
 
     response = llm.invoke([
         SystemMessage(content=GROUP_SUMMARY_PROMPT),
@@ -95,16 +88,16 @@ def generate_group_summary(merged_content: str, member_names: list) -> str:
 
 def answer_room_question(question: str, merged_content: str, username: str) -> str:
     """Answer a student's question using the room's merged content."""
-    llm = get_llm()
+    llm = get_llm("room_question")
 
-    content = merged_content[:10000] if len(merged_content) > 10000 else merged_content
+    content = context_budget.fit("collab_agent", [
+        context_budget.part("instructions", ROOM_QUESTION_PROMPT + username + question, fixed=True),
+        context_budget.part("content", merged_content),
+    ], task="room_question")["content"]
     context = f"\n\nRoom study materials:\n{content}" if content else ""
 
     response = llm.invoke([
-        SystemMessage(content="""You are a collaborative AI tutor for a group study session.
-Multiple students are studying together and have uploaded their materials.
-Answer questions clearly and relate answers to the uploaded content when possible.
-Be encouraging and mention when different students' materials complement each other."""),
+        SystemMessage(content=ROOM_QUESTION_PROMPT),
         HumanMessage(content=f"{username} asks: {question}{context}")
-    ])
+    ], hedge=True)
     return response.content
@@ -5,13 +5,15 @@ structured summaries, key concepts, and explanations.
 Supported inputs: PDF, PowerPoint (.pptx), URL, plain text
 """
 
-import os
-from langchain_mistralai import ChatMistralAI
+import asyncio
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from tools.llm import get_llm as get_shared_llm
+from tools import context_budget
 from tools.pdf_parser import parse_pdf
 from tools.pptx_parser import parse_pptx
-from tools.url_scraper import scrape_url
+from tools.url_scraper import scrape_url, ascrape_url
+from tools.tracing import traced
 
 
 SYSTEM_PROMPT = """You are the Course Structuring Agent — an expert academic assistant.
@@ -35,11 +37,7 @@ Be thorough but concise. Focus on what a student needs to learn and remember."""
 
 
 def get_llm():
-    return ChatMistralAI(
-        model="mistral-large-latest",
-        mistral_api_key=os.getenv("MISTRAL_API_KEY"),
-        temperature=0.2,
-    )
+    return get_shared_llm("course_agent", temperature=0.2)
 
 
 # ── Source Processors ──────────────────────────────────────────────────────────
@@ -62,6 +60,58 @@ def process_text(text: str) -> str:
 
 # ── Main Agent Function ────────────────────────────────────────────────────────
 
+@traced("extract_source")
+def extract_source(
+    source_type: str,
+    source_content: str = "",
+    file_bytes: bytes = None,
+    url: str = "",
+) -> tuple[str, str]:
+    """Return (extracted_content, source_label); the label is empty when no source was given."""
+    if source_type == "pdf" and file_bytes:
+        return process_pdf(file_bytes), "📄 PDF Document"
+    elif source_type == "pptx" and file_bytes:
+        return process_pptx(file_bytes), "📊 PowerPoint Presentation"
+    elif source_type == "url" and url:
+        return process_url(url), f"🌐 Web Page: {url}"
+    elif source_type == "text" and source_content:
+        return source_content, "📝 Plain Text"
+    return "", ""
+
+
+def build_messages(user_message: str, extracted_content: str, source_label: str) -> list:
+    """Build the LLM messages for a request, with or without source material."""
+    if not source_label:
+        # No source provided — treat as a general course question
+        return [
+            SystemMessage(content=SYSTEM_PROMPT),
+            HumanMessage(content=user_message)
+        ]
+
+    template = """Source: {source_label}
+
+--- COURSE MATERIAL ---
+{material}
+--- END OF MATERIAL ---
+
+Student request: {user_message}
+
+Please process the above course material according to the student's request."""
+
+    # Course material fills whatever the model's context window leaves over
+    packed = context_budget.fit("course_agent", [
+        context_budget.part("instructions", SYSTEM_PROMPT + template, fixed=True),
+        context_budget.part("request", source_label + user_message, fixed=True),
+        context_budget.part("material", extracted_content),
+    ])
+    prompt = template.format(source_label=source_label, material=packed["material"], user_message=user_message)
+
+    return [
+        SystemMessage(content=SYSTEM_PROMPT),
+        HumanMessage(content=prompt)
+    ]
+
+
 def run_course_agent(
     user_message: str,
     source_type: str = "text",
@@ -83,49 +133,25 @@ def run_course_agent(
         Structured course notes / summary as a string.
     """
     llm = get_llm()
+    extracted_content, source_label = extract_source(source_type, source_content, file_bytes, url)
+    response = llm.invoke(build_messages(user_message, extracted_content, source_label))
+    return response.content
 
-    # Extract content based on source type
-    extracted_content = ""
-    source_label = ""
 
-    if source_type == "pdf" and file_bytes:
-        extracted_content = process_pdf(file_bytes)
-        source_label = "📄 PDF Document"
-    elif source_type == "pptx" and file_bytes:
-        extracted_content = process_pptx(file_bytes)
-        source_label = "📊 PowerPoint Presentation"
-    elif source_type == "url" and url:
-        extracted_content = process_url(url)
-        source_label = f"🌐 Web Page: {url}"
-    elif source_type == "text" and source_content:
-        extracted_content = source_content
-        source_label = "📝 Plain Text"
+async def arun_course_agent(
+    user_message: str,
+    source_type: str = "text",
+    source_content: str = "",
+    file_bytes: bytes = None,
+    url: str = "",
+) -> str:
+    """Async run_course_agent(): URLs are fetched with async HTTP, file parsing runs in an executor."""
+    llm = get_llm()
+    if source_type == "url" and url:
+        extracted_content, source_label = await ascrape_url(url), f"🌐 Web Page: {url}"
     else:
-        # No source provided — treat as a general course question
-        response = llm.invoke([
-            SystemMessage(content=SYSTEM_PROMPT),
-            HumanMessage(content=user_message)
-        ])
-        return response.content
-
-    # Truncate if too long (Mistral context limit safety)
-    max_chars = 12000
-    if len(extracted_content) > max_chars:
-        extracted_content = extracted_content[:max_chars] + "\n\n[Content truncated for length...]"
-
-    prompt = f"""Source: {source_label}
-
---- COURSE MATERIAL ---
-{extracted_content}
---- END OF MATERIAL ---
-
-Student request: {user_message}
-
-Please process the above course material according to the student's request."""
-
-    response = llm.invoke([
-        SystemMessage(content=SYSTEM_PROMPT),
-        HumanMessage(content=prompt)
-    ])
-
+        extracted_content, source_label = await asyncio.to_thread(
+            extract_source, source_type, source_content, file_bytes, url
+        )
+    response = await llm.ainvoke(build_messages(user_message, extracted_content, source_label))
     return response.content
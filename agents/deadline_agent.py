@@ -3,13 +3,15 @@ Deadline Agent — manages student deadlines and study schedules.
 Uses SQLite for persistent storage and Mistral for natural language interaction.
 """
 
-import os
-import json
+import asyncio
 import re
 from datetime import datetime
-from langchain_mistralai import ChatMistralAI
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from tools.llm import get_llm as get_shared_llm
+from tools import structured
+from tools.deadlines import check
+from tools.history import window, awindow, with_summary, to_langchain
 from tools.db import (
     add_deadline, get_all_deadlines, update_deadline_status,
     delete_deadline, get_upcoming_deadlines
@@ -37,7 +39,7 @@ Always respond with a JSON object in this exact format:
   "user_message": "<friendly confirmation message to show the student>"
 }
 
-Today's date is: """ + datetime.now().strftime("%Y-%m-%d") + """
+Today's date is: {today}
 
 Priority guidelines:
 - high: exams, final projects, submissions due within 3 days
@@ -48,23 +50,83 @@ Always extract dates even if written naturally (e.g. "next Monday", "in 3 days",
 Convert all dates to YYYY-MM-DD format."""
 
 
-def get_llm():
-    return ChatMistralAI(
-        model="mistral-large-latest",
-        mistral_api_key=os.getenv("MISTRAL_API_KEY"),
-        temperature=0.1,
-    )
+def get_llm(task: str = None):
+    return get_shared_llm("deadline_agent", temperature=0.1, task=task)
 
 
-def parse_llm_action(raw: str) -> dict:
-    """Extract JSON from LLM response."""
-    match = re.search(r'\{.*\}', raw, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group())
-        except json.JSONDecodeError:
-            pass
-    return {"action": "chat", "data": {"message": raw}, "user_message": raw}
+# Requests likely to get a free-form study plan back. Everything else is action
+# extraction, which runs under the short "action" max_tokens cap (tools/model_tiers.py).
+PLAN_PATTERN = re.compile(r"\b(plan|schedule|organi[sz]e|prioriti[sz]e|timetable|how should i|what should i)\b", re.I)
+FREE_FORM_ACTIONS = ("plan", "chat")
+
+
+def _task_for(user_message: str) -> str:
+    return "plan" if PLAN_PATTERN.search(user_message) else "action"
+
+
+def _cut_short(task: str, parsed: dict | None, raw: str) -> bool:
+    """A capped reply chose a free-form answer and had to be repaired, i.e. it hit the cap."""
+    return (task == "action" and parsed is not None and parsed.get("action") in FREE_FORM_ACTIONS
+            and structured.extract_json(raw)[1])
+
+
+# ── Tools ─────────────────────────────────────────────────────────────────────
+# The deadline actions as function-calling tools, so the orchestrator's router
+# can route and extract the action in one request (ROUTER_TOOL_CALLING=1).
+
+def _tool(name: str, description: str, properties: dict, required: list) -> dict:
+    properties = {**properties, "user_message": {
+        "type": "string", "description": "Friendly confirmation message to show the student"}}
+    return {"type": "function", "function": {
+        "name": name, "description": description,
+        "parameters": {"type": "object", "properties": properties, "required": required},
+    }}
+
+
+DEADLINE_TOOLS = [
+    _tool("add_deadline", "Add a deadline, exam or assignment", {
+        "title": {"type": "string"},
+        "due_date": {"type": "string", "description": "YYYY-MM-DD"},
+        "subject": {"type": "string"},
+        "priority": {"type": "string", "enum": ["low", "medium", "high"]},
+        "notes": {"type": "string"},
+    }, ["title", "due_date"]),
+    _tool("list_deadlines", "List the student's deadlines", {
+        "status": {"type": "string", "enum": ["pending", "done", "all"]},
+    }, []),
+    _tool("upcoming_deadlines", "Show deadlines due in the next few days", {
+        "days": {"type": "integer"},
+    }, []),
+    _tool("complete_deadline", "Mark a deadline as done", {"id": {"type": "integer"}}, ["id"]),
+    _tool("delete_deadline", "Delete a deadline", {"id": {"type": "integer"}}, ["id"]),
+]
+
+TOOL_ACTIONS = {
+    "add_deadline": "add",
+    "list_deadlines": "list",
+    "upcoming_deadlines": "upcoming",
+    "complete_deadline": "complete",
+    "delete_deadline": "delete",
+}
+
+
+def action_from_tool_call(tool_call: dict) -> dict | None:
+    """Turn a LangChain tool call into the action object execute_action() takes; None if it isn't a deadline tool."""
+    action = TOOL_ACTIONS.get(tool_call.get("name"))
+    if action is None:
+        return None
+    data = dict(tool_call.get("args") or {})
+    user_message = data.pop("user_message", "")
+    return {"action": action, "data": data, "user_message": user_message}
+
+
+def parse_llm_action(raw: str, parsed: dict | None) -> dict:
+    """
+    The action invoke_structured() extracted from a reply. None means the reply
+    was unusable even after the retry; it is shown to the student as chat, not
+    parsed again (invoke_structured() has already counted it as failed).
+    """
+    return parsed or {"action": "chat", "data": {"message": raw}, "user_message": raw}
 
 
 def format_deadline(d: dict) -> str:
@@ -143,32 +205,95 @@ def execute_action(action_obj: dict) -> str:
         return user_msg if user_msg else data.get("message", "How can I help with your deadlines?")
 
 
-def run_deadline_agent(user_message: str, conversation_history: list = None) -> str:
+def _prior_turns(user_message: str, conversation_history: list | None) -> list:
+    """History before the current message (the orchestrator passes it including that message)."""
+    history = list(conversation_history or [])
+    if history and history[-1]["role"] == "user" and history[-1]["content"] == user_message:
+        history.pop()
+    return history
+
+
+def system_prompt() -> str:
+    """SYSTEM_PROMPT with today's date, filled in per request so a long-running app doesn't keep its start date."""
+    return SYSTEM_PROMPT.replace("{today}", datetime.now().strftime("%Y-%m-%d"))
+
+
+def format_db_context(current_deadlines: list) -> str:
+    """The current deadlines as prompt context, so the model can refer to them by ID."""
+    if not current_deadlines:
+        return ""
+    return "\n\nCurrent deadlines in the database:\n" + "\n".join(
+        f"- ID#{d['id']}: {d['title']} | Due: {d['due_date']} | Status: {d['status']}"
+        for d in current_deadlines
+    )
+
+
+def build_messages(user_message: str, current_deadlines: list, summary: str = "", recent: list = None) -> list:
+    """Build the LLM messages, providing the current DB context and windowed history."""
+    return [
+        SystemMessage(content=with_summary(system_prompt() + format_db_context(current_deadlines), summary)),
+        *to_langchain(recent or []),
+        HumanMessage(content=user_message)
+    ]
+
+
+def prepare_context(user_message: str, conversation_history: list = None, session_id: str = None) -> dict:
+    """Read-only inputs for the LLM call: windowed history and the current deadlines."""
+    summary, recent = window(_prior_turns(user_message, conversation_history), "deadline_agent", session_id)
+    return {"summary": summary, "recent": recent, "deadlines": get_all_deadlines()}
+
+
+async def aprepare_context(user_message: str, conversation_history: list = None, session_id: str = None) -> dict:
+    summary, recent = await awindow(_prior_turns(user_message, conversation_history), "deadline_agent", session_id)
+    return {"summary": summary, "recent": recent, "deadlines": await asyncio.to_thread(get_all_deadlines)}
+
+
+def run_deadline_agent(
+    user_message: str, conversation_history: list = None, session_id: str = None, context: dict = None,
+    action: dict = None,
+) -> str:
     """
     Run the Deadline Agent.
 
     Args:
         user_message: Student's natural language message
         conversation_history: Optional list of prior messages
+        session_id: Chat session, used to cache the rolling history summary
+        context: Output of prepare_context() if it was already computed (speculatively)
+        action: Action already extracted by the router's tool call; skips the LLM
 
     Returns:
         Formatted response string
     """
-    llm = get_llm()
-
-    # Provide current DB context to LLM
-    current_deadlines = get_all_deadlines()
-    db_context = ""
-    if current_deadlines:
-        db_context = "\n\nCurrent deadlines in the database:\n" + "\n".join(
-            f"- ID#{d['id']}: {d['title']} | Due: {d['due_date']} | Status: {d['status']}"
-            for d in current_deadlines
-        )
+    if action is not None:
+        return execute_action(action)
+    task = _task_for(user_message)
+    context = context or prepare_context(user_message, conversation_history, session_id)
+    messages = build_messages(user_message, context["deadlines"], context["summary"], context["recent"])
+    parsed, raw = structured.invoke_structured(get_llm(task), messages, "deadline_action", stream_tokens=False)
+    if _cut_short(task, parsed, raw):
+        parsed, raw = structured.invoke_structured(get_llm("plan"), messages, "deadline_action", stream_tokens=False)
+
+    action_obj = parse_llm_action(raw, parsed)
+    check()   # don't start a change the node has already given up on
+    return execute_action(action_obj)
 
-    response = llm.invoke([
-        SystemMessage(content=SYSTEM_PROMPT + db_context),
-        HumanMessage(content=user_message)
-    ])
 
-    action_obj = parse_llm_action(response.content)
-    return execute_action(action_obj)
+async def arun_deadline_agent(
+    user_message: str, conversation_history: list = None, session_id: str = None, context: dict = None,
+    action: dict = None,
+) -> str:
+    """Async run_deadline_agent(): SQLite reads and writes run in the default executor."""
+    if action is not None:
+        return await asyncio.to_thread(execute_action, action)
+    task = _task_for(user_message)
+    context = context or await aprepare_context(user_message, conversation_history, session_id)
+    messages = build_messages(user_message, context["deadlines"], context["summary"], context["recent"])
+    parsed, raw = await structured.ainvoke_structured(get_llm(task), messages, "deadline_action", stream_tokens=False)
+    if _cut_short(task, parsed, raw):
+        parsed, raw = await structured.ainvoke_structured(get_llm("plan"), messages, "deadline_action",
+                                                          stream_tokens=False)
+
+    action_obj = parse_llm_action(raw, parsed)
+    check()
+    return await asyncio.to_thread(execute_action, action_obj)
@@ -3,12 +3,12 @@ Graph Agent — extracts concepts and relationships from course material
 and returns structured data for building an interactive knowledge graph.
 """
 
-import os
-import json
-import re
-from langchain_mistralai import ChatMistralAI
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from tools.llm import get_llm as get_shared_llm
+from tools import structured, context_budget
+from tools.tracing import traced
+
 
 SYSTEM_PROMPT = """You are an expert Knowledge Graph Builder for academic content.
 Your job is to analyze course material and extract a rich, structured knowledge graph.
@@ -74,11 +74,7 @@ CATEGORY_SHAPES = {
 
 
 def get_llm():
-    return ChatMistralAI(
-        model="mistral-large-latest",
-        mistral_api_key=os.getenv("MISTRAL_API_KEY"),
-        temperature=0.2,
-    )
+    return get_shared_llm("graph_agent", temperature=0.2)
 
 
 def extract_graph_data(content: str, user_hint: str = "") -> dict:
@@ -88,13 +84,9 @@ def extract_graph_data(content: str, user_hint: str = "") -> dict:
     """
     llm = get_llm()
 
-    max_chars = 10000
-    if len(content) > max_chars:
-        content = content[:max_chars] + "\n[Content truncated...]"
-
     hint = f"\nFocus especially on: {user_hint}" if user_hint else ""
 
-    prompt = f"""Analyze this course material and extract a comprehensive knowledge graph.{hint}
+    template = """Analyze this course material and extract a comprehensive knowledge graph.{hint}
 
 --- COURSE MATERIAL ---
 {content}
@@ -103,31 +95,20 @@ def extract_graph_data(content: str, user_hint: str = "") -> dict:
 Extract all key concepts, their relationships, and build a rich knowledge graph.
 Remember: respond with ONLY the JSON object, no other text."""
 
-    response = llm.invoke([
-        SystemMessage(content=SYSTEM_PROMPT),
-        HumanMessage(content=prompt)
+    packed = context_budget.fit("graph_agent", [
+        context_budget.part("instructions", SYSTEM_PROMPT + template + hint, fixed=True),
+        context_budget.part("content", content, note="\n[Content truncated...]"),
     ])
+    prompt = template.format(hint=hint, content=packed["content"])
 
-    raw = response.content.strip()
-
-    # Strip markdown code blocks if present
-    raw = re.sub(r'^```(?:json)?\s*', '', raw)
-    raw = re.sub(r'\s*```$', '', raw)
-
-    try:
-        data = json.loads(raw)
-        return data
-    except json.JSONDecodeError:
-        # Try to extract JSON object
-        match = re.search(r'\{.*\}', raw, re.DOTALL)
-        if match:
-            try:
-                return json.loads(match.group())
-            except Exception:
-                pass
-        return {"title": "Knowledge Graph", "nodes": [], "edges": [], "error": "Parse failed"}
+    data, _ = structured.invoke_structured(llm, [
+        SystemMessage(content=SYSTEM_PROMPT),
+        HumanMessage(content=prompt)
+    ], "graph")
+    return data or {"title": "Knowledge Graph", "nodes": [], "edges": [], "error": "Parse failed"}
 
 
+@traced("build_pyvis_html")
 def build_pyvis_html(graph_data: dict) -> str:
     """
     Build an interactive pyvis graph and return it as an HTML string.
@@ -4,15 +4,22 @@ using DuckDuckGo search and synthesizes results with Mistral.
 """
 
 import os
-from langchain_mistralai import ChatMistralAI
+import asyncio
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from tools.llm import get_llm as get_shared_llm
+from tools.tracing import traced
+from tools.deadlines import call_within, acall_within
+
 try:
     from duckduckgo_search import DDGS
     DDGS_AVAILABLE = True
 except ImportError:
     DDGS_AVAILABLE = False
 
+# Seconds the web search may take before the agent answers from its own knowledge
+SEARCH_BUDGET = float(os.getenv("RESEARCH_SEARCH_BUDGET", "8"))
+
 
 SYSTEM_PROMPT = """You are the Research Agent — an expert academic researcher and tutor.
 You help students find information, understand topics deeply, and discover learning resources.
@@ -30,19 +37,16 @@ Use examples and analogies to make complex topics accessible."""
 
 
 def get_llm():
-    return ChatMistralAI(
-        model="mistral-large-latest",
-        mistral_api_key=os.getenv("MISTRAL_API_KEY"),
-        temperature=0.3,
-    )
+    return get_shared_llm("research_agent", temperature=0.3)
 
 
+@traced("search_web")
 def search_web(query: str, max_results: int = 5) -> list[dict]:
     """Perform a DuckDuckGo search and return results."""
     if not DDGS_AVAILABLE:
         return []
     try:
-        with DDGS() as ddgs:
+        with DDGS(timeout=int(SEARCH_BUDGET)) as ddgs:
             results = list(ddgs.text(query, max_results=max_results))
         return results
     except Exception:
@@ -61,22 +65,13 @@ def format_search_results(results: list[dict]) -> str:
     return "\n".join(lines)
 
 
-def run_research_agent(user_message: str, search_query: str = "") -> str:
-    """
-    Run the Research Agent.
+async def asearch_web(query: str, max_results: int = 5) -> list[dict]:
+    """Async search_web(). duckduckgo_search has no async client, so it runs in the default executor."""
+    return await asyncio.to_thread(search_web, query, max_results)
 
-    Args:
-        user_message: Student's research question or topic
-        search_query: Optional custom search query (defaults to user_message)
 
-    Returns:
-        Research summary and resources as a string
-    """
-    llm = get_llm()
-
-    # Perform web search
-    query = search_query if search_query else user_message
-    search_results = search_web(query, max_results=5)
+def build_messages(user_message: str, search_results: list[dict]) -> list:
+    """Build the LLM messages, with search results when available."""
     search_context = format_search_results(search_results)
 
     if search_context:
@@ -92,13 +87,14 @@ Include source references where relevant."""
 No web search results available. Answer based on your academic knowledge.
 Be thorough and suggest where the student might find more information."""
 
-    response = llm.invoke([
+    return [
         SystemMessage(content=SYSTEM_PROMPT),
         HumanMessage(content=prompt)
-    ])
+    ]
 
-    # Append source links if available
-    result = response.content
+
+def append_sources(result: str, search_results: list[dict]) -> str:
+    """Append source links if available."""
     if search_results:
         result += "\n\n---\n**🔗 Sources:**\n"
         for i, r in enumerate(search_results[:3], 1):
@@ -108,3 +104,36 @@ Be thorough and suggest where the student might find more information."""
                 result += f"{i}. [{title}]({url})\n"
 
     return result
+
+
+def run_research_agent(user_message: str, search_query: str = "", search_results: list[dict] = None) -> str:
+    """
+    Run the Research Agent.
+
+    Args:
+        user_message: Student's research question or topic
+        search_query: Optional custom search query (defaults to user_message)
+        search_results: Results already fetched (speculatively); skips the search
+
+    Returns:
+        Research summary and resources as a string
+    """
+    llm = get_llm()
+
+    # Perform web search
+    if search_results is None:
+        query = search_query if search_query else user_message
+        search_results = call_within(SEARCH_BUDGET, search_web, query, 5, default=[], name="search_web")
+
+    response = llm.invoke(build_messages(user_message, search_results))
+    return append_sources(response.content, search_results)
+
+
+async def arun_research_agent(user_message: str, search_query: str = "", search_results: list[dict] = None) -> str:
+    """Async run_research_agent()."""
+    llm = get_llm()
+    if search_results is None:
+        query = search_query if search_query else user_message
+        search_results = await acall_within(SEARCH_BUDGET, asearch_web(query, 5), default=[], name="search_web")
+    response = await llm.ainvoke(build_messages(user_message, search_results))
+    return append_sources(response.content, search_results)
@@ -3,12 +3,11 @@ Revision Agent — generates quizzes, flashcards, and revision summaries
 to help students actively study and retain information.
 """
 
-import os
-import json
-import re
-from langchain_mistralai import ChatMistralAI
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from tools.llm import get_llm as get_shared_llm
+from tools import structured, context_budget
+
 
 QUIZ_SYSTEM_PROMPT = """You are the Revision Agent — an expert at creating engaging study materials.
 You generate quizzes, flashcards, and revision content to help students learn effectively.
@@ -58,11 +57,7 @@ Be encouraging, clear, and pedagogically effective."""
 
 
 def get_llm():
-    return ChatMistralAI(
-        model="mistral-large-latest",
-        mistral_api_key=os.getenv("MISTRAL_API_KEY"),
-        temperature=0.4,
-    )
+    return get_shared_llm("revision_agent", temperature=0.4)
 
 
 def detect_revision_mode(message: str) -> str:
@@ -77,15 +72,9 @@ def detect_revision_mode(message: str) -> str:
     return "chat"
 
 
-def parse_json_response(raw: str) -> dict | None:
-    """Extract JSON from LLM response."""
-    match = re.search(r'\{.*\}', raw, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group())
-        except json.JSONDecodeError:
-            pass
-    return None
+def parse_json_response(raw: str, mode: str) -> dict | None:
+    """Extract the quiz / flashcards / summary JSON from a reply that didn't go through invoke_structured()."""
+    return structured.parse(raw, mode, "revision_agent")
 
 
 def format_quiz(data: dict) -> str:
@@ -118,42 +107,43 @@ def format_summary(data: dict) -> str:
     return f"## 📖 {data.get('title', 'Revision Summary')}\n\n{data.get('content', '')}"
 
 
-def run_revision_agent(user_message: str, topic_content: str = "") -> str:
-    """
-    Run the Revision Agent.
-
-    Args:
-        user_message: What the student wants (quiz, flashcards, etc.)
-        topic_content: Optional course content to base the revision on
-
-    Returns:
-        Formatted revision material as a string
-    """
-    llm = get_llm()
-    mode = detect_revision_mode(user_message)
+def build_messages(user_message: str, topic_content: str, mode: str) -> list:
+    """Build the LLM messages for general chat or structured generation."""
+    system = CHAT_SYSTEM_PROMPT if mode == "chat" else QUIZ_SYSTEM_PROMPT
+    packed = context_budget.fit("revision_agent", [
+        context_budget.part("instructions", system + user_message, fixed=True),
+        context_budget.part("material", topic_content),
+    ])
+    material = packed["material"]
 
     if mode == "chat":
         # General revision question — no structured output needed
-        context = f"\n\nCourse material provided:\n{topic_content[:6000]}" if topic_content else ""
-        response = llm.invoke([
+        context = f"\n\nCourse material provided:\n{material}" if material else ""
+        return [
             SystemMessage(content=CHAT_SYSTEM_PROMPT),
             HumanMessage(content=user_message + context)
-        ])
-        return response.content
+        ]
 
     # Structured generation (quiz / flashcards / summary)
     content_block = ""
-    if topic_content:
-        content_block = f"\n\nBase your content on this course material:\n{topic_content[:8000]}"
+    if material:
+        content_block = f"\n\nBase your content on this course material:\n{material}"
 
     prompt = f"{user_message}{content_block}"
 
-    response = llm.invoke([
+    return [
         SystemMessage(content=QUIZ_SYSTEM_PROMPT),
         HumanMessage(content=prompt)
-    ])
+    ]
 
-    parsed = parse_json_response(response.content)
+
+def format_response(raw: str, mode: str, parsed: dict | None) -> str:
+    """
+    Format invoke_structured()'s result as markdown. None falls back to the raw
+    response without parsing it again (invoke_structured() already counted it).
+    """
+    if mode == "chat":
+        return raw
 
     if parsed:
         t = parsed.get("type", mode)
@@ -165,4 +155,35 @@ def run_revision_agent(user_message: str, topic_content: str = "") -> str:
             return format_summary(parsed)
 
     # Fallback: return raw response
-    return response.content
+    return raw
+
+
+def run_revision_agent(user_message: str, topic_content: str = "") -> str:
+    """
+    Run the Revision Agent.
+
+    Args:
+        user_message: What the student wants (quiz, flashcards, etc.)
+        topic_content: Optional course content to base the revision on
+
+    Returns:
+        Formatted revision material as a string
+    """
+    llm = get_llm()
+    mode = detect_revision_mode(user_message)
+    messages = build_messages(user_message, topic_content, mode)
+    if mode == "chat":
+        return llm.invoke(messages, stream_tokens=True).content
+    parsed, raw = structured.invoke_structured(llm, messages, mode, stream_tokens=False)
+    return format_response(raw, mode, parsed)
+
+
+async def arun_revision_agent(user_message: str, topic_content: str = "") -> str:
+    """Async run_revision_agent()."""
+    llm = get_llm()
+    mode = detect_revision_mode(user_message)
+    messages = build_messages(user_message, topic_content, mode)
+    if mode == "chat":
+        return (await llm.ainvoke(messages, stream_tokens=True)).content
+    parsed, raw = await structured.ainvoke_structured(llm, messages, mode, stream_tokens=False)
+    return format_response(raw, mode, parsed)
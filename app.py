@@ -6,6 +6,7 @@ Multi-agent system powered by LangGraph + Mistral
 import streamlit as st
 from dotenv import load_dotenv
 import os
+import uuid
 
 load_dotenv()
 
@@ -156,12 +157,14 @@ if "api_key_set" not in st.session_state:
     st.session_state.api_key_set = bool(os.getenv("MISTRAL_API_KEY"))
 if "course_content" not in st.session_state:
     st.session_state.course_content = ""
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 # ─────────────────────────────────────────────
 # Sidebar
 # ─────────────────────────────────────────────
 
-from ui import render_sidebar
+from ui import render_sidebar, llm_spinner
 render_sidebar("Home Chat")
 
 with st.sidebar:
@@ -259,6 +262,7 @@ with st.sidebar:
 
     if st.button("🗑️ Clear Chat", use_container_width=True):
         st.session_state.messages = []
+        st.session_state.session_id = uuid.uuid4().hex
         st.rerun()
 
     st.markdown("""
@@ -350,36 +354,60 @@ if prompt_to_process:
         history = [{"role": m["role"], "content": m["content"]} for m in st.session_state.messages]
 
         # Build extra context from pending uploads
-        extra = None
+        extra = {"session_id": st.session_state.session_id}
         if st.session_state.get("pending_file"):
             f = st.session_state.pending_file
             extra = {
+                **extra,
                 "force_intent": "course_agent",
                 "source_type": f["type"],
                 "file_bytes": f["bytes"],
             }
         elif st.session_state.get("pending_url"):
             extra = {
+                **extra,
                 "force_intent": "course_agent",
                 "source_type": "url",
                 "url": st.session_state.pending_url,
             }
         elif st.session_state.get("pending_text"):
             extra = {
+                **extra,
                 "force_intent": "course_agent",
                 "source_type": "text",
                 "source_content": st.session_state.pending_text,
             }
 
-        with st.spinner("🤖 Thinking..."):
+        from tools.resilience import CircuitOpenError
+
+        with llm_spinner("🤖 Thinking..."):
             try:
-                from orchestrator import run_orchestrator
-                result = run_orchestrator(history, extra=extra)
+                from orchestrator import stream_orchestrator
+                result = {"response": "", "intent": "general"}
+
+                def token_stream():
+                    for event in stream_orchestrator(history, extra=extra):
+                        if event["type"] == "token":
+                            yield event["content"]
+                        elif event["type"] == "done":
+                            result.update(response=event["response"], intent=event["intent"])
+
+                # Render tokens as they arrive; the full message is re-rendered after st.rerun()
+                st.markdown('<div class="assistant-message">', unsafe_allow_html=True)
+                st.write_stream(token_stream())
+                st.markdown('</div>', unsafe_allow_html=True)
+
                 st.session_state.messages.append({
                     "role": "assistant",
                     "content": result["response"],
                     "intent": result["intent"],
                 })
+            except CircuitOpenError as e:
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": f"⏳ **Mistral is overloaded right now.** Please try again in {e.retry_in} seconds.",
+                    "intent": "error",
+                })
             except Exception as e:
                 st.session_state.messages.append({
                     "role": "assistant",
@@ -388,3 +416,12 @@ if prompt_to_process:
                 })
 
         st.rerun()
+
+# ─────────────────────────────────────────────
+# Warm-up
+# ─────────────────────────────────────────────
+
+# Load the agent pipeline in the background once the page is on screen, so the
+# first message doesn't wait for LangGraph and the Mistral client to import.
+from tools.coldstart import preload
+preload("orchestrator")
@@ -3,36 +3,51 @@ Orchestrator Agent — the brain of the multi-agent system.
 Uses LangGraph to route student queries to the appropriate specialized agent.
 """
 
-from typing import TypedDict, Literal
+from typing import TypedDict, Annotated
 from langgraph.graph import StateGraph, END
-from langchain_mistralai import ChatMistralAI
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
 import os
-import json
-import re
+import asyncio
+import hashlib
+
+from tools.llm import get_llm as get_shared_llm
+from tools.history import window, awindow, with_summary, to_langchain
+from tools.tracing import trace, traced_node, mark_node_cache
+from tools import deadlines
+from tools.hedging import hedged
+from tools import speculation, route_cache, structured
+from tools.fast_router import get_last_intent, remember_intent
 
 
 # ─────────────────────────────────────────────
 # State Definition
 # ─────────────────────────────────────────────
 
+def merge_responses(left: dict, right: dict) -> dict:
+    """Reducer so agents running in parallel can each add their own response."""
+    return {**(left or {}), **(right or {})}
+
+
 class AgentState(TypedDict):
     messages: list
     intent: str
+    intents: list
+    last_intent: str        # main intent of the previous turn, for sticky follow-ups
     agent_response: str
+    responses: Annotated[dict, merge_responses]
     next_agent: str
+    extra: dict
+    speculation: object     # tools.speculation.Speculation started by the router, or None
+    deadline_action: dict   # deadline action extracted by the router's tool call, or None
 
 
 # ─────────────────────────────────────────────
 # LLM
 # ─────────────────────────────────────────────
 
-def get_llm():
-    return ChatMistralAI(
-        model="mistral-large-latest",
-        mistral_api_key=os.getenv("MISTRAL_API_KEY"),
-        temperature=0.1,
-    )
+def get_llm(agent: str = "router", task: str = None):
+    return get_shared_llm(agent, temperature=0.1, task=task)
 
 
 # ─────────────────────────────────────────────
@@ -50,97 +65,452 @@ Agents:
 - graph_agent: building knowledge graphs, visualizing concepts, concept maps, mind maps, "show me a graph", "visualize"
 - general: greetings, unclear requests, meta questions about the assistant
 
+A message may contain several independent requests (e.g. "add my exam on Friday and quiz me on backprop").
+List every agent needed, most important first. Use a single agent whenever one is enough.
+
 Respond with ONLY a JSON object:
-{"intent": "<agent_name>", "reasoning": "<one sentence>"}"""
+{"intent": "<main agent_name>", "intents": ["<agent_name>", ...], "reasoning": "<one sentence>"}"""
+
+# Upper bound on agents run in parallel for one message
+MAX_PARALLEL_AGENTS = 3
+
+# With ROUTER_TOOL_CALLING=1 the LLM router gets the deadline actions as tools:
+# a deadline request is routed and its action extracted in the same call, and
+# the deadline agent executes it without a second LLM request.
+TOOL_ROUTING = os.getenv("ROUTER_TOOL_CALLING", "0") == "1"
+# Its reply can carry a whole add_deadline call, so it gets the "router.tools" token cap, not the router's
+ROUTER_TASK = "tools" if TOOL_ROUTING else None
+
+TOOL_ROUTER_PROMPT = """You are the Orchestrator of a Student AI Assistant.
+Decide how to handle the student's message by calling tools.
+
+If the message asks to add, list, complete or delete deadlines, or to see upcoming ones,
+call the matching deadline tool directly with the extracted details.
+Convert natural dates ("next Monday", "in 3 days") to YYYY-MM-DD; today is {today}.
+For anything else, call route with the agents that should handle it:
+- course_agent: uploading, summarizing, structuring course content, explaining topics from materials
+- deadline_agent: study schedules, plans and other deadline questions that aren't a single action
+- revision_agent: quizzes, flashcards, self-testing, revision summaries, "test me"
+- research_agent: finding resources, web search, understanding topics, academic questions
+- graph_agent: building knowledge graphs, visualizing concepts, concept maps, mind maps
+- general: greetings, unclear requests, meta questions about the assistant
+
+A message with several independent requests may call a deadline tool and route together."""
+
+ROUTE_TOOL = {"type": "function", "function": {
+    "name": "route",
+    "description": "Send the message to one or more agents, most important first",
+    "parameters": {"type": "object", "properties": {
+        "intents": {"type": "array", "items": {"type": "string", "enum": [
+            "course_agent", "deadline_agent", "revision_agent", "research_agent", "graph_agent", "general",
+        ]}},
+        "reasoning": {"type": "string"},
+    }, "required": ["intents"]},
+}}
 
 
-def router_node(state: AgentState) -> AgentState:
-    llm = get_llm()
+# Rule-based routes at or above this confidence skip the LLM router entirely
+FAST_ROUTE_THRESHOLD = float(os.getenv("FAST_ROUTE_THRESHOLD", "0.8"))
+# Same for the locally trained classifier (see tools/intent_classifier.py)
+CLASSIFIER_THRESHOLD = float(os.getenv("CLASSIFIER_THRESHOLD", "0.9"))
+
+
+def _session_id(state: AgentState) -> str | None:
+    return state["extra"].get("session_id")
+
+
+def route_locally(state: AgentState) -> str | None:
+    """
+    Route without the LLM: forced intents, keyword rules, follow-ups to the
+    previous turn's agent, then the trained classifier.
+    """
+    from tools.fast_router import fast_route, is_follow_up
+    from tools.intent_classifier import classify
+    last_message = state["messages"][-1]["content"]
+
+    # Uploads and other extra data pin the request to a specific agent
+    forced = (state.get("extra") or {}).get("force_intent", "")
+    if forced in ("course_agent", "revision_agent"):
+        return forced
+
+    intent, confidence = fast_route(last_message)
+    if confidence >= FAST_ROUTE_THRESHOLD:
+        return intent
+
+    # "another one" / "make it harder" stay with the agent that just answered.
+    # A confident rule match above is the escape hatch for a change of topic.
+    last_intent = state.get("last_intent")
+    if last_intent and last_intent != "general" and is_follow_up(last_message):
+        return last_intent
+
+    intent, confidence = classify(last_message)
+    if confidence >= CLASSIFIER_THRESHOLD:
+        return intent
+    return None
+
+
+def predict_intent(state: AgentState) -> str | None:
+    """Cheap best guess at the intent when local routing wasn't confident enough to decide."""
+    from tools.fast_router import fast_route
+    from tools.intent_classifier import classify
     last_message = state["messages"][-1]["content"]
 
-    response = llm.invoke([
+    intent, confidence = max([fast_route(last_message), classify(last_message)], key=lambda c: c[1])
+    return intent if confidence > 0 else None
+
+
+def _preparation(intent: str, state: AgentState):
+    """(sync func, async func, args) for an agent's read-only preparation step, if it has one."""
+    last_message = state["messages"][-1]["content"]
+    if intent == "deadline_agent":
+        from agents.deadline_agent import prepare_context, aprepare_context
+        return prepare_context, aprepare_context, (last_message, state["messages"], _session_id(state))
+    if intent == "research_agent":
+        from agents.research_agent import search_web, asearch_web
+        return search_web, asearch_web, (last_message, 5)
+    return None
+
+
+def _speculate(state: AgentState, is_async: bool = False):
+    """Start the predicted agent's preparation while the LLM router runs."""
+    if not speculation.ENABLED:
+        return None
+    intent = predict_intent(state)
+    prep = _preparation(intent, state) if intent else None
+    if prep is None:
+        return None
+    func, afunc, args = prep
+    return speculation.astart(intent, afunc, *args) if is_async else speculation.start(intent, func, *args)
+
+
+def build_router_messages(last_message: str) -> list:
+    return [
         SystemMessage(content=ROUTER_PROMPT),
         HumanMessage(content=f"Student message: {last_message}")
-    ])
+    ]
+
+
+ROUTER_INTENTS = ROUTE_TOOL["function"]["parameters"]["properties"]["intents"]["items"]["enum"]
+
+
+def _intents_from_reply(raw: str) -> list[str] | None:
+    """
+    The intents in a router reply, main intent first, or None if it was unusable,
+    truncated or named no known agent (no retry: the caller falls back to "general").
+    """
+    parsed = structured.parse(raw, "router", "router")
+    if not parsed or structured.extract_json(raw)[1]:
+        return None
+    intents = [parsed.get("intent", "general")] + list(parsed.get("intents") or [])
+    intents = [i for i in intents if i in ROUTER_INTENTS]
+    return intents or None
+
+
+def _dedupe(intents: list[str]) -> list[str]:
+    # Deduplicate, keep order; "general" only makes sense on its own
+    unique = [i for n, i in enumerate(intents) if i not in intents[:n]]
+    specific = [i for i in unique if i != "general"]
+    return specific[:MAX_PARALLEL_AGENTS] or ["general"]
+
+
+def build_tool_router_messages(last_message: str, current_deadlines: list) -> list:
+    from datetime import datetime
+    from agents.deadline_agent import format_db_context
+    prompt = TOOL_ROUTER_PROMPT.format(today=datetime.now().strftime("%Y-%m-%d"))
+    return [
+        SystemMessage(content=prompt + format_db_context(current_deadlines)),
+        HumanMessage(content=f"Student message: {last_message}")
+    ]
+
+
+def parse_tool_routing(response) -> tuple[list[str], dict | None, bool]:
+    """
+    Intents and the extracted deadline action (if any) from a tool-calling router
+    response, and whether the decision parsed cleanly (only those are cached).
+    """
+    from agents.deadline_agent import action_from_tool_call
+    intents, action = [], None
+    for call in response.tool_calls or []:
+        if call["name"] == "route":
+            intents += [i for i in call["args"].get("intents") or [] if isinstance(i, str)]
+        elif action is None:
+            action = action_from_tool_call(call)
+            if action is not None:
+                intents.insert(0, "deadline_agent")
+    intents = [i for i in intents if i in ROUTER_INTENTS]
+    if not intents:
+        parsed = _intents_from_reply(response.content if isinstance(response.content, str) else "")
+        return _dedupe(parsed or ["general"]), None, parsed is not None
+    return _dedupe(intents), action, True
+
+
+def _routed(state: AgentState, intents: list[str]) -> dict:
+    remember_intent(_session_id(state), intents[0])
+    return {"intent": intents[0], "intents": intents, "next_agent": intents[0]}
+
+
+# Cached LLM routing decisions (tools/route_cache.py) are only valid for the prompt and model that made them
+ROUTER_VERSION = hashlib.sha1(
+    ((TOOL_ROUTER_PROMPT if TOOL_ROUTING else ROUTER_PROMPT) + get_llm(task=ROUTER_TASK).model).encode()
+).hexdigest()[:8]
+
+
+def _route_with_llm(last_message: str) -> tuple[list[str], dict | None, bool]:
+    """(intents, deadline action, parsed cleanly)."""
+    if TOOL_ROUTING:
+        from tools.db import get_all_deadlines
+        from agents.deadline_agent import DEADLINE_TOOLS
+        messages = build_tool_router_messages(last_message, get_all_deadlines())
+        response = get_llm(task=ROUTER_TASK).invoke(messages, stream_tokens=False, hedge=True,
+                                                    tools=[ROUTE_TOOL, *DEADLINE_TOOLS], tool_choice="any")
+        return parse_tool_routing(response)
+    response = get_llm().invoke(build_router_messages(last_message), stream_tokens=False, hedge=True)
+    parsed = _intents_from_reply(response.content)
+    return _dedupe(parsed or ["general"]), None, parsed is not None
+
+
+async def _aroute_with_llm(last_message: str) -> tuple[list[str], dict | None, bool]:
+    if TOOL_ROUTING:
+        from tools.db import get_all_deadlines
+        from agents.deadline_agent import DEADLINE_TOOLS
+        deadlines = await asyncio.to_thread(get_all_deadlines)
+        response = await get_llm(task=ROUTER_TASK).ainvoke(build_tool_router_messages(last_message, deadlines),
+                                                           stream_tokens=False, hedge=True,
+                                                           tools=[ROUTE_TOOL, *DEADLINE_TOOLS], tool_choice="any")
+        return parse_tool_routing(response)
+    response = await get_llm().ainvoke(build_router_messages(last_message), stream_tokens=False, hedge=True)
+    parsed = _intents_from_reply(response.content)
+    return _dedupe(parsed or ["general"]), None, parsed is not None
+
+
+def router_node(state: AgentState) -> dict:
+    from tools.intent_classifier import log_decision
+
+    intent = route_locally(state)
+    if intent is not None:
+        return _routed(state, [intent])
+
+    last_message = state["messages"][-1]["content"]
+    cached = route_cache.lookup(last_message, ROUTER_VERSION)
+    mark_node_cache("hit" if cached else "miss")
+    if cached:
+        return _routed(state, cached)
 
-    match = re.search(r'\{.*?\}', response.content, re.DOTALL)
-    intent = "general"
-    if match:
-        try:
-            parsed = json.loads(match.group())
-            intent = parsed.get("intent", "general")
-        except json.JSONDecodeError:
-            pass
+    spec = _speculate(state)
+    intents, action, parsed = _route_with_llm(last_message)
+    if spec is not None:
+        spec.resolve(intents)
+    if parsed:   # never cache or learn from the "general" fallback for an unusable reply
+        log_decision(last_message, intents[0], source="llm")
+        route_cache.store(last_message, intents, ROUTER_VERSION)
+    return {**_routed(state, intents), "speculation": spec, "deadline_action": action}
 
-    return {**state, "intent": intent, "next_agent": intent}
+
+async def arouter_node(state: AgentState) -> dict:
+    from tools.intent_classifier import log_decision
+
+    intent = await asyncio.to_thread(route_locally, state)
+    if intent is not None:
+        return _routed(state, [intent])
+
+    last_message = state["messages"][-1]["content"]
+    cached = await asyncio.to_thread(route_cache.lookup, last_message, ROUTER_VERSION)
+    mark_node_cache("hit" if cached else "miss")
+    if cached:
+        return _routed(state, cached)
+
+    spec = _speculate(state, is_async=True)
+    intents, action, parsed = await _aroute_with_llm(last_message)
+    if spec is not None:
+        spec.resolve(intents)
+    if parsed:
+        log_decision(last_message, intents[0], source="llm")
+        await asyncio.to_thread(route_cache.store, last_message, intents, ROUTER_VERSION)
+    return {**_routed(state, intents), "speculation": spec, "deadline_action": action}
 
 
 # ─────────────────────────────────────────────
 # Agent Nodes
 # ─────────────────────────────────────────────
 
-def general_agent_node(state: AgentState) -> AgentState:
-    llm = get_llm()
-    history = [SystemMessage(content="""You are a helpful Student AI Assistant.
+GENERAL_PROMPT = """You are a helpful Student AI Assistant.
 Help students manage their studies, courses, deadlines, and revision.
-Be concise, friendly, and encouraging.""")]
-    for msg in state["messages"]:
-        if msg["role"] == "user":
-            history.append(HumanMessage(content=msg["content"]))
-        else:
-            history.append(AIMessage(content=msg["content"]))
-    response = llm.invoke(history)
-    return {**state, "agent_response": response.content}
+Be concise, friendly, and encouraging."""
+
+
+def build_general_messages(summary: str, recent: list) -> list:
+    return [SystemMessage(content=with_summary(GENERAL_PROMPT, summary))] + to_langchain(recent)
 
 
-def course_agent_node(state: AgentState) -> AgentState:
+def general_agent_node(state: AgentState) -> dict:
+    summary, recent = window(state["messages"], "general", _session_id(state))
+    response = get_llm("general").invoke(build_general_messages(summary, recent))
+    return {"responses": {"general_agent": response.content}}
+
+
+async def ageneral_agent_node(state: AgentState) -> dict:
+    summary, recent = await awindow(state["messages"], "general", _session_id(state))
+    response = await get_llm("general").ainvoke(build_general_messages(summary, recent))
+    return {"responses": {"general_agent": response.content}}
+
+
+def _course_kwargs(state: AgentState) -> dict:
+    extra = state.get("extra") or {}
+    return {
+        "user_message": state["messages"][-1]["content"],
+        "source_type": extra.get("source_type", "text"),
+        "source_content": extra.get("source_content", ""),
+        "file_bytes": extra.get("file_bytes"),
+        "url": extra.get("url", ""),
+    }
+
+
+def course_agent_node(state: AgentState) -> dict:
     from agents.course_agent import run_course_agent
-    last_message = state["messages"][-1]["content"]
-    result = run_course_agent(user_message=last_message)
-    return {**state, "agent_response": result}
+    result = run_course_agent(**_course_kwargs(state))
+    return {"responses": {"course_agent": result}}
+
+
+async def acourse_agent_node(state: AgentState) -> dict:
+    from agents.course_agent import arun_course_agent
+    result = await arun_course_agent(**_course_kwargs(state))
+    return {"responses": {"course_agent": result}}
 
 
-def deadline_agent_node(state: AgentState) -> AgentState:
+def deadline_agent_node(state: AgentState) -> dict:
     from agents.deadline_agent import run_deadline_agent
     last_message = state["messages"][-1]["content"]
-    result = run_deadline_agent(user_message=last_message, conversation_history=state["messages"])
-    return {**state, "agent_response": result}
+    action = state.get("deadline_action")
+    result = run_deadline_agent(
+        user_message=last_message, conversation_history=state["messages"], session_id=_session_id(state),
+        context=None if action else speculation.take_for(state, "deadline_agent"), action=action,
+    )
+    return {"responses": {"deadline_agent": result}}
+
 
+async def adeadline_agent_node(state: AgentState) -> dict:
+    from agents.deadline_agent import arun_deadline_agent
+    last_message = state["messages"][-1]["content"]
+    action = state.get("deadline_action")
+    result = await arun_deadline_agent(
+        user_message=last_message, conversation_history=state["messages"], session_id=_session_id(state),
+        context=None if action else await speculation.atake_for(state, "deadline_agent"), action=action,
+    )
+    return {"responses": {"deadline_agent": result}}
 
-def revision_agent_node(state: AgentState) -> AgentState:
+
+def revision_agent_node(state: AgentState) -> dict:
     from agents.revision_agent import run_revision_agent
     last_message = state["messages"][-1]["content"]
-    result = run_revision_agent(user_message=last_message)
-    return {**state, "agent_response": result}
+    extra = state.get("extra") or {}
+    result = run_revision_agent(
+        user_message=last_message,
+        topic_content=extra.get("topic_content", ""),
+    )
+    return {"responses": {"revision_agent": result}}
 
 
-def research_agent_node(state: AgentState) -> AgentState:
-    from agents.research_agent import run_research_agent
+async def arevision_agent_node(state: AgentState) -> dict:
+    from agents.revision_agent import arun_revision_agent
     last_message = state["messages"][-1]["content"]
-    result = run_research_agent(user_message=last_message)
-    return {**state, "agent_response": result}
+    extra = state.get("extra") or {}
+    result = await arun_revision_agent(
+        user_message=last_message,
+        topic_content=extra.get("topic_content", ""),
+    )
+    return {"responses": {"revision_agent": result}}
 
 
-def graph_agent_node(state: AgentState) -> AgentState:
+def research_agent_node(state: AgentState) -> dict:
+    from agents.research_agent import run_research_agent, SEARCH_BUDGET
+    last_message = state["messages"][-1]["content"]
+    # A speculative search gets the same budget as a direct one; past it, answer without results
+    results = speculation.take_for(state, "research_agent", budget=SEARCH_BUDGET, default=[])
+    result = run_research_agent(user_message=last_message, search_results=results)
+    return {"responses": {"research_agent": result}}
+
+
+async def aresearch_agent_node(state: AgentState) -> dict:
+    from agents.research_agent import arun_research_agent, SEARCH_BUDGET
+    last_message = state["messages"][-1]["content"]
+    results = await speculation.atake_for(state, "research_agent", budget=SEARCH_BUDGET, default=[])
+    result = await arun_research_agent(user_message=last_message, search_results=results)
+    return {"responses": {"research_agent": result}}
+
+
+def graph_agent_node(state: AgentState) -> dict:
     result = "🕸️ **Knowledge Graph ready!** Head to the **Knowledge Graph** page in the sidebar to generate an interactive concept map from your uploaded material.\n\nYou can also paste text directly on that page!"
-    return {**state, "agent_response": result}
+    return {"responses": {"graph_agent": result}}
+
+
+# ─────────────────────────────────────────────
+# Degraded Fallbacks
+# ─────────────────────────────────────────────
+# Returned instead of the node's answer when it overruns its time budget
+# (tools/deadlines.py). None of them call the LLM.
+
+def router_fallback(state: AgentState) -> dict:
+    return _routed(state, [predict_intent(state) or "general"])
+
+
+def _timed_out(node: str, message: str):
+    def fallback(state: AgentState) -> dict:
+        return {"responses": {node: f"⏱️ {message}"}}
+    return fallback
+
+
+def deadline_agent_fallback(state: AgentState) -> dict:
+    # The node's worker thread isn't stopped at the deadline: a change it had
+    # already started (add / complete / delete) can still land after this reply.
+    from tools.db import get_upcoming_deadlines
+    from agents.deadline_agent import format_deadlines_list
+    listing = format_deadlines_list(get_upcoming_deadlines())
+    return {"responses": {"deadline_agent": (
+        "⏱️ I couldn't finish that request in time. If you asked for a change, it may "
+        "still be applied in a moment — ask me to show your deadlines to see the latest. "
+        f"Here are your deadlines for the next 7 days as of now:\n\n{listing}"
+    )}}
+
+
+NODE_FALLBACKS = {
+    "router": router_fallback,
+    "general_agent": _timed_out("general_agent", "That took too long to answer — please try again in a moment."),
+    "course_agent": _timed_out("course_agent", "Processing this material took too long. Try a shorter excerpt or ask about one section at a time."),
+    "deadline_agent": deadline_agent_fallback,
+    "revision_agent": _timed_out("revision_agent", "Generating revision material took too long. Try a narrower topic or fewer questions."),
+    "research_agent": _timed_out("research_agent", "The research took too long to complete. Try a more specific question."),
+}
 
 
 # ─────────────────────────────────────────────
 # Routing Function
 # ─────────────────────────────────────────────
 
-def route_to_agent(state: AgentState) -> Literal[
-    "general_agent", "course_agent", "deadline_agent", "revision_agent", "research_agent", "graph_agent"
-]:
-    intent = state.get("intent", "general")
-    return {
-        "course_agent": "course_agent",
-        "deadline_agent": "deadline_agent",
-        "revision_agent": "revision_agent",
-        "research_agent": "research_agent",
-        "graph_agent": "graph_agent",
-    }.get(intent, "general_agent")
+AGENT_NODES = {
+    "course_agent": "course_agent",
+    "deadline_agent": "deadline_agent",
+    "revision_agent": "revision_agent",
+    "research_agent": "research_agent",
+    "graph_agent": "graph_agent",
+}
+
+
+def route_to_agent(state: AgentState) -> list[str]:
+    """Map the routed intents to agent nodes; several nodes run concurrently."""
+    intents = state.get("intents") or [state.get("intent", "general")]
+    nodes = []
+    for intent in intents:
+        node = AGENT_NODES.get(intent, "general_agent")
+        if node not in nodes:
+            nodes.append(node)
+    return nodes
+
+
+def merge_node(state: AgentState) -> dict:
+    """Combine the responses of every agent that ran, in routing order."""
+    responses = state.get("responses") or {}
+    parts = [responses[n] for n in route_to_agent(state) if responses.get(n)]
+    return {"agent_response": "\n\n---\n\n".join(parts)}
 
 
 # ─────────────────────────────────────────────
@@ -150,13 +520,24 @@ def route_to_agent(state: AgentState) -> Literal[
 def build_graph():
     graph = StateGraph(AgentState)
 
-    graph.add_node("router", router_node)
-    graph.add_node("general_agent", general_agent_node)
-    graph.add_node("course_agent", course_agent_node)
-    graph.add_node("deadline_agent", deadline_agent_node)
-    graph.add_node("revision_agent", revision_agent_node)
-    graph.add_node("research_agent", research_agent_node)
-    graph.add_node("graph_agent", graph_agent_node)
+    # Each node has a sync and an async implementation so the same graph
+    # serves invoke()/stream() and ainvoke(); every node records a trace span
+    # and falls back to NODE_FALLBACKS[name] if it overruns its time budget
+    def add_node(name, func, afunc=None):
+        fallback = NODE_FALLBACKS.get(name)
+        node = traced_node(name, deadlines.with_budget(name, func, fallback))
+        if afunc is not None:
+            node = RunnableLambda(node, afunc=traced_node(name, deadlines.awith_budget(name, afunc, fallback)))
+        graph.add_node(name, node)
+
+    add_node("router", router_node, arouter_node)
+    add_node("general_agent", general_agent_node, ageneral_agent_node)
+    add_node("course_agent", course_agent_node, acourse_agent_node)
+    add_node("deadline_agent", deadline_agent_node, adeadline_agent_node)
+    add_node("revision_agent", revision_agent_node, arevision_agent_node)
+    add_node("research_agent", research_agent_node, aresearch_agent_node)
+    add_node("graph_agent", graph_agent_node)
+    add_node("merge", merge_node)
 
     graph.set_entry_point("router")
 
@@ -170,7 +551,8 @@ def build_graph():
     })
 
     for node in ["general_agent", "course_agent", "deadline_agent", "revision_agent", "research_agent", "graph_agent"]:
-        graph.add_edge(node, END)
+        graph.add_edge(node, "merge")
+    graph.add_edge("merge", END)
 
     return graph.compile()
 
@@ -184,6 +566,22 @@ def get_graph():
     return _graph
 
 
+def _initial_state(messages: list, extra: dict = None) -> AgentState:
+    extra = extra or {}
+    return {
+        "messages": messages,
+        "intent": "",
+        "intents": [],
+        "last_intent": extra.get("last_intent") or get_last_intent(extra.get("session_id")),
+        "agent_response": "",
+        "responses": {},
+        "next_agent": "",
+        "extra": extra,
+        "speculation": None,
+        "deadline_action": None,
+    }
+
+
 def run_orchestrator(messages: list, extra: dict = None) -> dict:
     """
     Run the full multi-agent pipeline.
@@ -193,37 +591,60 @@ def run_orchestrator(messages: list, extra: dict = None) -> dict:
         extra: Optional extra data (file_bytes, source_type, url, topic_content)
 
     Returns:
-        {"response": str, "intent": str}
+        {"response": str, "intent": str, "intents": list[str]}
+        — "intent" is the main intent; compound messages list every agent that ran.
     """
     graph = get_graph()
+    with trace():
+        result = graph.invoke(_initial_state(messages, extra))
+    return {"response": result["agent_response"], "intent": result["intent"], "intents": result["intents"]}
+
+
+async def arun_orchestrator(messages: list, extra: dict = None) -> dict:
+    """Async run_orchestrator() — lets one process multiplex many concurrent requests."""
+    graph = get_graph()
+    with trace():
+        result = await graph.ainvoke(_initial_state(messages, extra))
+    return {"response": result["agent_response"], "intent": result["intent"], "intents": result["intents"]}
 
-    # If extra data provided (file upload, url), inject into course/revision agent directly
-    if extra:
-        intent = extra.get("force_intent", "")
-        if intent == "course_agent":
-            from agents.course_agent import run_course_agent
-            result = run_course_agent(
-                user_message=messages[-1]["content"],
-                source_type=extra.get("source_type", "text"),
-                source_content=extra.get("source_content", ""),
-                file_bytes=extra.get("file_bytes"),
-                url=extra.get("url", ""),
-            )
-            return {"response": result, "intent": "course_agent"}
-        elif intent == "revision_agent":
-            from agents.revision_agent import run_revision_agent
-            result = run_revision_agent(
-                user_message=messages[-1]["content"],
-                topic_content=extra.get("topic_content", ""),
-            )
-            return {"response": result, "intent": "revision_agent"}
-
-    initial_state: AgentState = {
-        "messages": messages,
-        "intent": "",
-        "agent_response": "",
-        "next_agent": "",
-    }
 
-    result = graph.invoke(initial_state)
-    return {"response": result["agent_response"], "intent": result["intent"]}
+def stream_orchestrator(messages: list, extra: dict = None, hedge: bool = False):
+    """
+    Streaming variant of run_orchestrator — yields tokens as the selected agent
+    generates them.
+
+    Yields:
+        {"type": "intent", "intent": str}                  once routing is decided
+        {"type": "token", "content": str}                  for each streamed token
+        {"type": "done", "response": str, "intent": str}   with the final formatted response
+
+    Agents that produce structured output (deadline actions, quizzes) and cached
+    responses stream nothing; their result only arrives with the "done" event.
+    Compound messages fan out to several agents at once — their tokens would
+    interleave, so nothing is streamed and the merged answer arrives with "done".
+    With hedge=True (Voice Mode) every LLM call is hedged, which also means the
+    reply arrives with "done" rather than token by token.
+    """
+    graph = get_graph()
+    intent = ""
+    parallel = False
+    response = ""
+
+    with trace(), hedged(hedge):
+        for mode, chunk in graph.stream(_initial_state(messages, extra), stream_mode=["messages", "updates"]):
+            if mode == "messages":
+                message, meta = chunk
+                if parallel or meta.get("langgraph_node") == "router":
+                    continue
+                if isinstance(message.content, str) and message.content:
+                    yield {"type": "token", "content": message.content}
+            else:
+                for node, update in chunk.items():
+                    if node == "router":
+                        intent = update["intent"]
+                        parallel = len(update["intents"]) > 1
+                        yield {"type": "intent", "intent": intent}
+                    elif node == "merge":
+                        response = update["agent_response"]
+
+    yield {"type": "done", "response": response, "intent": intent}
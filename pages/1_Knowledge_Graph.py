@@ -5,10 +5,21 @@ Knowledge Graph Page — interactive concept map from course materials.
 import streamlit as st
 import streamlit.components.v1 as components
 import os
+import time
 from dotenv import load_dotenv
+from ui import render_sidebar, client_id
+from tools.jobs import submit_job, latest_job, is_pending, clear_jobs, POLL_INTERVAL
 
 load_dotenv()
 
+# ── Session ───────────────────────────────────────────────────────────────────
+
+# Graph jobs are keyed by this id, so a running or finished graph is found again
+# after a rerun, a refresh or a trip to another page. It is the browser's
+# client_id(), so the jobs also queue as this student's work.
+if "jobs_owner" not in st.session_state:
+    st.session_state.jobs_owner = client_id()
+
 # ── Styles ────────────────────────────────────────────────────────────────────
 
 st.markdown("""
@@ -76,7 +87,6 @@ st.markdown("""
 
 # ── Sidebar ───────────────────────────────────────────────────────────────────
 
-from ui import render_sidebar
 render_sidebar("🕸️ Knowledge Graph")
 
 with st.sidebar:
@@ -114,7 +124,7 @@ with st.sidebar:
 
     st.markdown("---")
     if st.button("🗑️ Clear Graph", use_container_width=True):
-        st.session_state.pop("graph_result", None)
+        clear_jobs("graph", st.session_state.jobs_owner)
         st.rerun()
 
     st.markdown("""
@@ -170,13 +180,15 @@ elif input_mode == "🌐 From URL":
 
 # ── Generate Button ───────────────────────────────────────────────────────────
 
+graph_job = latest_job("graph", st.session_state.jobs_owner)
+
 st.markdown("---")
 col_btn, col_info = st.columns([2, 5])
 with col_btn:
     generate = st.button(
         "🧠 Generate Knowledge Graph",
         use_container_width=True,
-        disabled=not (source_ready and os.getenv("MISTRAL_API_KEY")),
+        disabled=not (source_ready and os.getenv("MISTRAL_API_KEY")) or is_pending(graph_job),
         type="primary"
     )
 with col_info:
@@ -190,15 +202,20 @@ with col_info:
 # ── Graph Generation ──────────────────────────────────────────────────────────
 
 if generate and source_ready and os.getenv("MISTRAL_API_KEY"):
-    with st.spinner("🧠 Extracting concepts and building knowledge graph... (~15–20 sec)"):
-        from agents.graph_agent import run_graph_agent
-        result = run_graph_agent(content_to_process, user_hint=user_hint)
-        st.session_state["graph_result"] = result
+    submit_job("graph", {"content": content_to_process, "user_hint": user_hint}, owner=st.session_state.jobs_owner)
+    graph_job = latest_job("graph", st.session_state.jobs_owner)
 
 # ── Graph Display ─────────────────────────────────────────────────────────────
 
-if "graph_result" in st.session_state:
-    result = st.session_state["graph_result"]
+if is_pending(graph_job):
+    label = "Queued" if graph_job["status"] == "queued" else "Extracting concepts and building knowledge graph"
+    st.info(f"🧠 {label}... (~15–20 sec) — you can keep browsing, the graph will be here when you come back.")
+
+elif graph_job and graph_job["status"] == "failed":
+    st.error(f"❌ Graph generation failed: {graph_job['error']}")
+
+elif graph_job and graph_job["status"] == "done":
+    result = graph_job["result"]
     stats = result["stats"]
     graph_data = result["graph_data"]
 
@@ -271,3 +288,7 @@ else:
         </div>
     </div>
     """, unsafe_allow_html=True)
+
+if is_pending(graph_job):
+    time.sleep(POLL_INTERVAL)
+    st.rerun()
@@ -168,7 +168,7 @@ init_session()
 
 # ── Sidebar ───────────────────────────────────────────────────────────────────
 
-from ui import render_sidebar
+from ui import render_sidebar, llm_spinner
 render_sidebar("👥 Collaborative Study Room")
 
 with st.sidebar:
@@ -420,12 +420,16 @@ with tab_chat:
 
         if ask_ai_btn and os.getenv("MISTRAL_API_KEY"):
             merged = get_merged_content(st.session_state.collab_room_code)
-            with st.spinner("🤖 AI thinking..."):
-                from agents.collab_agent import answer_room_question
-                ai_response = answer_room_question(
-                    chat_input.strip(), merged, st.session_state.collab_username
-                )
-            add_message(st.session_state.collab_room_code, "AI Assistant", "assistant", ai_response, "collab")
+            from tools.resilience import CircuitOpenError
+            try:
+                with llm_spinner("🤖 AI thinking...", st.session_state.collab_room_code):
+                    from agents.collab_agent import answer_room_question
+                    ai_response = answer_room_question(
+                        chat_input.strip(), merged, st.session_state.collab_username
+                    )
+                add_message(st.session_state.collab_room_code, "AI Assistant", "assistant", ai_response, "collab")
+            except CircuitOpenError as e:
+                add_message(st.session_state.collab_room_code, "system", "system", f"⏳ {e}")
 
         st.rerun()
 
@@ -485,13 +489,17 @@ with tab_quiz:
         st.info("📚 No materials uploaded yet. Share content first to generate a group quiz!")
     else:
         if st.button("🎯 Generate Group Quiz", type="primary", use_container_width=False):
-            with st.spinner("🤖 Building quiz from all materials..."):
-                from agents.collab_agent import generate_group_quiz
-                member_names = [m["username"] for m in members]
-                quiz = generate_group_quiz(merged, member_names)
-                st.session_state.quiz_data = quiz
-                st.session_state.quiz_answers = {}
-                st.session_state.quiz_submitted = False
+            from tools.resilience import CircuitOpenError
+            try:
+                with llm_spinner("🤖 Building quiz from all materials...", st.session_state.collab_room_code):
+                    from agents.collab_agent import generate_group_quiz
+                    member_names = [m["username"] for m in members]
+                    quiz = generate_group_quiz(merged, member_names)
+                    st.session_state.quiz_data = quiz
+                    st.session_state.quiz_answers = {}
+                    st.session_state.quiz_submitted = False
+            except CircuitOpenError as e:
+                st.warning(f"⏳ {e}")
 
         if st.session_state.quiz_data:
             quiz = st.session_state.quiz_data
@@ -587,12 +595,17 @@ with tab_graph:
                 st.info(f"✅ Graph cached — built at {built_at[11:16] if built_at else 'unknown'}. Rebuild if new materials were added.")
 
         if build_graph_btn:
-            with st.spinner("🧠 Building shared knowledge graph from all materials..."):
-                from agents.graph_agent import run_graph_agent
-                import json
-                result = run_graph_agent(merged, user_hint="This content comes from multiple students — show how their topics interconnect")
-                save_room_graph(st.session_state.collab_room_code, json.dumps(result))
-                st.session_state["collab_graph_result"] = result
+            from tools.resilience import CircuitOpenError
+            try:
+                with llm_spinner("🧠 Building shared knowledge graph from all materials...", st.session_state.collab_room_code):
+                    from agents.graph_agent import run_graph_agent
+                    import json
+                    result = run_graph_agent(merged, user_hint="This content comes from multiple students — show how their topics interconnect")
+                    save_room_graph(st.session_state.collab_room_code, json.dumps(result))
+                    st.session_state["collab_graph_result"] = result
+            except CircuitOpenError as e:
+                st.warning(f"⏳ {e}")
+            else:
                 st.rerun()
 
         # Load from cache or session
@@ -6,6 +6,7 @@ Speech-to-Text via Web Speech API (browser), Text-to-Speech via gTTS.
 import streamlit as st
 import streamlit.components.v1 as components
 import os
+import uuid
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -122,6 +123,7 @@ def init_state():
         "tts_language": "en",
         "tts_enabled": True,
         "voice_pending_input": "",
+        "voice_session_id": uuid.uuid4().hex,
     }
     for k, v in defaults.items():
         if k not in st.session_state:
@@ -149,7 +151,7 @@ AGENT_ICONS = {
 
 
 # ── Sidebar ───────────────────────────────────────────────────────────────────
-from ui import render_sidebar
+from ui import render_sidebar, llm_spinner
 render_sidebar("🎤 Voice Mode")
 
 with st.sidebar:
@@ -178,6 +180,7 @@ with st.sidebar:
     if st.button("🗑️ Clear Conversation", use_container_width=True):
         st.session_state.voice_messages = []
         st.session_state.voice_transcript = ""
+        st.session_state.voice_session_id = uuid.uuid4().hex
         st.rerun()
 
     st.markdown("""
@@ -529,10 +532,28 @@ def process_voice_input(user_text: str, via_voice: bool = False):
         for m in st.session_state.voice_messages
     ]
 
-    with st.spinner("🤖 Thinking..."):
+    from tools.resilience import CircuitOpenError
+
+    with llm_spinner("🤖 Thinking..."):
         try:
-            from agents.orchestrator import run_orchestrator
-            result = run_orchestrator(history)
+            from orchestrator import stream_orchestrator
+            result = {"response": "", "intent": "general"}
+
+            def token_stream():
+                for event in stream_orchestrator(
+                    history, extra={"session_id": st.session_state.voice_session_id}, hedge=True
+                ):
+                    if event["type"] == "token":
+                        yield event["content"]
+                    elif event["type"] == "done":
+                        result.update(response=event["response"], intent=event["intent"])
+
+            # Show the reply below the conversation (hedged replies arrive in one piece)
+            with chat_area:
+                st.markdown('<div class="chat-bubble-ai">', unsafe_allow_html=True)
+                st.write_stream(token_stream())
+                st.markdown('</div>', unsafe_allow_html=True)
+
             response_text = result["response"]
             intent = result["intent"]
 
@@ -548,6 +569,13 @@ def process_voice_input(user_text: str, via_voice: bool = False):
                 "intent": intent,
                 "tts_b64": tts_b64,
             })
+        except CircuitOpenError as e:
+            st.session_state.voice_messages.append({
+                "role": "assistant",
+                "content": f"⏳ Mistral is overloaded right now. Please try again in {e.retry_in} seconds.",
+                "intent": "error",
+                "tts_b64": "",
+            })
         except Exception as e:
             st.session_state.voice_messages.append({
                 "role": "assistant",
@@ -572,3 +600,8 @@ if st.session_state.get("voice_pending_input"):
     pending = st.session_state.voice_pending_input
     st.session_state.voice_pending_input = ""
     process_voice_input(pending, via_voice=True)
+
+# ── Warm-up ───────────────────────────────────────────────────────────────────
+# Load the agent pipeline in the background so the first question doesn't wait for it
+from tools.coldstart import preload
+preload("orchestrator")
@@ -7,11 +7,20 @@ import streamlit as st
 import streamlit.components.v1 as components
 import os
 import json
+import time
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from ui import render_sidebar, llm_spinner, client_id
+from tools.jobs import submit_job, latest_job, is_pending, clear_jobs, POLL_INTERVAL
 
 load_dotenv()
 
+# Report jobs are keyed by this id, so a report still being written is picked
+# up again after a rerun, a refresh or a trip to another page. It is the browser's
+# client_id(), so the jobs also queue as this student's work.
+if "jobs_owner" not in st.session_state:
+    st.session_state.jobs_owner = client_id()
+
 # ── Styles ─────────────────────────────────────────────────────────────────────
 st.markdown("""
 <style>
@@ -161,7 +170,6 @@ st.markdown("""
 
 
 # ── Sidebar ───────────────────────────────────────────────────────────────────
-from ui import render_sidebar
 render_sidebar("📊 Smart Dashboard")
 
 with st.sidebar:
@@ -181,7 +189,7 @@ with st.sidebar:
         st.rerun()
 
     if st.button("🔄 Refresh Dashboard", use_container_width=True):
-        st.session_state.pop("ai_report", None)
+        clear_jobs("weekly_report", st.session_state.jobs_owner)
         st.session_state.pop("ai_insight", None)
         st.rerun()
 
@@ -226,15 +234,20 @@ st.markdown(
 # ── AI Quick Insight ──────────────────────────────────────────────────────────
 if os.getenv("MISTRAL_API_KEY"):
     if "ai_insight" not in st.session_state:
-        with st.spinner("🤖 Generating AI insight..."):
-            from agents.analytics_agent import get_quick_insight
-            st.session_state["ai_insight"] = get_quick_insight(summary)
-
-    st.markdown(f"""
-    <div class="insight-box">
-        🤖 <strong>AI Coach Says:</strong><br>{st.session_state["ai_insight"]}
-    </div>
-    """, unsafe_allow_html=True)
+        from tools.resilience import CircuitOpenError
+        try:
+            with llm_spinner("🤖 Generating AI insight..."):
+                from agents.analytics_agent import get_quick_insight
+                st.session_state["ai_insight"] = get_quick_insight(summary)
+        except CircuitOpenError as e:
+            st.warning(f"⏳ AI insight unavailable right now. {e}")
+
+    if "ai_insight" in st.session_state:
+        st.markdown(f"""
+        <div class="insight-box">
+            🤖 <strong>AI Coach Says:</strong><br>{st.session_state["ai_insight"]}
+        </div>
+        """, unsafe_allow_html=True)
 
 
 # ── KPI Row ───────────────────────────────────────────────────────────────────
@@ -506,36 +519,174 @@ else:
     st.info("No deadlines tracked yet. Add some from the main chat!")
 
 
+# ── Pipeline Latency ──────────────────────────────────────────────────────────
+st.markdown('<div class="section-header">⏱️ Pipeline Latency</div>', unsafe_allow_html=True)
+
+from tools.tracing import get_latency_stats
+latency = get_latency_stats(selected_days)
+if latency:
+    import pandas as pd
+
+    KIND_LABELS = {"node": "🧩 Node", "llm": "🤖 LLM call", "tool": "🔧 Tool"}
+    df_latency = pd.DataFrame([
+        {
+            "Step": s["name"],
+            "Type": KIND_LABELS.get(s["kind"], s["kind"]),
+            "Calls": s["count"],
+            "p50 (ms)": s["p50_ms"],
+            "p95 (ms)": s["p95_ms"],
+            "p99 (ms)": s["p99_ms"],
+            "Queue (ms)": s["avg_queue_ms"],
+            "Prompt tokens": s["avg_prompt_tokens"],
+            "Cache hit %": None if s["cache_hit_rate"] is None else round(s["cache_hit_rate"] * 100, 1),
+            "Errors": s["errors"],
+            "Timeouts": s["timeouts"],
+        }
+        for s in latency
+    ])
+    st.dataframe(df_latency, use_container_width=True, hide_index=True)
+else:
+    st.info("No traces recorded yet. Chat with the assistant to collect latency data.")
+
+from tools.context_budget import get_context_budget_stats
+budget_stats = get_context_budget_stats()
+if budget_stats:
+    prompts = sum(s["prompts"] for s in budget_stats.values())
+    used = sum(s["used_tokens"] for s in budget_stats.values())
+    available = sum(s["budget_tokens"] for s in budget_stats.values())
+    cut = sum(s["truncated"] + s["dropped"] for s in budget_stats.values())
+    st.caption(
+        f"Context budget: {prompts} prompts with course material used {used / available:.0%} of their "
+        f"models' context on average; material was cut to fit {cut} time(s)."
+    )
+
+from tools.route_cache import get_route_cache_stats
+route_stats = get_route_cache_stats()
+if route_stats["hits"] + route_stats["misses"]:
+    col_r1, col_r2, col_r3 = st.columns(3)
+    col_r1.metric("Route cache hit rate", f"{route_stats['hit_rate']:.0%}",
+                  help="Messages the LLM router would have classified, answered from earlier decisions instead")
+    col_r2.metric("Router calls saved", route_stats["hits"])
+    col_r3.metric("Cached decisions", f"{route_stats['entries']:,} / {route_stats['max_entries']:,}")
+
+from tools.speculation import get_speculation_stats
+spec_stats = get_speculation_stats()
+if spec_stats["started"]:
+    col_s1, col_s2, col_s3 = st.columns(3)
+    col_s1.metric("Speculation hit rate", f"{spec_stats['hit_rate']:.0%}",
+                  help=f"{spec_stats['hits']} hits / {spec_stats['misses']} misses / {spec_stats['timeouts']} timed out since the app started")
+    col_s2.metric("Latency saved", f"{spec_stats['saved_ms'] / 1000:.1f} s")
+    col_s3.metric("Avg saved per hit", f"{spec_stats['avg_saved_ms']:.0f} ms")
+
+from tools.singleflight import get_singleflight_stats
+flight_stats = get_singleflight_stats()
+if flight_stats["waiters"]:
+    col_f1, col_f2, col_f3 = st.columns(3)
+    col_f1.metric("Coalesced LLM calls", flight_stats["waiters"],
+                  help="Identical requests that waited on an in-flight call instead of hitting the API")
+    col_f2.metric("Coalesced share", f"{flight_stats['coalesced_rate']:.0%}")
+    col_f3.metric("Peak waiters on one call", max(s["max_waiters"] for s in flight_stats["agents"].values()))
+
+from tools.hedging import get_hedging_stats
+hedge_stats = get_hedging_stats()
+if hedge_stats["hedged"]:
+    col_e1, col_e2, col_e3 = st.columns(3)
+    col_e1.metric("Hedged LLM calls", hedge_stats["hedged"],
+                  help="Slow calls that fired a second identical request; the first answer won")
+    col_e2.metric("Hedge rate", f"{hedge_stats['hedge_rate']:.0%}",
+                  help=f"Capped at {hedge_stats['max_rate']:.0%} of calls")
+    col_e3.metric("Hedge win rate", f"{hedge_stats['hedge_win_rate']:.0%}",
+                  help="Share of hedges where the second request answered first")
+
+
+# ── Mistral API Health ────────────────────────────────────────────────────────
+st.markdown('<div class="section-header">🛡️ Mistral API Health</div>', unsafe_allow_html=True)
+
+from tools.resilience import get_resilience_stats
+health = get_resilience_stats()
+CIRCUIT_LABELS = {"closed": "🟢 Healthy", "half_open": "🟡 Probing", "open": "🔴 Paused"}
+
+col_h1, col_h2, col_h3, col_h4 = st.columns(4)
+col_h1.metric(
+    "Circuit", CIRCUIT_LABELS.get(health["circuit"], health["circuit"]),
+    help=f"Retrying in {health['retry_in']:.0f}s" if health["circuit"] == "open"
+    else f"{health['consecutive_failures']} consecutive failures",
+)
+col_h2.metric("Requests left / min", f"{max(0, health['requests_available'])} / {health['requests_per_minute']}")
+col_h3.metric("Tokens left / min", f"{max(0, health['tokens_available']):,} / {health['tokens_per_minute']:,}")
+col_h4.metric("Retries", health["retries"],
+              help=f"{health['failures']} failed attempts, {health['rate_limited']} rate-limited (429), "
+                   f"{health['rejected']} fast-failed while the circuit was open")
+if health["throttled_ms"]:
+    st.caption(f"Rate limiter held requests for {health['throttled_ms'] / 1000:.1f}s in total since the app started.")
+
+from tools.fairshare import get_fairshare_stats
+queue = get_fairshare_stats()
+if queue["granted"] or queue["rejected"]:
+    col_q1, col_q2, col_q3, col_q4 = st.columns(4)
+    col_q1.metric("LLM slots in use", f"{queue['in_flight']} / {queue['slots']}",
+                  help=f"{queue['queue_depth']} waiting across {queue['queued_groups']} users/rooms (max {queue['max_queue']})")
+    col_q2.metric("Queued share", f"{queue['queued_rate']:.0%}",
+                  help=f"{queue['queued']} of {queue['granted']} requests waited for a slot")
+    col_q3.metric("Queue wait p50 / p95", f"{queue['p50_wait_ms']:.0f} / {queue['p95_wait_ms']:.0f} ms")
+    col_q4.metric("Rejected (queue full)", queue["rejected"],
+                  help=f"{queue['abandoned']} gave up waiting at their time budget")
+
+from tools.structured import get_structured_stats
+parse_stats = get_structured_stats()
+if parse_stats:
+    import pandas as pd
+
+    st.dataframe(pd.DataFrame([
+        {
+            "Agent": agent,
+            "Replies": s["clean"] + s["repaired"] + s["failed"],
+            "Repaired %": round(s["repair_rate"] * 100, 1),
+            "Parse failure %": round(s["failure_rate"] * 100, 1),
+            "Retries": s["retried"],
+            "Unusable": s["unrecovered"],
+        }
+        for agent, s in parse_stats.items()
+    ]), use_container_width=True, hide_index=True)
+    st.caption("Structured (JSON) replies per agent. Repaired replies were fixed locally; "
+               "failed ones triggered one retry, and unusable ones fell back to the raw text.")
+
+
 # ── AI Weekly Report ──────────────────────────────────────────────────────────
 st.markdown('<div class="section-header">🤖 AI Weekly Study Report</div>', unsafe_allow_html=True)
 
+report_job = latest_job("weekly_report", st.session_state.jobs_owner)
+ai_report = report_job["result"] if report_job and report_job["status"] == "done" else None
+
 col_gen, col_dl = st.columns([2, 1])
 with col_gen:
     generate_btn = st.button(
         "🧠 Generate My AI Report",
         type="primary",
         use_container_width=False,
-        disabled=not os.getenv("MISTRAL_API_KEY"),
+        disabled=not os.getenv("MISTRAL_API_KEY") or is_pending(report_job),
     )
 with col_dl:
-    if "ai_report" in st.session_state:
+    if ai_report:
         st.download_button(
             "📥 Download Report",
-            data=st.session_state["ai_report"],
+            data=ai_report,
             file_name=f"study_report_{datetime.now().strftime('%Y%m%d')}.md",
             mime="text/markdown",
         )
 
 if generate_btn:
-    with st.spinner("🤖 Analyzing your data and writing your personalized report..."):
-        from agents.analytics_agent import generate_weekly_report
-        report = generate_weekly_report(summary)
-        st.session_state["ai_report"] = report
+    submit_job("weekly_report", {"analytics_data": summary}, owner=st.session_state.jobs_owner)
     st.rerun()
 
-if "ai_report" in st.session_state:
+if is_pending(report_job):
+    st.info("🤖 Analyzing your data and writing your personalized report... "
+            "you can keep browsing, it will be here when you come back.")
+elif report_job and report_job["status"] == "failed":
+    st.error(f"❌ Report generation failed: {report_job['error']}")
+elif ai_report:
     st.markdown('<div class="report-container">', unsafe_allow_html=True)
-    st.markdown(st.session_state["ai_report"])
+    st.markdown(ai_report)
     st.markdown('</div>', unsafe_allow_html=True)
 else:
     st.markdown("""
@@ -548,3 +699,7 @@ else:
         </div>
     </div>
     """, unsafe_allow_html=True)
+
+if is_pending(report_job):
+    time.sleep(POLL_INTERVAL)
+    st.rerun()
@@ -0,0 +1,25 @@
+import json
+from datetime import date
+
+from tools import cassette
+
+
+def _key_on(day, monkeypatch):
+    class Today(date):
+        @classmethod
+        def today(cls):
+            return day
+
+    monkeypatch.setattr(cassette, "date", Today)
+    body = json.dumps({"messages": [{"role": "system", "content": f"Today's date is: {day.isoformat()}"}]})
+    return cassette.request_key("POST", "/v1/chat/completions", body.encode())
+
+
+def test_key_ignores_todays_date(monkeypatch):
+    assert _key_on(date(2026, 3, 1), monkeypatch) == _key_on(date(2026, 3, 2), monkeypatch)
+
+
+def test_key_keeps_other_dates():
+    first = cassette.request_key("POST", "/v1/chat/completions", b'{"due": "2001-01-01"}')
+    second = cassette.request_key("POST", "/v1/chat/completions", b'{"due": "2001-01-02"}')
+    assert first != second
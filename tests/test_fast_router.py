@@ -0,0 +1,40 @@
+import pytest
+
+from tools.fast_router import fast_route, is_follow_up
+
+
+@pytest.mark.parametrize("message", [
+    "another one",
+    "One more please!",
+    "make it harder",
+    "ok next",
+    "okay harder",
+    "mark that done",
+    "and delete it",
+    "what about chapter 3?",
+])
+def test_continuations_are_follow_ups(message):
+    assert is_follow_up(message)
+
+
+@pytest.mark.parametrize("message", [
+    "What is backpropagation and how does it work?",
+    "Can you explain this theorem from linear algebra",
+    "is it due tomorrow",
+    "do that for chemistry",
+    "how do I know when to use them",
+    "what about the big exam next year for my physics course",
+    "next, let's switch to something else",
+])
+def test_full_questions_with_pronouns_are_not_follow_ups(message):
+    assert not is_follow_up(message)
+
+
+@pytest.mark.parametrize("message", ["hi", "hello there!", "thanks", "ok"])
+def test_greetings_route_to_general(message):
+    assert fast_route(message) == ("general", 0.95)
+
+
+@pytest.mark.parametrize("message", ["ok next", "okay harder", "thanks, now quiz me on chapter 2"])
+def test_greeting_does_not_swallow_the_rest_of_the_message(message):
+    assert fast_route(message) != ("general", 0.95)
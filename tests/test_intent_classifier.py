@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from tools import intent_classifier
+
+TEMPLATES = {
+    "deadline_agent": ["when is my {} assignment due", "add a deadline for {} on friday",
+                       "show my deadlines for {}", "remind me the {} essay is due monday"],
+    "research_agent": ["find papers on {}", "search the web for {} resources",
+                       "look up articles about {}", "research {} for me"],
+    "quiz_agent": ["quiz me on {}", "give me a test about {}",
+                   "make quiz questions on {}", "test my knowledge of {}"],
+}
+SUBJECTS = ["biology", "chemistry", "calculus", "history", "physics", "economics", "literature", "statistics"]
+THRESHOLD = 0.9   # orchestrator.CLASSIFIER_THRESHOLD default
+
+
+@pytest.fixture(scope="module")
+def model():
+    rng = random.Random(1)
+    examples = [{"message": rng.choice(t).format(rng.choice(SUBJECTS)), "intent": intent}
+                for _ in range(60) for intent, t in TEMPLATES.items()]
+    report = intent_classifier.evaluate(examples)
+    model = intent_classifier.train(examples)
+    model["temperature"] = report["temperature"]
+    model["holdout_accuracy"] = report["accuracy"]
+    model["holdout_size"] = report["test_size"]
+    return model
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("quiz me on physics", "quiz_agent"),
+    ("when is the history essay due", "deadline_agent"),
+    ("search for economics papers", "research_agent"),
+])
+def test_known_messages_are_confident(model, message, intent):
+    assert intent_classifier.predict(model, message) == (intent, pytest.approx(1.0, abs=1 - THRESHOLD))
+
+
+@pytest.mark.parametrize("message", [
+    "tell me a joke about chemistry",
+    "I feel stressed about school",
+    "hello",
+])
+def test_unfamiliar_messages_do_not_saturate(model, message):
+    assert intent_classifier.predict(model, message)[1] < THRESHOLD
+
+
+def test_model_without_good_holdout_is_not_trusted(model):
+    assert intent_classifier._trusted(model)
+    assert not intent_classifier._trusted({**model, "holdout_accuracy": 0.7})
+    assert not intent_classifier._trusted({k: v for k, v in model.items() if k != "holdout_accuracy"})
@@ -0,0 +1,115 @@
+import pytest
+
+from tools import structured
+from tools.structured import SCHEMAS, _repair, extract_json, validate
+
+
+# ── _repair ────────────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1,}', {"a": 1}),
+    ('{"a": [1, 2,],}', {"a": [1, 2]}),
+    ('{"a": [1, 2}', {"a": [1, 2]}),
+    ('{"a": "unterminated', {"a": "unterminated"}),
+    ('{"a": 1, "b": [{"x": 1}, {"x": 2', {"a": 1, "b": [{"x": 1}, {"x": 2}]}),
+    ('{"a": 1, "b": tru', {"a": 1}),
+    ('{"a": "ends in an escape \\', {"a": "ends in an escape "}),
+])
+def test_repair_fixes_commas_closers_and_truncation(text, expected):
+    assert _repair(text, 0) == expected
+
+
+def test_repair_stops_at_the_end_of_the_value():
+    assert _repair('{"a": {"b": 1}} trailing {"c": 2}', 0) == {"a": {"b": 1}}
+
+
+def test_repair_gives_up_on_garbage():
+    assert _repair("{: :}", 0) is None
+
+
+# ── extract_json ───────────────────────────────────────────────────────────────
+
+def test_extract_clean_object_inside_prose_and_fences():
+    raw = 'Sure! Here it is:\n```json\n{"action": "list", "data": {}}\n```\nAnything else?'
+    assert extract_json(raw) == ({"action": "list", "data": {}}, False)
+
+
+def test_extract_repairs_a_truncated_reply_as_a_whole():
+    raw = '{"questions": [{"id": 1, "question": "Q1", "answer": "A"}, {"id": 2, "quest'
+    value, repaired = extract_json(raw)
+    assert repaired
+    assert value["questions"][0] == {"id": 1, "question": "Q1", "answer": "A"}
+
+
+def test_extract_skips_braces_that_are_not_objects():
+    assert extract_json('Use {curly} braces: {"ok": true}') == ({"ok": True}, False)
+
+
+def test_extract_without_an_object():
+    assert extract_json("no json here [1, 2]") == (None, False)
+
+
+# ── validate ───────────────────────────────────────────────────────────────────
+
+def test_validate_accepts_a_complete_reply():
+    value = {"action": "add", "data": {"title": "Essay"}, "user_message": "Added!"}
+    assert validate(value, SCHEMAS["deadline_action"]) == ([], 0)
+
+
+@pytest.mark.parametrize("value, error", [
+    ({}, "'action' is missing"),
+    ({"action": "launch"}, "action should be one of"),
+    ({"action": "add", "data": []}, "data should be object"),
+    ([], "value should be object"),
+])
+def test_validate_reports_problems(value, error):
+    errors, _ = validate(value, SCHEMAS["deadline_action"])
+    assert any(e.startswith(error) for e in errors)
+
+
+def test_validate_drops_malformed_items():
+    value = {"questions": [{"id": 1, "question": "Q1", "answer": "A"}, {"id": 2, "question": "Q2"}]}
+    errors, dropped = validate(value, SCHEMAS["quiz"])
+    assert (errors, dropped) == ([], 1)
+    assert [q["id"] for q in value["questions"]] == [1]
+
+
+def test_validate_fails_when_no_item_survives():
+    errors, dropped = validate({"cards": [{"id": 1}]}, SCHEMAS["flashcards"])
+    assert dropped == 1
+    assert errors == ["cards needs at least 1 valid item(s)"]
+
+
+def test_validate_does_not_take_booleans_for_numbers():
+    errors, _ = validate(True, {"type": "integer"})
+    assert errors == ["value should be integer"]
+
+
+# ── Stats ──────────────────────────────────────────────────────────────────────
+
+class _Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class _LLM:
+    agent = "test_agent"
+    model = "test-model"
+    temperature = 0.0
+    max_tokens = None
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+
+    def invoke(self, messages, **kwargs):
+        return _Reply(self.replies.pop(0))
+
+
+def test_unusable_reply_is_counted_once():
+    from agents.deadline_agent import parse_llm_action
+    structured._stats.pop("test_agent", None)
+    parsed, raw = structured.invoke_structured(_LLM("no json", "still none"), [], "deadline_action")
+    action = parse_llm_action(raw, parsed)
+    assert action["action"] == "chat"
+    stats = structured.get_structured_stats()["test_agent"]
+    assert (stats["failed"], stats["retried"], stats["unrecovered"]) == (2, 1, 1)
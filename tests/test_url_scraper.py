@@ -0,0 +1,11 @@
+import asyncio
+
+import pytest
+
+from tools.url_scraper import ascrape_url, scrape_url
+
+
+@pytest.mark.parametrize("url", ["http://[::1", "http://a\x00b.com", "not a url"])
+def test_malformed_urls_return_an_error_string(url):
+    assert scrape_url(url).startswith("Error fetching URL:")
+    assert asyncio.run(ascrape_url(url)).startswith("Error fetching URL:")
@@ -0,0 +1,192 @@
+"""
+LLM Cassettes — record Mistral API traffic to disk and replay it offline.
+Sits in the httpx transport of the pooled clients in tools/llm.py, so every
+ChatMistralAI request (plain or streamed) is captured byte-for-byte.
+
+    LLM_CASSETTE_MODE=record  python ...   # call the API, save each exchange
+    LLM_CASSETTE_MODE=replay  python ...   # serve saved exchanges, no network
+
+Exchanges are keyed by a hash of the method, path and JSON body, so a replay
+is deterministic for a deterministic caller. While a mode is active the
+response cache in tools/llm_cache.py is bypassed, so recordings are complete
+and replays exercise the same code path as the recording.
+
+Several prompts (the deadline agent, the tool-calling router) include today's
+date, so today's date is redacted from the body before hashing and a cassette
+recorded one day still replays the next. Other dates are hashed as they are:
+deadlines computed relative to today (e.g. "due in 3 days" seeded into the
+database) still change the request, so fixtures that replay across days
+should use fixed dates.
+
+Summarize a cassette directory with:
+    python -m tools.cassette
+"""
+
+import os
+import json
+import hashlib
+from datetime import date
+import httpx
+
+CASSETTE_DIR = os.getenv(
+    "LLM_CASSETTE_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "data", "cassettes"),
+)
+# Resolves to project_root/data/cassettes unless overridden
+
+MODES = ("record", "replay")
+TODAY_PLACEHOLDER = b"<today>"   # stands in for today's date in request keys
+
+
+class CassetteMiss(RuntimeError):
+    """Replay mode found no recording for a request."""
+
+
+def get_mode() -> str | None:
+    mode = (os.getenv("LLM_CASSETTE_MODE") or "").strip().lower()
+    return mode if mode in MODES else None
+
+
+def request_key(method: str, path: str, body: bytes) -> str:
+    try:
+        # Canonical JSON so key order / whitespace differences don't matter
+        body = json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False).encode("utf-8")
+    except ValueError:
+        pass
+    body = body.replace(date.today().isoformat().encode(), TODAY_PLACEHOLDER)
+    return hashlib.sha256(method.encode() + b" " + path.encode() + b"\n" + body).hexdigest()
+
+
+def _path(key: str) -> str:
+    return os.path.join(CASSETTE_DIR, f"{key}.json")
+
+
+def _key_for(request: httpx.Request) -> str:
+    return request_key(request.method, request.url.path, request.content)
+
+
+def _save(key: str, request: httpx.Request, status: int, headers: httpx.Headers, body: bytes):
+    os.makedirs(CASSETTE_DIR, exist_ok=True)
+    entry = {
+        "request": {
+            "method": request.method,
+            "path": request.url.path,
+            "body": request.content.decode("utf-8", errors="replace"),
+        },
+        "response": {
+            "status": status,
+            "content_type": headers.get("content-type", "application/json"),
+            "body": body.decode("utf-8", errors="replace"),
+        },
+    }
+    tmp = _path(key) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, _path(key))
+
+
+def _load(key: str, request: httpx.Request) -> httpx.Response:
+    try:
+        with open(_path(key), encoding="utf-8") as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        raise CassetteMiss(
+            f"No recording for {request.method} {request.url.path} ({key[:12]}). "
+            "Re-run with LLM_CASSETTE_MODE=record against the real API."
+        ) from None
+    response = entry["response"]
+    return httpx.Response(
+        response["status"],
+        headers={"content-type": response["content_type"]},
+        content=response["body"].encode("utf-8"),
+        request=request,
+    )
+
+
+# ── Transports ─────────────────────────────────────────────────────────────────
+
+class CassetteTransport(httpx.BaseTransport):
+    def __init__(self, mode: str, inner: httpx.BaseTransport):
+        self.mode = mode
+        self.inner = inner
+
+    @property
+    def _pool(self):
+        # Lets tools.llm.get_pool_stats() see through to the real connection pool
+        return getattr(self.inner, "_pool", None)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key = _key_for(request)
+        if self.mode == "replay":
+            return _load(key, request)
+
+        response = self.inner.handle_request(request)
+        body = response.read()
+        response.close()
+        _save(key, request, response.status_code, response.headers, body)
+        return httpx.Response(response.status_code, headers=response.headers, content=body, request=request)
+
+    def close(self):
+        self.inner.close()
+
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    def __init__(self, mode: str, inner: httpx.AsyncBaseTransport):
+        self.mode = mode
+        self.inner = inner
+
+    @property
+    def _pool(self):
+        return getattr(self.inner, "_pool", None)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = _key_for(request)
+        if self.mode == "replay":
+            return _load(key, request)
+
+        response = await self.inner.handle_async_request(request)
+        body = await response.aread()
+        await response.aclose()
+        _save(key, request, response.status_code, response.headers, body)
+        return httpx.Response(response.status_code, headers=response.headers, content=body, request=request)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+def wrap_transport(inner: httpx.BaseTransport) -> httpx.BaseTransport:
+    mode = get_mode()
+    return CassetteTransport(mode, inner) if mode else inner
+
+
+def wrap_async_transport(inner: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+    mode = get_mode()
+    return AsyncCassetteTransport(mode, inner) if mode else inner
+
+
+# ── CLI ────────────────────────────────────────────────────────────────────────
+
+def summarize() -> dict:
+    """Count recorded exchanges per path and status."""
+    summary = {"dir": os.path.abspath(CASSETTE_DIR), "exchanges": 0, "bytes": 0, "by_path": {}}
+    if not os.path.isdir(CASSETTE_DIR):
+        return summary
+    for name in os.listdir(CASSETTE_DIR):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(CASSETTE_DIR, name)
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+        label = f"{entry['request']['method']} {entry['request']['path']} -> {entry['response']['status']}"
+        summary["by_path"][label] = summary["by_path"].get(label, 0) + 1
+        summary["exchanges"] += 1
+        summary["bytes"] += os.path.getsize(path)
+    return summary
+
+
+if __name__ == "__main__":
+    s = summarize()
+    print(f"Cassettes in {s['dir']}: {s['exchanges']} exchanges, {s['bytes'] / 1024:.1f} KiB")
+    for label, count in sorted(s["by_path"].items()):
+        print(f"  {count:5d}  {label}")
+    print(f"Mode: {get_mode() or 'off'} (set LLM_CASSETTE_MODE=record|replay)")
@@ -0,0 +1,180 @@
+"""
+Cold Start — keep the first render of each page cheap, and measure it.
+
+Heavy libraries (LangGraph, the Mistral client, pandas/altair, PyMuPDF,
+python-pptx, BeautifulSoup, pyvis/networkx) are imported inside the functions
+that use them, and SQLite tables are created on first connection instead of at
+import. preload() then warms the chat pipeline in a background thread once a
+page is on screen, so the first message doesn't pay for it either.
+
+Report per-page import cost (fresh interpreter, python -X importtime) with:
+    python -m tools.coldstart [--save] [--top 6] [target ...]
+Targets are page scripts (app.py, pages/*.py) or module names (orchestrator).
+--save appends the run to data/coldstart.db and shows the change since the
+previous saved run.
+"""
+
+import sqlite3
+import os
+import importlib
+import json
+import subprocess
+import sys
+import threading
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DB_PATH = os.path.join(ROOT, "data", "coldstart.db")
+
+TIMEOUT = 180  # seconds per target
+
+_preloaded = set()
+_preload_lock = threading.Lock()
+
+
+# ── Preloading ─────────────────────────────────────────────────────────────────
+
+def _import_all(modules: list[str]):
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass  # the real import on first use raises it where it can be shown
+
+
+def preload(*modules: str):
+    """Import modules in a daemon thread, once per process, without blocking the page."""
+    with _preload_lock:
+        pending = [m for m in modules if m not in _preloaded and m not in sys.modules]
+        _preloaded.update(pending)
+    if pending:
+        threading.Thread(target=_import_all, args=(pending,), name="preload", daemon=True).start()
+
+
+# ── Measurement ────────────────────────────────────────────────────────────────
+
+# Runs in a fresh interpreter: renders a page once with Streamlit's test harness
+# (pages are reached through app.py, as in the real multipage app) or imports a
+# module, and prints how long that took.
+_PROBE = """
+import sys, time
+target = sys.argv[1]
+if target.endswith(".py"):
+    from streamlit.testing.v1 import AppTest
+    start = time.perf_counter()
+    at = AppTest.from_file("app.py", default_timeout=%d)
+    if target != "app.py":
+        at.switch_page(target)
+    at.run()
+    if at.exception:
+        sys.exit(at.exception[0].value)
+else:
+    start = time.perf_counter()
+    __import__(target)
+print("COLDSTART_MS", (time.perf_counter() - start) * 1000)
+""" % TIMEOUT
+
+
+def default_targets() -> list[str]:
+    pages = sorted(f"pages/{f}" for f in os.listdir(os.path.join(ROOT, "pages")) if f.endswith(".py"))
+    return ["app.py", *pages, "orchestrator"]
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Total import time, module count and self-time per top-level package from -X importtime output."""
+    packages = {}
+    modules = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+        modules += 1
+    return {
+        "import_ms": round(sum(packages.values()) / 1000, 1),
+        "modules": modules,
+        "packages": {p: round(us / 1000, 1) for p, us in sorted(packages.items(), key=lambda kv: -kv[1])},
+    }
+
+
+def measure(target: str) -> dict:
+    """Cold-start cost of one page script or module, in a fresh interpreter."""
+    # An empty key keeps pages from calling Mistral (load_dotenv never overrides it)
+    env = {**os.environ, "MISTRAL_API_KEY": "", "PYTHONDONTWRITEBYTECODE": "1"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE, target],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=TIMEOUT,
+    )
+    render_ms = None
+    for line in proc.stdout.splitlines():
+        if line.startswith("COLDSTART_MS"):
+            render_ms = round(float(line.split()[1]), 1)
+    if render_ms is None:
+        errors = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+        raise RuntimeError(f"{target} failed to load:\n" + "\n".join(errors[-10:]))
+    return {"target": target, "render_ms": render_ms, **parse_importtime(proc.stderr)}
+
+
+# ── History ────────────────────────────────────────────────────────────────────
+
+def get_connection():
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cold_starts (
+            id           INTEGER PRIMARY KEY AUTOINCREMENT,
+            target       TEXT    NOT NULL,
+            render_ms    REAL    NOT NULL,
+            import_ms    REAL    NOT NULL,
+            modules      INTEGER NOT NULL,
+            packages     TEXT    NOT NULL,
+            measured_at  TEXT    DEFAULT (datetime('now'))
+        )
+    """)
+    return conn
+
+
+def previous_run(target: str) -> dict | None:
+    """The last saved measurement for a target, or None."""
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT * FROM cold_starts WHERE target = ? ORDER BY id DESC LIMIT 1", (target,)
+    ).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+
+def save_run(result: dict):
+    conn = get_connection()
+    conn.execute(
+        "INSERT INTO cold_starts (target, render_ms, import_ms, modules, packages) VALUES (?,?,?,?,?)",
+        (result["target"], result["render_ms"], result["import_ms"], result["modules"],
+         json.dumps(result["packages"]))
+    )
+    conn.commit()
+    conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cold-start import cost per page")
+    parser.add_argument("targets", nargs="*", help="page scripts or module names (default: every page + orchestrator)")
+    parser.add_argument("--top", type=int, default=6, help="heaviest packages to list per target")
+    parser.add_argument("--save", action="store_true", help="record this run in data/coldstart.db")
+    args = parser.parse_args()
+
+    print(f"{'target':28s} {'render ms':>10s} {'import ms':>10s} {'modules':>8s} {'Δ ms':>8s}  heaviest packages (self ms)")
+    for target in args.targets or default_targets():
+        try:
+            r = measure(target)
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"{target:28s} error: {e}")
+            continue
+        before = previous_run(target) if args.save else None
+        delta = f"{r['render_ms'] - before['render_ms']:+8.1f}" if before else f"{'':8s}"
+        heaviest = ", ".join(f"{p} {ms:.0f}" for p, ms in list(r["packages"].items())[:args.top])
+        print(f"{target:28s} {r['render_ms']:10.1f} {r['import_ms']:10.1f} {r['modules']:8d} {delta}  {heaviest}")
+        if args.save:
+            save_run(r)
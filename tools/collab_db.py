@@ -14,7 +14,10 @@ DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "collab.db")
 # Resolves to project_root/data/collab.db
 
 
-def get_connection():
+_schema_ready = False  # tables are created on first connection, not at import
+
+
+def _connect():
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
@@ -23,7 +26,8 @@ def get_connection():
 
 
 def init_collab_db():
-    conn = get_connection()
+    global _schema_ready
+    conn = _connect()
     conn.executescript("""
         CREATE TABLE IF NOT EXISTS rooms (
             code        TEXT PRIMARY KEY,
@@ -63,6 +67,14 @@ def init_collab_db():
     """)
     conn.commit()
     conn.close()
+    _schema_ready = True
+
+
+def get_connection():
+    """Open a connection, creating the tables on first use."""
+    if not _schema_ready:
+        init_collab_db()
+    return _connect()
 
 
 # ── Room Operations ────────────────────────────────────────────────────────────
@@ -206,7 +218,3 @@ def get_messages(room_code: str, limit: int = 50) -> list[dict]:
     ).fetchall()
     conn.close()
     return list(reversed([dict(r) for r in rows]))
-
-
-# Initialize on import
-init_collab_db()
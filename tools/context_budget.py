@@ -0,0 +1,187 @@
+"""
+Context Budget — fits each prompt to the context window of the model that
+will answer it. Agents used to cut course material at fixed character counts
+(6000 to 12000 chars), which wasted most of a 128k window on the large models
+and had no relation to the real token cost.
+
+An agent declares its prompt as parts with priorities; pack() keeps the
+fixed parts (instructions, the student's question) whole, then fills the
+remaining budget highest priority first. Parts of equal priority share what
+is left evenly, and a part that doesn't fit is cut at a paragraph, line or
+sentence boundary and marked as truncated.
+
+The budget is the model's window (tools/model_tiers.py picks the model)
+minus room for the reply (the task's max_tokens, else DEFAULT_OUTPUT_TOKENS)
+minus SAFETY_MARGIN for estimator error. Tokens are estimated locally — no
+tokenizer download, no API call.
+
+Override windows with CONTEXT_WINDOWS="mistral-small-latest=32768,...";
+cap every prompt with CONTEXT_MAX_PROMPT_TOKENS (0 = no cap).
+"""
+
+import os
+import re
+import threading
+
+from tools.model_tiers import resolve
+
+DEFAULT_CONTEXT_WINDOW = 32768
+CONTEXT_WINDOWS = {
+    "mistral-small-latest":  32768,
+    "mistral-medium-latest": 131072,
+    "mistral-large-latest":  131072,
+}
+
+DEFAULT_OUTPUT_TOKENS = 4096   # reserved for the reply when the task sets no max_tokens
+SAFETY_MARGIN = 0.1            # share of the budget held back for estimator error
+MIN_PART_TOKENS = 64           # a part squeezed below this is dropped rather than cut to a stub
+TRUNCATION_NOTE = "\n\n[Content truncated for length...]"
+
+
+def _parse_overrides(spec: str) -> dict:
+    overrides = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, tokens = item.partition("=")
+        overrides[model.strip()] = int(tokens)
+    return overrides
+
+
+CONTEXT_WINDOWS.update(_parse_overrides(os.getenv("CONTEXT_WINDOWS", "")))
+MAX_PROMPT_TOKENS = int(os.getenv("CONTEXT_MAX_PROMPT_TOKENS", "0"))
+
+_lock = threading.Lock()
+_stats = {}  # agent -> {"prompts", "truncated", "dropped", "used_tokens", "budget_tokens"}
+
+
+# ── Token Estimate ─────────────────────────────────────────────────────────────
+
+# Letter runs, single digits (Mistral's tokenizer splits numbers digit by digit)
+# and any other non-space character
+_PIECES = re.compile(r"[^\W\d_]+|\d|\S")
+
+
+def _piece_tokens(piece: str) -> int:
+    if piece.isascii():
+        return 1 + (len(piece) - 1) // 5   # common words are one token, long ones split
+    if max(piece) >= "\u2e80":
+        return len(piece)                  # CJK: about one token per character
+    return 1 + (len(piece) - 1) // 3       # accented Latin, Cyrillic, ... split more finely
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate Mistral token count of text, erring slightly high."""
+    return sum(_piece_tokens(p) for p in _PIECES.findall(text)) + 1
+
+
+def _cut(text: str, tokens: int) -> str:
+    """The longest prefix of text within `tokens`, ended at a natural boundary when one is near."""
+    used = 0
+    end = 0
+    for match in _PIECES.finditer(text):
+        used += _piece_tokens(match.group())
+        if used > tokens:
+            break
+        end = match.end()
+    prefix = text[:end]
+    for boundary in ("\n\n", "\n", ". "):
+        at = prefix.rfind(boundary)
+        if at >= end * 0.9:
+            return prefix[:at + (1 if boundary == ". " else 0)]
+    return prefix
+
+
+# ── Budgets ────────────────────────────────────────────────────────────────────
+
+def context_window(model: str) -> int:
+    return CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+
+def prompt_budget(agent: str, task: str = None) -> int:
+    """Prompt tokens available to a task on the model it is routed to."""
+    model, max_tokens = resolve(agent, task)
+    budget = int((context_window(model) - (max_tokens or DEFAULT_OUTPUT_TOKENS)) * (1 - SAFETY_MARGIN))
+    return min(budget, MAX_PROMPT_TOKENS) if MAX_PROMPT_TOKENS else budget
+
+
+# ── Packing ────────────────────────────────────────────────────────────────────
+
+def part(name: str, text: str, priority: int = 0, fixed: bool = False, note: str = TRUNCATION_NOTE) -> dict:
+    """
+    One piece of a prompt.
+
+    Args:
+        name: Key of the packed text in pack()'s result
+        text: Full text of the part
+        priority: Higher priorities are filled first
+        fixed: Always kept whole (instructions, the student's message)
+        note: Appended when the part is cut
+    """
+    return {"name": name, "text": text or "", "priority": priority, "fixed": fixed, "note": note}
+
+
+def _record(agent: str, used: int, budget: int, truncated: int, dropped: int):
+    with _lock:
+        s = _stats.setdefault(agent, {"prompts": 0, "truncated": 0, "dropped": 0,
+                                      "used_tokens": 0, "budget_tokens": 0})
+        s["prompts"] += 1
+        s["truncated"] += truncated
+        s["dropped"] += dropped
+        s["used_tokens"] += used
+        s["budget_tokens"] += budget
+
+
+def pack(parts: list[dict], budget: int, agent: str = "") -> dict[str, str]:
+    """
+    Fit parts into `budget` tokens.
+
+    Returns:
+        {name: text} — whole, cut (ending in the part's note) or "" if dropped
+    """
+    packed, sizes = {}, {}
+    left = budget
+    for p in parts:
+        # A part can't take more tokens than it has characters, so short ones skip the estimate
+        sizes[p["name"]] = estimate_tokens(p["text"]) if len(p["text"]) > MIN_PART_TOKENS else len(p["text"]) + 1
+        if p["fixed"]:
+            packed[p["name"]] = p["text"]
+            left -= sizes[p["name"]]
+
+    truncated = dropped = 0
+    for priority in sorted({p["priority"] for p in parts if not p["fixed"]}, reverse=True):
+        # Equal priorities share what is left: smallest first, each taking at most an even split
+        group = sorted((p for p in parts if not p["fixed"] and p["priority"] == priority),
+                       key=lambda p: sizes[p["name"]])
+        for i, p in enumerate(group):
+            share = max(0, left) // (len(group) - i)
+            size = sizes[p["name"]]
+            if size <= share:
+                packed[p["name"]] = p["text"]
+                left -= size
+            elif share - estimate_tokens(p["note"]) < MIN_PART_TOKENS:
+                packed[p["name"]] = ""
+                dropped += 1
+            else:
+                packed[p["name"]] = _cut(p["text"], share - estimate_tokens(p["note"])) + p["note"]
+                left -= share
+                truncated += 1
+
+    if agent:
+        _record(agent, budget - max(0, left), budget, truncated, dropped)
+    return packed
+
+
+def fit(agent: str, parts: list[dict], task: str = None) -> dict[str, str]:
+    """pack() to the prompt budget of an agent's task."""
+    return pack(parts, prompt_budget(agent, task), agent)
+
+
+# ── Stats ──────────────────────────────────────────────────────────────────────
+
+def get_context_budget_stats() -> dict:
+    """Per-agent prompts packed, parts cut or dropped, and average share of the budget used."""
+    with _lock:
+        per_agent = {a: dict(s) for a, s in _stats.items()}
+    for s in per_agent.values():
+        s["utilization"] = round(s["used_tokens"] / s["budget_tokens"], 3) if s["budget_tokens"] else 0.0
+        s["avg_prompt_tokens"] = s["used_tokens"] // s["prompts"] if s["prompts"] else 0
+    return per_agent
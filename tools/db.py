@@ -10,7 +10,10 @@ DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "student.db")
 # When imported from tools/ package, this resolves to project_root/data/student.db
 
 
-def get_connection():
+_schema_ready = False  # tables are created on first connection, not at import
+
+
+def _connect():
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
@@ -19,7 +22,8 @@ def get_connection():
 
 def init_db():
     """Create tables if they don't exist."""
-    conn = get_connection()
+    global _schema_ready
+    conn = _connect()
     conn.execute("""
         CREATE TABLE IF NOT EXISTS deadlines (
             id          INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -34,6 +38,14 @@ def init_db():
     """)
     conn.commit()
     conn.close()
+    _schema_ready = True
+
+
+def get_connection():
+    """Open a connection, creating the tables on first use."""
+    if not _schema_ready:
+        init_db()
+    return _connect()
 
 
 # ── CRUD Operations ────────────────────────────────────────────────────────────
@@ -103,7 +115,3 @@ def get_upcoming_deadlines(days: int = 7) -> list[dict]:
     """, (str(days),)).fetchall()
     conn.close()
     return [dict(r) for r in rows]
-
-
-# Initialize DB on import
-init_db()
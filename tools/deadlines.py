@@ -0,0 +1,270 @@
+"""
+Deadlines — per-node time budgets for the orchestrator graph.
+Each budgeted node runs against an absolute deadline held in a context
+variable, and the LLM stack honours it:
+
+  1. tools/resilience.py stops retrying, backing off or waiting for rate-limit
+     capacity once the deadline has passed.
+  2. The HTTP transport caps its timeouts at the time left and stops reading
+     a response at the deadline, so a hung Mistral request is aborted rather
+     than left running.
+
+When a budget runs out the node returns its degraded fallback and its span
+is marked "DeadlineExceeded". Async nodes are cancelled outright. Sync nodes
+run on a worker thread: the caller stops waiting at the deadline, and the
+worker's request fails on its own at that point. Nodes and the calls they
+time-box with call_within() use separate thread pools, so busy nodes can
+never leave their own inner calls queued for a worker until the budget ends.
+
+Override budgets (seconds) with NODE_BUDGETS="research_agent=20,router=5";
+disable with NODE_BUDGETS_ENABLED=0.
+"""
+
+import os
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import httpx
+
+from tools import tracing
+
+ENABLED = os.getenv("NODE_BUDGETS_ENABLED", "1") != "0"
+
+NODE_BUDGETS = {
+    "router":         10.0,
+    "general_agent":  45.0,
+    "course_agent":   60.0,
+    "deadline_agent": 25.0,
+    "revision_agent": 60.0,
+    "research_agent": 40.0,
+}
+
+
+def _parse_overrides(spec: str) -> dict:
+    overrides = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, seconds = item.partition("=")
+        overrides[name.strip()] = float(seconds)
+    return overrides
+
+
+NODE_BUDGETS.update(_parse_overrides(os.getenv("NODE_BUDGETS", "")))
+
+_deadline = contextvars.ContextVar("deadline", default=None)   # time.monotonic() value
+_node_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="budget")
+_call_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="budget-call")
+_lock = threading.Lock()
+_stats = {}  # name -> {"runs": int, "timeouts": int}
+
+
+class DeadlineExceeded(TimeoutError):
+    """The current node's time budget ran out."""
+
+
+def remaining() -> float | None:
+    """Seconds left in the current budget, or None when no budget applies."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check():
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("time budget exhausted")
+
+
+def _deadline_in(seconds: float) -> float:
+    """Absolute deadline `seconds` from now; an enclosing budget can only tighten it."""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    return deadline if current is None else min(deadline, current)
+
+
+def _record(name: str, field: str):
+    with _lock:
+        s = _stats.setdefault(name, {"runs": 0, "timeouts": 0})
+        s[field] += 1
+
+
+def get_deadline_stats() -> dict:
+    """Per-node budget, runs and timeouts since the app started."""
+    with _lock:
+        return {
+            name: {**s, "budget_s": NODE_BUDGETS.get(name),
+                   "timeout_rate": round(s["timeouts"] / s["runs"], 3) if s["runs"] else 0.0}
+            for name, s in _stats.items()
+        }
+
+
+def _degrade(name: str, fallback, state):
+    _record(name, "timeouts")
+    tracing.mark_node_error(DeadlineExceeded.__name__)
+    return fallback(state)
+
+
+# ── Budgeted Nodes ─────────────────────────────────────────────────────────────
+
+def with_budget(name: str, func, fallback):
+    """Wrap a sync node: run it on a worker thread, return fallback(state) if it overruns."""
+    seconds = NODE_BUDGETS.get(name)
+    if not ENABLED or seconds is None or fallback is None:
+        return func
+
+    def node(state):
+        _record(name, "runs")
+        ctx = contextvars.copy_context()
+        ctx.run(_deadline.set, _deadline_in(seconds))
+        future = _node_executor.submit(ctx.run, func, state)
+        try:
+            return future.result(timeout=seconds)
+        except (FutureTimeout, DeadlineExceeded):
+            future.cancel()   # never start a node that is still queued for a worker
+            return _degrade(name, fallback, state)
+    return node
+
+
+def awith_budget(name: str, afunc, fallback):
+    """Wrap an async node: cancel it and return fallback(state) if it overruns."""
+    seconds = NODE_BUDGETS.get(name)
+    if not ENABLED or seconds is None or fallback is None:
+        return afunc
+
+    async def node(state):
+        _record(name, "runs")
+        token = _deadline.set(_deadline_in(seconds))
+        try:
+            return await asyncio.wait_for(afunc(state), seconds)
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            return _degrade(name, fallback, state)
+        finally:
+            _deadline.reset(token)
+    return node
+
+
+def call_within(seconds: float, func, *args, default=None, name: str = ""):
+    """Run func(*args) with at most `seconds` (and never past the node's deadline); default on overrun."""
+    left = remaining()
+    seconds = seconds if left is None else min(seconds, max(0.0, left))
+    if name:
+        _record(name, "runs")
+    future = _call_executor.submit(contextvars.copy_context().run, func, *args)
+    try:
+        return future.result(timeout=seconds)
+    except FutureTimeout:
+        future.cancel()
+        if name:
+            _record(name, "timeouts")
+        return default
+
+
+async def acall_within(seconds: float, coro, default=None, name: str = ""):
+    """Async call_within(): the coroutine is cancelled on overrun."""
+    left = remaining()
+    seconds = seconds if left is None else min(seconds, max(0.0, left))
+    if name:
+        _record(name, "runs")
+    try:
+        return await asyncio.wait_for(coro, seconds)
+    except asyncio.TimeoutError:
+        if name:
+            _record(name, "timeouts")
+        return default
+
+
+# ── HTTP Transport ─────────────────────────────────────────────────────────────
+
+def _bounded_timeouts(request: httpx.Request, left: float):
+    if left <= 0:
+        raise DeadlineExceeded("time budget exhausted before the request was sent")
+    timeout = request.extensions.get("timeout") or {}
+    request.extensions["timeout"] = {
+        k: left if v is None else min(v, left) for k, v in timeout.items()
+    } or {"connect": left, "read": left, "write": left, "pool": left}
+
+
+class _DeadlineStream(httpx.SyncByteStream):
+    def __init__(self, stream, deadline: float):
+        self._stream = stream
+        self._deadline = deadline
+
+    def __iter__(self):
+        for chunk in self._stream:
+            if time.monotonic() > self._deadline:
+                raise DeadlineExceeded("time budget ran out while reading the response")
+            yield chunk
+
+    def close(self):
+        self._stream.close()
+
+
+class _AsyncDeadlineStream(httpx.AsyncByteStream):
+    def __init__(self, stream, deadline: float):
+        self._stream = stream
+        self._deadline = deadline
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            if time.monotonic() > self._deadline:
+                raise DeadlineExceeded("time budget ran out while reading the response")
+            yield chunk
+
+    async def aclose(self):
+        await self._stream.aclose()
+
+
+class DeadlineTransport(httpx.BaseTransport):
+    """Caps each request's timeouts at the current budget and stops reading at the deadline."""
+
+    def __init__(self, inner: httpx.BaseTransport):
+        self.inner = inner
+
+    @property
+    def _pool(self):
+        return getattr(self.inner, "_pool", None)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        deadline = _deadline.get()
+        if deadline is None:
+            return self.inner.handle_request(request)
+        _bounded_timeouts(request, deadline - time.monotonic())
+        response = self.inner.handle_request(request)
+        return httpx.Response(
+            response.status_code, headers=response.headers,
+            stream=_DeadlineStream(response.stream, deadline), extensions=response.extensions,
+        )
+
+    def close(self):
+        self.inner.close()
+
+
+class AsyncDeadlineTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    @property
+    def _pool(self):
+        return getattr(self.inner, "_pool", None)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        deadline = _deadline.get()
+        if deadline is None:
+            return await self.inner.handle_async_request(request)
+        _bounded_timeouts(request, deadline - time.monotonic())
+        response = await self.inner.handle_async_request(request)
+        return httpx.Response(
+            response.status_code, headers=response.headers,
+            stream=_AsyncDeadlineStream(response.stream, deadline), extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+def wrap_transport(inner: httpx.BaseTransport) -> httpx.BaseTransport:
+    return DeadlineTransport(inner) if ENABLED else inner
+
+
+def wrap_async_transport(inner: httpx.AsyncBaseTransport) -> httpx.AsyncBaseTransport:
+    return AsyncDeadlineTransport(inner) if ENABLED else inner
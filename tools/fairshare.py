@@ -0,0 +1,391 @@
+"""
+Fair Share — a bounded, fair queue in front of every Mistral API request.
+Streamlit runs each session's script in its own thread and all of them share
+one API quota, so without this one student hammering "Ask AI 🤖" can starve
+everyone else.
+
+At most LLM_MAX_CONCURRENT requests are in flight. The rest wait in a
+two-level weighted fair queue (start-time fair queuing):
+
+  1. Groups — a study room, or a single student outside a room — take turns,
+     so a busy room gets the same share as one student chatting alone.
+  2. Within a group, the users take turns.
+
+Each request costs 1 + prompt_tokens / COST_TOKENS, divided by its tenant's
+weight (background jobs run at BACKGROUND_WEIGHT). Requests beyond
+LLM_MAX_QUEUE in total, or LLM_MAX_QUEUE_PER_USER for one user, are rejected
+at once with QueueFullError instead of queueing behind work that will time
+out anyway. Waiting never runs past the caller's node deadline
+(tools/deadlines.py).
+
+A slot is held for one API attempt only: tools/resilience.py takes it per
+attempt, so a request that is backing off or waiting for rate-limit capacity
+doesn't keep other users waiting.
+
+Pages tag their LLM work with `with tenant(user, room):`, where user is one
+stable ID per browser (ui.client_id()), and can follow a queued request's
+place in line with `with on_wait(callback):` (ui.llm_spinner does both and
+shows the position while the request waits). Disable with LLM_FAIR_QUEUE=0.
+"""
+
+import os
+import asyncio
+import contextvars
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+
+from tools.deadlines import DeadlineExceeded, remaining
+from tools.resilience import CircuitOpenError
+
+ENABLED = os.getenv("LLM_FAIR_QUEUE", "1") != "0"
+MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "8"))
+MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+MAX_QUEUE_PER_USER = int(os.getenv("LLM_MAX_QUEUE_PER_USER", "6"))
+BACKGROUND_WEIGHT = 0.5   # share of a background job relative to an interactive request
+COST_TOKENS = 1000        # prompt tokens that cost as much as one extra request
+RETRY_IN = 5              # seconds suggested to a rejected caller
+POLL_INTERVAL = 0.5       # seconds between queue-position updates while waiting
+
+_tenant = contextvars.ContextVar("llm_tenant", default=("", "", 1.0))   # (user, room, weight)
+_on_wait = contextvars.ContextVar("llm_on_wait", default=None)         # callback(position | None)
+
+
+class QueueFullError(CircuitOpenError):
+    """Raised without queueing when the LLM queue is full; pages handle it like an open circuit."""
+
+    def __init__(self, reason: str):
+        super().__init__(RETRY_IN)
+        self.args = (f"Too many AI requests are waiting ({reason}) — try again in {self.retry_in}s.",)
+
+
+@contextmanager
+def tenant(user: str, room: str = "", weight: float = 1.0):
+    """Attribute every LLM request made inside the block to this user (and study room)."""
+    token = _tenant.set((user or "", room or "", weight))
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
+
+
+def current_tenant() -> tuple:
+    """(user, room, weight) the current LLM requests are attributed to, e.g. to hand on to background work."""
+    return _tenant.get()
+
+
+@contextmanager
+def on_wait(callback):
+    """
+    Report queued LLM requests made inside the block: callback(position) while
+    one waits (1 = next in line), callback(None) once it gets its slot.
+    """
+    token = _on_wait.set(callback)
+    try:
+        yield
+    finally:
+        _on_wait.reset(token)
+
+
+def _group(user: str, room: str) -> str:
+    return f"room:{room}" if room else f"user:{user}"
+
+
+# ── Fair Queue ─────────────────────────────────────────────────────────────────
+
+_arrivals = itertools.count()
+
+
+class _Waiter:
+    """One queued request; grant() wakes the thread or coroutine waiting on it."""
+
+    def __init__(self, group: str, user: str, loop=None):
+        self.group = group
+        self.user = user
+        self.tag = 0.0          # start tag among the group's users
+        self.slot = 0.0         # start tag of the group's turn this request holds
+        self.seq = next(_arrivals)   # breaks ties between equal tags, as dispatch does
+        self.granted = False
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+
+    def grant(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class FairQueue:
+    """At most `slots` requests run at once; waiters are granted in two-level fair order."""
+
+    def __init__(self, slots: int, max_depth: int, max_per_user: int):
+        self.slots = slots
+        self.max_depth = max_depth
+        self.max_per_user = max_per_user
+        self.in_flight = 0
+        self.vtime = 0.0          # start tag of the last group turn granted
+        self.group_vtime = {}     # group -> start tag of the last user turn granted in it
+        self.group_finish = {}    # group -> finish tag of its last queued turn
+        self.user_finish = {}     # (group, user) -> finish tag of their last queued request
+        self.turns = {}           # group -> ascending start tags of its queued turns
+        self.waiting = {}         # group -> queued waiters
+        self.per_user = {}        # (group, user) -> queued count
+        self.depth = 0
+        self.lock = threading.Lock()
+
+    def enqueue(self, waiter: _Waiter, cost: float, weight: float) -> bool:
+        """Queue a request; True if it may run immediately. Raises QueueFullError when full."""
+        group, user = waiter.group, waiter.user
+        with self.lock:
+            if self.in_flight < self.slots and not self.depth:
+                self.in_flight += 1
+                waiter.granted = True
+                return True
+            if self.depth >= self.max_depth:
+                raise QueueFullError(f"{self.depth} queued")
+            if self.per_user.get((group, user), 0) >= self.max_per_user:
+                raise QueueFullError(f"{self.max_per_user} of yours already queued")
+
+            share = cost / max(weight, 0.01)
+            waiter.slot = max(self.vtime, self.group_finish.get(group, 0.0))
+            self.group_finish[group] = waiter.slot + share
+            waiter.tag = max(self.group_vtime.get(group, 0.0), self.user_finish.get((group, user), 0.0))
+            self.user_finish[(group, user)] = waiter.tag + share
+
+            self.turns.setdefault(group, []).append(waiter.slot)
+            self.waiting.setdefault(group, []).append(waiter)
+            self.per_user[(group, user)] = self.per_user.get((group, user), 0) + 1
+            self.depth += 1
+            return False
+
+    def _unqueue(self, waiter: _Waiter):
+        group = waiter.group
+        self.waiting[group].remove(waiter)
+        self.turns[group].remove(waiter.slot)
+        if not self.waiting[group]:
+            del self.waiting[group], self.turns[group]
+        key = (group, waiter.user)
+        self.per_user[key] -= 1
+        if not self.per_user[key]:
+            del self.per_user[key]
+        self.depth -= 1
+
+    def _dispatch(self):
+        while self.in_flight < self.slots and self.depth:
+            group = min(self.turns, key=lambda g: self.turns[g][0])
+            waiter = min(self.waiting[group], key=lambda w: w.tag)
+            # The group's earliest turn goes to its most deserving user; whoever
+            # queued that turn takes over this user's later one
+            first = self.turns[group][0]
+            owner = next(w for w in self.waiting[group] if w.slot == first)
+            owner.slot, waiter.slot = waiter.slot, first
+            self._unqueue(waiter)
+            self.vtime = max(self.vtime, first)
+            self.group_vtime[group] = max(self.group_vtime.get(group, 0.0), waiter.tag)
+            self.in_flight += 1
+            waiter.granted = True
+            waiter.grant()
+        if not self.depth and len(self.user_finish) > 1000:
+            self._forget_idle()
+
+    def _forget_idle(self):
+        """Drop finish tags that no longer hold anyone back."""
+        self.group_finish = {g: f for g, f in self.group_finish.items() if f > self.vtime}
+        self.user_finish = {
+            k: f for k, f in self.user_finish.items() if f > self.group_vtime.get(k[0], 0.0)
+        }
+        self.group_vtime = {g: v for g, v in self.group_vtime.items() if g in self.group_finish}
+
+    def abandon(self, waiter: _Waiter):
+        """The caller stopped waiting (deadline, cancellation); give back a slot it was granted meanwhile."""
+        with self.lock:
+            if not waiter.granted:
+                self._unqueue(waiter)
+                self._dispatch()
+                return
+        self.release()
+
+    def position(self, waiter: _Waiter) -> int:
+        """Roughly where a queued request stands in line (1 = next); 0 once it has a slot."""
+        with self.lock:
+            if waiter.granted:
+                return 0
+            place = (waiter.slot, waiter.tag, waiter.seq)
+            return 1 + sum((w.slot, w.tag, w.seq) < place for queued in self.waiting.values() for w in queued)
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+            self._dispatch()
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"in_flight": self.in_flight, "queue_depth": self.depth, "queued_groups": len(self.waiting)}
+
+
+_queue = FairQueue(MAX_CONCURRENT, MAX_QUEUE, MAX_QUEUE_PER_USER)
+
+_stats_lock = threading.Lock()
+_stats = {"granted": 0, "queued": 0, "rejected": 0, "abandoned": 0}
+_waits = deque(maxlen=500)   # queue waits (ms) of recent requests that had to queue
+_users = {}                  # group/user -> {"granted", "rejected", "wait_ms"}
+
+
+def _record(group: str, user: str, field: str, wait_ms: float = 0.0):
+    with _stats_lock:
+        _stats[field] += 1
+        u = _users.setdefault(f"{group}/{user}", {"granted": 0, "rejected": 0, "wait_ms": 0.0})
+        if field in u:
+            u[field] += 1
+        u["wait_ms"] += wait_ms
+        if field == "queued":
+            _waits.append(wait_ms)
+
+
+def _admit(tokens: int, loop=None) -> tuple[_Waiter, bool]:
+    user, room, weight = _tenant.get()
+    waiter = _Waiter(_group(user, room), user, loop)
+    try:
+        return waiter, _queue.enqueue(waiter, 1.0 + tokens / COST_TOKENS, weight)
+    except QueueFullError:
+        _record(waiter.group, user, "rejected")
+        raise
+
+
+def _granted(waiter: _Waiter, queued_at: float | None):
+    _record(waiter.group, waiter.user, "granted")
+    if queued_at is not None:
+        _record(waiter.group, waiter.user, "queued", (time.perf_counter() - queued_at) * 1000)
+
+
+def _abandoned(waiter: _Waiter):
+    _queue.abandon(waiter)
+    _record(waiter.group, waiter.user, "abandoned")
+
+
+def _notify(position):
+    callback = _on_wait.get()
+    if callback is None:
+        return
+    try:
+        callback(position)
+    except Exception:
+        pass   # a broken progress display must not fail the request
+
+
+def _poll_step() -> float:
+    left = remaining()
+    return POLL_INTERVAL if left is None else min(POLL_INTERVAL, left)
+
+
+def _wait_turn(waiter: _Waiter):
+    """Block until the waiter is granted, reporting its position as it moves up."""
+    shown = None
+    try:
+        while True:
+            position = _queue.position(waiter)
+            if position and position != shown:
+                _notify(position)
+                shown = position
+            step = _poll_step()
+            if step <= 0:
+                _abandoned(waiter)
+                raise DeadlineExceeded("time budget ran out while queued for the LLM")
+            if waiter.event.wait(timeout=step):
+                return
+    finally:
+        if shown is not None:
+            _notify(None)
+
+
+async def _await_turn(waiter: _Waiter):
+    """Async _wait_turn(): awaits the grant without blocking the event loop."""
+    shown = None
+    try:
+        while True:
+            position = _queue.position(waiter)
+            if position and position != shown:
+                _notify(position)
+                shown = position
+            step = _poll_step()
+            if step <= 0:
+                _abandoned(waiter)
+                raise DeadlineExceeded("time budget ran out while queued for the LLM")
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), step)
+                return
+            except asyncio.TimeoutError:
+                continue
+            except asyncio.CancelledError:
+                _abandoned(waiter)
+                raise
+    finally:
+        if shown is not None:
+            _notify(None)
+
+
+@contextmanager
+def slot(tokens: int = 0):
+    """Hold one of the LLM slots for the block (one API attempt), waiting for a fair turn."""
+    if not ENABLED:
+        yield
+        return
+    waiter, immediate = _admit(tokens)
+    queued_at = None
+    if not immediate:
+        queued_at = time.perf_counter()
+        _wait_turn(waiter)
+    _granted(waiter, queued_at)
+    try:
+        yield
+    finally:
+        _queue.release()
+
+
+@asynccontextmanager
+async def aslot(tokens: int = 0):
+    """Async slot(): awaits its turn without blocking the event loop."""
+    if not ENABLED:
+        yield
+        return
+    waiter, immediate = _admit(tokens, asyncio.get_running_loop())
+    queued_at = None
+    if not immediate:
+        queued_at = time.perf_counter()
+        await _await_turn(waiter)
+    _granted(waiter, queued_at)
+    try:
+        yield
+    finally:
+        _queue.release()
+
+
+def get_fairshare_stats() -> dict:
+    """Slots in use, queue depth, queue-wait percentiles and per-tenant counts."""
+    with _stats_lock:
+        stats = dict(_stats)
+        waits = sorted(_waits)
+        users = {k: dict(v) for k, v in _users.items()}
+
+    def pct(p):
+        return round(waits[min(len(waits) - 1, int(p / 100 * len(waits)))], 1) if waits else 0.0
+
+    return {
+        **stats,
+        **_queue.snapshot(),
+        "enabled": ENABLED,
+        "slots": MAX_CONCURRENT,
+        "max_queue": MAX_QUEUE,
+        "queued_rate": round(stats["queued"] / stats["granted"], 3) if stats["granted"] else 0.0,
+        "p50_wait_ms": pct(50),
+        "p95_wait_ms": pct(95),
+        "users": users,
+    }
@@ -0,0 +1,142 @@
+"""
+Fast Router — deterministic, zero-LLM intent detection for obvious messages.
+Runs in front of the orchestrator's LLM router and only defers to it when unsure.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+
+# Exact prompts sent by the quick-action buttons in app.py
+QUICK_ACTION_INTENTS = {
+    "please summarize the uploaded course material": "course_agent",
+    "show me all my upcoming deadlines": "deadline_agent",
+    "create a quiz to help me revise": "revision_agent",
+    "find me resources to learn about machine learning": "research_agent",
+}
+
+# (intent, confidence, pattern) — checked against the lower-cased message
+RULES = [
+    # Deadlines
+    ("deadline_agent", 0.98, r"\b(complete|completed|finish|finished|done|mark|delete|remove)\b.*#\s*\d+"),
+    ("deadline_agent", 0.98, r"#\s*\d+.*\b(done|complete|completed|finished)\b"),
+    ("deadline_agent", 0.95, r"\b(show|list|see|view|display|what are)\b.*\b(deadlines?|assignments?|due dates?)\b"),
+    ("deadline_agent", 0.95, r"\b(upcoming|pending|overdue)\s+(deadlines?|assignments?|exams?|tasks?)\b"),
+    ("deadline_agent", 0.9,  r"\bwhat('s| is)\s+due\b"),
+    ("deadline_agent", 0.85, r"\b(add|create|set|new)\b.*\b(deadline|reminder|exam|assignment|homework|project)\b.*\b(on|by|due|for|next|tomorrow|today|in \d+)\b"),
+    # Revision
+    ("revision_agent", 0.95, r"\b(quiz|test) me\b"),
+    ("revision_agent", 0.9,  r"\b(make|create|generate|give me)\b.*\b(quiz|flash ?cards?|mcqs?|practice questions)\b"),
+    ("revision_agent", 0.85, r"\bflash ?cards?\b"),
+    # Knowledge graph
+    ("graph_agent",    0.95, r"\b(visuali[sz]e|knowledge graph|concept map|mind ?map)\b"),
+    ("graph_agent",    0.85, r"\bshow me a (graph|map)\b"),
+    # Course material
+    ("course_agent",   0.9,  r"\b(summari[sz]e|structure|outline)\b.*\b(material|notes|slides|lecture|course|document|pdf|chapter)\b"),
+    # Research
+    ("research_agent", 0.9,  r"\b(find|search|look up|recommend)\b.*\b(resources?|articles?|papers?|tutorials?|videos?|books?)\b"),
+    ("research_agent", 0.85, r"\bsearch (the web|online|for)\b"),
+]
+
+GREETING_PATTERN = re.compile(
+    r"^(hi|hello|hey|yo|hiya|good (morning|afternoon|evening)|bonjour|salut|"
+    r"thanks?|thank you|thx|ok(ay)?|cool|bye|goodbye|"
+    r"who are you|what can you do|help)( there)?[\s!.?,]*$"
+)
+
+_COMPILED_RULES = [(intent, conf, re.compile(p)) for intent, conf, p in RULES]
+
+# Short messages that only make sense as a continuation of the previous turn.
+# Anchored at both ends: a pronoun inside a full question ("how does it work?")
+# is not a follow-up.
+_FOLLOW_UP_LEAD = r"^((and|also|ok(ay)?|so|then|now|but|great|cool)[\s,]+)?"
+_FOLLOW_UP_TAIL = r"(\s+please)?[\s!.?]*$"
+_ADJUST = r"(harder|easier|shorter|longer|simpler|more detailed)"
+FOLLOW_UP_PATTERN = re.compile(
+    _FOLLOW_UP_LEAD + r"("
+    r"another( one)?|one more( (time|question|quiz|card))?|more|again|next( one)?|same again|"
+    r"(do|try) (it|that) again|"
+    r"(make|do) (it|them|that|this|the (quiz|questions|cards)) " + _ADJUST + r"|"
+    + _ADJUST + r"( (one|ones|questions|please))?|"
+    r"mark (it|that|this|them) (as )?(done|complete|completed|finished)|"
+    r"(delete|remove) (it|that|this|them)|"
+    r"the (first|second|last|previous) one"
+    r")" + _FOLLOW_UP_TAIL +
+    r"|" + _FOLLOW_UP_LEAD + r"(what|how) about\b"
+)
+# Explicit topic changes always go back through full routing
+TOPIC_CHANGE_PATTERN = re.compile(
+    r"\b(new topic|different topic|something else|change (the )?(topic|subject)|"
+    r"forget (that|it)|by the way|unrelated|switch to)\b"
+)
+FOLLOW_UP_MAX_WORDS = 6
+
+MAX_SESSIONS = 1024
+_sessions_lock = threading.Lock()
+_last_intents = OrderedDict()  # session_id -> intent of the previous turn
+
+
+def _normalize(message: str) -> str:
+    return re.sub(r"\s+", " ", message.strip().lower())
+
+
+def fast_route(message: str) -> tuple[str, float]:
+    """
+    Classify a message with rules and keywords.
+
+    Returns:
+        (intent, confidence) — confidence is 0.0 when no rule matched.
+        When rules for several different agents match, the confidence is halved
+        so the caller falls back to the LLM router.
+    """
+    text = _normalize(message)
+    if not text:
+        return "general", 0.0
+
+    quick = QUICK_ACTION_INTENTS.get(text.rstrip(".!?"))
+    if quick:
+        return quick, 1.0
+
+    if GREETING_PATTERN.match(text):
+        return "general", 0.95
+
+    scores = {}
+    for intent, conf, pattern in _COMPILED_RULES:
+        if conf > scores.get(intent, 0.0) and pattern.search(text):
+            scores[intent] = conf
+
+    if not scores:
+        return "general", 0.0
+
+    intent, confidence = max(scores.items(), key=lambda x: x[1])
+    if len(scores) > 1:
+        confidence /= 2
+    return intent, confidence
+
+
+# ── Follow-ups ─────────────────────────────────────────────────────────────────
+
+def is_follow_up(message: str) -> bool:
+    """True for short continuation messages ("another one", "make it harder", "mark that done")."""
+    text = _normalize(message)
+    if not text or len(text.split()) > FOLLOW_UP_MAX_WORDS:
+        return False
+    if TOPIC_CHANGE_PATTERN.search(text):
+        return False
+    return bool(FOLLOW_UP_PATTERN.match(text))
+
+
+def remember_intent(session_id: str, intent: str):
+    if not session_id or not intent:
+        return
+    with _sessions_lock:
+        _last_intents[session_id] = intent
+        _last_intents.move_to_end(session_id)
+        while len(_last_intents) > MAX_SESSIONS:
+            _last_intents.popitem(last=False)
+
+
+def get_last_intent(session_id: str) -> str:
+    with _sessions_lock:
+        return _last_intents.get(session_id, "") if session_id else ""
@@ -0,0 +1,198 @@
+"""
+Request Hedging — cut tail latency on latency-sensitive LLM calls.
+If a call hasn't returned after the agent's recent p{HEDGE_PERCENTILE}
+latency, an identical second request is fired; the first response wins and
+the other is cancelled (async) or abandoned (sync threads can't be
+interrupted, its result is dropped).
+
+Hedges are paid for from a budget that earns HEDGE_MAX_RATE credits per
+call, so at most that share of calls ever sends a second request.
+
+Enable with LLM_HEDGING=1. Used by the router, Voice Mode replies and
+answer_room_question (AgentLLM.invoke(..., hedge=True) or `with hedged():`).
+"""
+
+import os
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+
+ENABLED = os.getenv("LLM_HEDGING", "0") == "1"
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "90"))
+HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.1"))   # max share of calls that get a second request
+BUDGET_BURST = 3.0        # hedges that can be spent back to back after a quiet period
+MIN_SAMPLES = 20          # recent latencies needed before an agent is hedged
+WINDOW = 200              # recent latencies kept per agent
+MIN_DELAY = 0.2           # seconds — never hedge sooner than this
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+_lock = threading.Lock()
+_latencies = {}           # agent -> deque of recent successful call latencies (s)
+_budget = 1.0
+_stats = {}               # agent -> {"calls", "hedged", "hedge_wins", "over_budget"}
+
+# Set by hedged(): every AgentLLM call made in this context is hedged
+_requested = contextvars.ContextVar("hedge_requested", default=False)
+
+
+@contextmanager
+def hedged(enabled: bool = True):
+    """Hedge every LLM call made inside the block (e.g. a whole Voice Mode reply)."""
+    token = _requested.set(enabled)
+    try:
+        yield
+    finally:
+        _requested.reset(token)
+
+
+def is_requested() -> bool:
+    return _requested.get()
+
+
+def _record(agent: str, field: str):
+    with _lock:
+        s = _stats.setdefault(agent, {"calls": 0, "hedged": 0, "hedge_wins": 0, "over_budget": 0})
+        s[field] += 1
+
+
+def record_latency(agent: str, seconds: float):
+    with _lock:
+        _latencies.setdefault(agent, deque(maxlen=WINDOW)).append(seconds)
+
+
+def hedge_delay(agent: str) -> float | None:
+    """Seconds to wait before hedging this agent's call; None until enough latencies are known."""
+    with _lock:
+        samples = sorted(_latencies.get(agent, ()))
+    if len(samples) < MIN_SAMPLES:
+        return None
+    rank = max(0, math.ceil(HEDGE_PERCENTILE / 100 * len(samples)) - 1)
+    return max(MIN_DELAY, samples[rank])
+
+
+def _earn():
+    global _budget
+    with _lock:
+        _budget = min(BUDGET_BURST, _budget + HEDGE_MAX_RATE)
+
+
+def _spend() -> bool:
+    global _budget
+    with _lock:
+        if _budget < 1:
+            return False
+        _budget -= 1
+        return True
+
+
+def get_hedging_stats() -> dict:
+    """Per-agent hedge counts, current hedge delay and the overall hedge rate."""
+    with _lock:
+        per_agent = {a: dict(s) for a, s in _stats.items()}
+        budget = _budget
+    for agent, s in per_agent.items():
+        delay = hedge_delay(agent)
+        s["delay_ms"] = round(delay * 1000, 1) if delay is not None else None
+    calls = sum(s["calls"] for s in per_agent.values())
+    hedged = sum(s["hedged"] for s in per_agent.values())
+    wins = sum(s["hedge_wins"] for s in per_agent.values())
+    return {
+        "enabled": ENABLED,
+        "agents": per_agent,
+        "calls": calls,
+        "hedged": hedged,
+        "hedge_rate": round(hedged / calls, 3) if calls else 0.0,
+        "hedge_win_rate": round(wins / hedged, 3) if hedged else 0.0,
+        "budget": round(budget, 2),
+        "max_rate": HEDGE_MAX_RATE,
+    }
+
+
+def _latency_recorder(agent: str, started: float):
+    def done(future):
+        if not future.cancelled() and future.exception() is None:
+            record_latency(agent, time.perf_counter() - started)
+    return done
+
+
+def call(func, agent: str):
+    """
+    Run func() (one API request, already wrapped by resilience.call) with a hedge.
+    func must be safe to run twice concurrently.
+    """
+    _record(agent, "calls")
+    _earn()
+    delay = hedge_delay(agent)
+    started = time.perf_counter()
+    if delay is None:
+        result = func()
+        record_latency(agent, time.perf_counter() - started)
+        return result
+
+    primary = _executor.submit(contextvars.copy_context().run, func)
+    primary.add_done_callback(_latency_recorder(agent, started))
+    if wait([primary], timeout=delay).done:
+        return primary.result()
+    if not _spend():
+        _record(agent, "over_budget")
+        return primary.result()
+
+    _record(agent, "hedged")
+    hedge = _executor.submit(contextvars.copy_context().run, func)
+    pending, error = {primary, hedge}, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for loser in pending:
+                    loser.cancel()
+                if future is hedge:
+                    _record(agent, "hedge_wins")
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+async def acall(coro_func, agent: str):
+    """Async call(); the losing request is cancelled."""
+    _record(agent, "calls")
+    _earn()
+    delay = hedge_delay(agent)
+    started = time.perf_counter()
+    if delay is None:
+        result = await coro_func()
+        record_latency(agent, time.perf_counter() - started)
+        return result
+
+    primary = asyncio.ensure_future(coro_func())
+    primary.add_done_callback(_latency_recorder(agent, started))
+    hedge = None
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+        if not _spend():
+            _record(agent, "over_budget")
+            return await primary
+
+        _record(agent, "hedged")
+        hedge = asyncio.ensure_future(coro_func())
+        pending, error = {primary, hedge}, None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        _record(agent, "hedge_wins")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
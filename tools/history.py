@@ -0,0 +1,211 @@
+"""
+Conversation History — token-budgeted context windows for agents.
+The most recent turns are sent verbatim; everything older is folded into a
+rolling summary that is extended incrementally and cached per session, so
+prompt size stays flat however long a conversation runs.
+
+Summarizing never delays a reply in the steady state. Older turns the summary
+doesn't cover yet ride along verbatim; once FOLD_AFTER of them pile up they
+are folded into the summary on a background thread, and the next turn uses
+the result. Only a backlog larger than the agent's whole history budget (a
+long conversation after a restart) is summarized inline. The summary is
+shared by all agents in a session, so a fan-out doesn't summarize twice.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+
+from tools import fairshare
+from tools.context_budget import estimate_tokens
+
+KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "4"))   # user + assistant pairs kept verbatim
+
+# Token budget for the verbatim part of the history, per agent
+DEFAULT_BUDGET = 1500
+AGENT_BUDGETS = {
+    "general":        3000,
+    "deadline_agent": 800,    # only needs enough context to resolve "that one" / "move it"
+}
+
+SUMMARY_MAX_WORDS = 150
+MAX_SESSIONS = 256
+FOLD_AFTER = int(os.getenv("HISTORY_FOLD_AFTER", "4"))   # unsummarized messages before a background fold
+
+SUMMARY_PROMPT = f"""You maintain a running summary of a conversation between a student and their AI study assistant.
+Update the summary with the new messages. Keep facts the assistant may need later:
+courses, topics, deadlines and dates, preferences, decisions and open questions.
+Write at most {SUMMARY_MAX_WORDS} words of plain prose. Return only the summary."""
+
+_lock = threading.Lock()
+_summaries = OrderedDict()  # session -> {"count": int, "digest": str, "summary": str}
+_folding = set()            # sessions with a background fold in flight
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history")
+
+
+def get_budget(agent: str) -> int:
+    return AGENT_BUDGETS.get(agent, DEFAULT_BUDGET)
+
+
+# ── Windowing ──────────────────────────────────────────────────────────────────
+
+def split_history(messages: list, agent: str) -> tuple[list, list]:
+    """
+    Split [{"role", "content"}, ...] into (older, recent).
+    recent holds at most KEEP_TURNS turns within the agent's token budget;
+    the last message is always kept even if it alone exceeds the budget.
+    """
+    budget = get_budget(agent)
+    used = 0
+    start = len(messages)
+    while start > 0 and len(messages) - start < KEEP_TURNS * 2:
+        cost = estimate_tokens(messages[start - 1]["content"])
+        if start < len(messages) and used + cost > budget:
+            break
+        used += cost
+        start -= 1
+    return messages[:start], messages[start:]
+
+
+def _digest(messages: list) -> str:
+    h = hashlib.sha256()
+    for m in messages:
+        h.update(f"{m['role']}\x00{m['content']}\x01".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _session_key(session_id: str | None, messages: list) -> str:
+    # Without an explicit session, the opening message identifies the conversation
+    return session_id or _digest(messages[:1])
+
+
+def _transcript(messages: list) -> str:
+    return "\n".join(f"{m['role'].upper()}: {m['content']}" for m in messages)
+
+
+def _summary_messages(previous: str, new_messages: list) -> list:
+    return [
+        SystemMessage(content=SUMMARY_PROMPT),
+        HumanMessage(content=f"Current summary:\n{previous or '(none)'}\n\nNew messages:\n{_transcript(new_messages)}"),
+    ]
+
+
+def _cached(key: str, messages: list, older: list) -> tuple[str, list]:
+    """Return (summary so far, older messages not yet folded into it)."""
+    with _lock:
+        entry = _summaries.get(key)
+        if entry:
+            _summaries.move_to_end(key)
+    # The summary may reach past `older` when an agent with a smaller budget made it
+    if entry and entry["count"] <= len(messages) and _digest(messages[:entry["count"]]) == entry["digest"]:
+        return entry["summary"], older[entry["count"]:]
+    # Unknown session, or the history was cleared / edited — rebuild from scratch
+    return "", older
+
+
+def _remember(key: str, covered: list, summary: str):
+    with _lock:
+        _summaries[key] = {"count": len(covered), "digest": _digest(covered), "summary": summary}
+        _summaries.move_to_end(key)
+        while len(_summaries) > MAX_SESSIONS:
+            _summaries.popitem(last=False)
+
+
+def _summarizer():
+    from tools.llm import get_llm
+    return get_llm("history", temperature=0.0)
+
+
+def _fold(key: str, covered: list, summary: str, pending: list, tenant: tuple):
+    """Background: extend the summary with the pending messages."""
+    user, room, _ = tenant
+    try:
+        with fairshare.tenant(user, room, fairshare.BACKGROUND_WEIGHT):
+            response = _summarizer().invoke(_summary_messages(summary, pending), stream_tokens=False)
+        _remember(key, covered, response.content.strip())
+    except Exception:
+        pass   # keep the old summary; a later turn schedules another fold
+    finally:
+        with _lock:
+            _folding.discard(key)
+
+
+def _schedule_fold(key: str, covered: list, summary: str, pending: list):
+    with _lock:
+        if key in _folding:
+            return
+        _folding.add(key)
+    _executor.submit(_fold, key, covered, summary, pending, fairshare.current_tenant())
+
+
+def _inline(pending: list, agent: str) -> bool:
+    """A backlog too big to send verbatim is summarized before the reply."""
+    return sum(estimate_tokens(m["content"]) for m in pending) > get_budget(agent)
+
+
+def window(messages: list, agent: str, session_id: str = None) -> tuple[str, list]:
+    """
+    Fit a conversation into the agent's budget.
+
+    Returns:
+        (summary of the older turns — "" if none, messages to send verbatim)
+    """
+    older, recent = split_history(messages, agent)
+    if not older:
+        return "", recent
+
+    key = _session_key(session_id, messages)
+    summary, pending = _cached(key, messages, older)
+    if pending and _inline(pending, agent):
+        response = _summarizer().invoke(_summary_messages(summary, pending), stream_tokens=False)
+        summary = response.content.strip()
+        _remember(key, older, summary)
+        return summary, recent
+    if len(pending) >= FOLD_AFTER:
+        _schedule_fold(key, older, summary, pending)
+    return summary, pending + recent
+
+
+async def awindow(messages: list, agent: str, session_id: str = None) -> tuple[str, list]:
+    """Async window()."""
+    older, recent = split_history(messages, agent)
+    if not older:
+        return "", recent
+
+    key = _session_key(session_id, messages)
+    summary, pending = await asyncio.to_thread(_cached, key, messages, older)
+    if pending and _inline(pending, agent):
+        response = await _summarizer().ainvoke(_summary_messages(summary, pending), stream_tokens=False)
+        summary = response.content.strip()
+        await asyncio.to_thread(_remember, key, older, summary)
+        return summary, recent
+    if len(pending) >= FOLD_AFTER:
+        _schedule_fold(key, older, summary, pending)
+    return summary, pending + recent
+
+
+# ── LangChain Conversion ───────────────────────────────────────────────────────
+
+def with_summary(system_prompt: str, summary: str) -> str:
+    """Append the rolling summary to an agent's system prompt."""
+    if not summary:
+        return system_prompt
+    return f"{system_prompt}\n\nSummary of the earlier conversation:\n{summary}"
+
+
+def to_langchain(messages: list) -> list:
+    return [
+        HumanMessage(content=m["content"]) if m["role"] == "user" else AIMessage(content=m["content"])
+        for m in messages
+    ]
+
+
+def clear_history(session_id: str = None):
+    """Forget cached summaries for one session (or all)."""
+    with _lock:
+        for key in [k for k in _summaries if session_id is None or k == session_id]:
+            del _summaries[key]
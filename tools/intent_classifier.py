@@ -0,0 +1,342 @@
+"""
+Intent Classifier — a small on-box model trained on past router decisions.
+Character n-gram multinomial naive Bayes; routes in well under a millisecond
+once enough traffic history has been collected.
+
+Raw naive Bayes posteriors saturate near 1.0 for almost any message, so scores
+are length-normalised (mean log-likelihood per n-gram) and temperature-scaled
+with a temperature fitted on a holdout split. classify() only answers once the
+holdout accuracy is at least MIN_HOLDOUT_ACCURACY; until then every message
+the rules can't route goes to the LLM router.
+
+Only the LLM router's decisions are training labels; logging the rules' or the
+classifier's own choices would have the model learn from itself. Decisions are
+written in batches by a background thread, off the request path, and the table
+keeps the newest MAX_DECISIONS rows.
+
+Retrain and print an accuracy / latency report with:
+    python -m tools.intent_classifier
+"""
+
+import sqlite3
+import os
+import json
+import math
+import random
+import re
+import queue
+import threading
+import time
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "router.db")
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "intent_model.json")
+# Resolves to project_root/data/router.db and project_root/data/intent_model.json
+
+NGRAM_RANGE = (2, 4)
+MIN_TRAINING_EXAMPLES = 50
+MIN_HOLDOUT_SIZE = 10
+MIN_HOLDOUT_ACCURACY = float(os.getenv("CLASSIFIER_MIN_ACCURACY", "0.9"))
+ALPHA = 0.5  # Laplace smoothing
+LABEL_SMOOTHING = 0.02   # calibration target: about 98% confidence on a typical known message
+TEMPERATURES = [0.005 * 1.25 ** i for i in range(30)]   # candidates for calibration, 0.005 to ~3.2
+
+MAX_DECISIONS = int(os.getenv("ROUTER_MAX_DECISIONS", "20000"))   # training rows kept, newest first
+BATCH_SIZE = 100
+
+
+_schema_ready = False  # tables are created on first connection, not at import
+
+
+def _connect():
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_router_db():
+    global _schema_ready
+    conn = _connect()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS router_decisions (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            message     TEXT NOT NULL,
+            intent      TEXT NOT NULL,
+            source      TEXT DEFAULT 'llm',
+            created_at  TEXT DEFAULT (datetime('now'))
+        )
+    """)
+    conn.commit()
+    conn.close()
+    _schema_ready = True
+
+
+def get_connection():
+    """Open a connection, creating the tables on first use."""
+    if not _schema_ready:
+        init_router_db()
+    return _connect()
+
+
+# ── Training Data ──────────────────────────────────────────────────────────────
+
+_pending = queue.Queue(maxsize=1000)   # (message, intent, source) waiting to be written
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _write(batch: list[tuple]):
+    conn = get_connection()
+    conn.executemany("INSERT INTO router_decisions (message, intent, source) VALUES (?,?,?)", batch)
+    conn.execute(
+        "DELETE FROM router_decisions WHERE id <= (SELECT MAX(id) FROM router_decisions) - ?", (MAX_DECISIONS,)
+    )
+    conn.commit()
+    conn.close()
+
+
+def _write_loop():
+    while True:
+        batch = [_pending.get()]
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(_pending.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _write(batch)
+        except sqlite3.Error:
+            pass   # training data is best effort; never take the writer down
+        finally:
+            for _ in batch:
+                _pending.task_done()
+
+
+def log_decision(message: str, intent: str, source: str = "llm"):
+    """Queue a (message, intent) pair from the LLM router for the background writer; never blocks."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_loop, name="router-log", daemon=True)
+                _writer.start()
+    try:
+        _pending.put_nowait((message, intent, source))
+    except queue.Full:
+        pass   # the writer is behind; dropping a training example is fine
+
+
+def flush():
+    """Wait until every queued decision has been written."""
+    if _writer is not None:
+        _pending.join()
+
+
+def get_decisions(source: str = None) -> list[dict]:
+    conn = get_connection()
+    if source:
+        rows = conn.execute(
+            "SELECT message, intent FROM router_decisions WHERE source=? ORDER BY id ASC", (source,)
+        ).fetchall()
+    else:
+        rows = conn.execute("SELECT message, intent FROM router_decisions ORDER BY id ASC").fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+# ── Model ──────────────────────────────────────────────────────────────────────
+
+def featurize(message: str) -> dict:
+    """Count character n-grams of the normalized message."""
+    text = " " + re.sub(r"\s+", " ", message.lower().strip()) + " "
+    counts = {}
+    lo, hi = NGRAM_RANGE
+    for n in range(lo, hi + 1):
+        for i in range(len(text) - n + 1):
+            gram = text[i:i + n]
+            counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+def train(examples: list[dict]) -> dict:
+    """Fit a multinomial naive Bayes model on [{"message", "intent"}, ...]."""
+    class_counts = {}
+    feature_counts = {}
+    total_features = {}
+    vocab = set()
+
+    for ex in examples:
+        intent = ex["intent"]
+        class_counts[intent] = class_counts.get(intent, 0) + 1
+        counts = feature_counts.setdefault(intent, {})
+        for gram, c in featurize(ex["message"]).items():
+            counts[gram] = counts.get(gram, 0) + c
+            total_features[intent] = total_features.get(intent, 0) + c
+            vocab.add(gram)
+
+    n = sum(class_counts.values())
+    v = len(vocab)
+    model = {"priors": {}, "log_probs": {}, "unseen": {}, "n_examples": n}
+    for intent, count in class_counts.items():
+        denom = total_features.get(intent, 0) + ALPHA * v
+        model["priors"][intent] = math.log(count / n)
+        model["unseen"][intent] = math.log(ALPHA / denom)
+        model["log_probs"][intent] = {
+            gram: math.log((c + ALPHA) / denom) for gram, c in feature_counts[intent].items()
+        }
+    return model
+
+
+def _scores(model: dict, message: str) -> dict:
+    """Per-intent log score divided by the message's n-gram count, so long messages don't saturate."""
+    features = featurize(message)
+    n = sum(features.values()) or 1
+    scores = {}
+    for intent, prior in model["priors"].items():
+        log_probs = model["log_probs"][intent]
+        unseen = model["unseen"][intent]
+        scores[intent] = (prior + sum(log_probs.get(g, unseen) * c for g, c in features.items())) / n
+    return scores
+
+
+def _softmax(scores: dict, temperature: float) -> dict:
+    top = max(scores.values())
+    exp = {intent: math.exp((s - top) / temperature) for intent, s in scores.items()}
+    total = sum(exp.values())
+    return {intent: e / total for intent, e in exp.items()}
+
+
+def predict(model: dict, message: str) -> tuple[str, float]:
+    """Return (intent, calibrated probability) for the most likely intent."""
+    if not model or not model.get("priors"):
+        return "general", 0.0
+
+    probs = _softmax(_scores(model, message), model.get("temperature", 1.0))
+    best = max(probs, key=probs.get)
+    return best, probs[best]
+
+
+def calibrate(model: dict, examples: list[dict]) -> float:
+    """
+    The temperature that minimises label-smoothed log loss on held-out examples.
+
+    Plain log loss on a cleanly separated holdout always prefers the coldest
+    temperature, which brings back the saturation; smoothing the targets caps
+    the confidence a typical in-distribution message earns.
+    """
+    scored = [(_scores(model, ex["message"]), ex["intent"]) for ex in examples]
+    k = len(model["priors"])
+
+    def log_loss(temperature):
+        loss = 0.0
+        for s, intent in scored:
+            probs = _softmax(s, temperature)
+            loss -= (1 - LABEL_SMOOTHING) * math.log(max(probs.get(intent, 0.0), 1e-12))
+            loss -= LABEL_SMOOTHING / k * sum(math.log(max(p, 1e-12)) for p in probs.values())
+        return loss
+
+    return min(TEMPERATURES, key=log_loss)
+
+
+# ── Persistence ────────────────────────────────────────────────────────────────
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def save_model(model: dict):
+    os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
+    with open(MODEL_PATH, "w", encoding="utf-8") as f:
+        json.dump(model, f)
+
+
+def load_model() -> dict | None:
+    global _model
+    with _model_lock:
+        if _model is None and os.path.exists(MODEL_PATH):
+            try:
+                with open(MODEL_PATH, encoding="utf-8") as f:
+                    _model = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                _model = None
+        return _model
+
+
+def _trusted(model: dict) -> bool:
+    """Enough data, and a holdout evaluation good enough to act on."""
+    return (model.get("n_examples", 0) >= MIN_TRAINING_EXAMPLES
+            and model.get("holdout_size", 0) >= MIN_HOLDOUT_SIZE
+            and (model.get("holdout_accuracy") or 0.0) >= MIN_HOLDOUT_ACCURACY)
+
+
+def classify(message: str) -> tuple[str, float]:
+    """Classify with the persisted model. Returns confidence 0.0 when no model exists."""
+    model = load_model()
+    if not model or not _trusted(model):
+        return "general", 0.0
+    return predict(model, message)
+
+
+# ── Retraining & Report ────────────────────────────────────────────────────────
+
+def evaluate(examples: list[dict], holdout: float = 0.2, seed: int = 42) -> dict:
+    """Train on a random split and report accuracy, calibrated temperature and per-message latency."""
+    shuffled = examples[:]
+    random.Random(seed).shuffle(shuffled)
+    cut = max(1, int(len(shuffled) * (1 - holdout)))
+    train_set, test_set = shuffled[:cut], shuffled[cut:]
+    if not test_set:
+        return {"accuracy": None, "temperature": None, "avg_latency_ms": None, "test_size": 0}
+
+    model = train(train_set)
+    model["temperature"] = calibrate(model, test_set)
+    correct = 0
+    start = time.perf_counter()
+    for ex in test_set:
+        intent, _ = predict(model, ex["message"])
+        correct += intent == ex["intent"]
+    elapsed = time.perf_counter() - start
+
+    return {
+        "accuracy": round(correct / len(test_set), 3),
+        "temperature": model["temperature"],
+        "avg_latency_ms": round(elapsed / len(test_set) * 1000, 3),
+        "test_size": len(test_set),
+    }
+
+
+def retrain() -> dict:
+    """Retrain on the LLM router's logged decisions, persist the model, and return a report."""
+    global _model
+    flush()
+    examples = get_decisions(source="llm")
+    report = {"examples": len(examples), "intents": {}}
+    for ex in examples:
+        report["intents"][ex["intent"]] = report["intents"].get(ex["intent"], 0) + 1
+    if not examples:
+        return report
+
+    report.update(evaluate(examples))
+    model = train(examples)
+    model["temperature"] = report["temperature"] or 1.0
+    model["holdout_accuracy"] = report["accuracy"]
+    model["holdout_size"] = report["test_size"]
+    save_model(model)
+    with _model_lock:
+        _model = model
+    report["active"] = _trusted(model)
+    return report
+
+
+
+if __name__ == "__main__":
+    r = retrain()
+    print(f"Training examples : {r['examples']}")
+    for intent, count in sorted(r["intents"].items(), key=lambda x: -x[1]):
+        print(f"  {intent:<16} {count}")
+    if r["examples"]:
+        print(f"Holdout accuracy  : {r['accuracy']}  (n={r['test_size']})")
+        print(f"Avg latency       : {r['avg_latency_ms']} ms / message")
+        print(f"Temperature       : {r['temperature']}")
+        print(f"Model active      : {r['active']} (needs {MIN_TRAINING_EXAMPLES}+ examples and "
+              f"{MIN_HOLDOUT_ACCURACY:.0%}+ holdout accuracy on {MIN_HOLDOUT_SIZE}+ messages)")
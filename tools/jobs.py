@@ -0,0 +1,227 @@
+"""
+Background Jobs — run slow LLM work (knowledge graphs, weekly reports) off the
+Streamlit script thread. Jobs are rows in a local SQLite table that a small
+worker pool picks up; pages store the job id, poll get_job() and render the
+result once it is done, so a rerun or page switch never loses the work.
+
+Status: queued → running → done | failed
+
+Jobs are never resumed by another process: a job cut off by a restart would
+run again unasked, long after its owner stopped waiting. Jobs still queued or
+running STALE_AFTER seconds after they were last touched are marked failed instead,
+and a worker only runs a job it can atomically claim from 'queued'.
+
+Finished rows hold whole course texts and graph HTML, so submit_job() prunes
+them: each owner keeps its KEEP_PER_OWNER newest finished jobs of a kind, and
+finished jobs older than JOB_TTL are dropped for everyone.
+"""
+
+import sqlite3
+import os
+import importlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "jobs.db")
+# Resolves to project_root/data/jobs.db
+
+WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+POLL_INTERVAL = 1.5  # seconds between page reruns while a job is pending
+STALE_AFTER = int(os.getenv("JOB_STALE_AFTER", "900"))   # seconds before an unfinished job is given up on
+EXPIRE_EVERY = 60    # seconds between sweeps for stale jobs
+KEEP_PER_OWNER = int(os.getenv("JOB_KEEP_PER_OWNER", "3"))   # finished jobs kept per (kind, owner)
+JOB_TTL = int(os.getenv("JOB_TTL", str(7 * 24 * 3600)))       # seconds a finished job is kept at most
+
+# kind -> "module:function"; the function is called with the job's params as kwargs
+JOB_KINDS = {
+    "graph":         "agents.graph_agent:run_graph_agent",
+    "weekly_report": "agents.analytics_agent:generate_weekly_report",
+}
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="job")
+_lock = threading.Lock()
+_last_sweep = 0.0
+_schema_ready = False  # tables are created on first connection, not at import
+
+
+def _connect():
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=10)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_db():
+    """Create the jobs table if it doesn't exist."""
+    global _schema_ready
+    conn = _connect()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id           INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind         TEXT    NOT NULL,
+            owner        TEXT    DEFAULT '',
+            status       TEXT    DEFAULT 'queued',
+            params       TEXT    NOT NULL,
+            result       TEXT,
+            error        TEXT,
+            created_at   TEXT    DEFAULT (datetime('now')),
+            started_at   TEXT,
+            finished_at  TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_owner ON jobs (kind, owner, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+    conn.commit()
+    conn.close()
+    _schema_ready = True
+
+
+def get_connection():
+    """Open a connection, creating the tables on first use."""
+    if not _schema_ready:
+        init_db()
+    return _connect()
+
+
+def _row_to_job(row) -> dict:
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    return job
+
+
+# ── Worker ─────────────────────────────────────────────────────────────────────
+
+def _resolve(kind: str):
+    module_name, _, func_name = JOB_KINDS[kind].partition(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _run(job_id: int):
+    from tools import fairshare
+    conn = get_connection()
+    # Claim the job; it may have been expired (or run by another worker) meanwhile
+    claimed = conn.execute(
+        "UPDATE jobs SET status = 'running', started_at = datetime('now') WHERE id = ? AND status = 'queued'",
+        (job_id,)
+    ).rowcount
+    conn.commit()
+    row = conn.execute("SELECT kind, owner, params FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    conn.close()
+    if not claimed:
+        return
+
+    try:
+        # Background work yields to interactive requests in the shared LLM queue
+        with fairshare.tenant(row["owner"], weight=fairshare.BACKGROUND_WEIGHT):
+            result = _resolve(row["kind"])(**json.loads(row["params"]))
+        update = ("done", json.dumps(result), None)
+    except Exception as e:
+        update = ("failed", None, f"{type(e).__name__}: {e}")
+
+    conn = get_connection()
+    conn.execute(
+        """UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = datetime('now')
+           WHERE id = ?""",
+        (*update, job_id)
+    )
+    conn.commit()
+    conn.close()
+
+
+def _expire_stale():
+    """Fail jobs left unfinished by a process that stopped (restart, crash); at most once per EXPIRE_EVERY."""
+    global _last_sweep
+    with _lock:
+        if time.monotonic() - _last_sweep < EXPIRE_EVERY:
+            return
+        _last_sweep = time.monotonic()
+    conn = get_connection()
+    conn.execute(
+        """UPDATE jobs SET status = 'failed', error = 'Interrupted: the job did not finish in time (the app may have restarted).',
+                           finished_at = datetime('now')
+           WHERE status IN ('queued', 'running')
+             AND COALESCE(started_at, created_at) < datetime('now', ?)""",
+        (f"-{STALE_AFTER} seconds",)
+    )
+    conn.commit()
+    conn.close()
+
+
+def _prune(conn, kind: str, owner: str):
+    """Drop finished jobs past the owner's KEEP_PER_OWNER newest, and any older than JOB_TTL."""
+    conn.execute(
+        """DELETE FROM jobs WHERE kind = ? AND owner = ? AND status IN ('done', 'failed') AND id NOT IN (
+               SELECT id FROM jobs WHERE kind = ? AND owner = ? AND status IN ('done', 'failed')
+               ORDER BY id DESC LIMIT ?)""",
+        (kind, owner, kind, owner, KEEP_PER_OWNER)
+    )
+    conn.execute(
+        "DELETE FROM jobs WHERE status IN ('done', 'failed') AND COALESCE(finished_at, created_at) < datetime('now', ?)",
+        (f"-{JOB_TTL} seconds",)
+    )
+
+
+# ── Public API ─────────────────────────────────────────────────────────────────
+
+def submit_job(kind: str, params: dict, owner: str = "") -> int:
+    """
+    Queue a job and hand it to the worker pool.
+
+    Args:
+        kind: One of JOB_KINDS
+        params: JSON-serialisable keyword arguments for the job function
+        owner: The browser's ui.client_id(), so each student finds their own latest job
+
+    Returns:
+        The job id
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind '{kind}' (use {', '.join(JOB_KINDS)})")
+    _expire_stale()
+    conn = get_connection()
+    _prune(conn, kind, owner)
+    cursor = conn.execute(
+        "INSERT INTO jobs (kind, owner, params) VALUES (?, ?, ?)",
+        (kind, owner, json.dumps(params))
+    )
+    conn.commit()
+    conn.close()
+    _executor.submit(_run, cursor.lastrowid)
+    return cursor.lastrowid
+
+
+def get_job(job_id: int) -> dict | None:
+    """A job with its decoded params and result, or None."""
+    conn = get_connection()
+    row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    conn.close()
+    return _row_to_job(row) if row else None
+
+
+def latest_job(kind: str, owner: str = "") -> dict | None:
+    """The most recent job of this kind for an owner, or None."""
+    _expire_stale()
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT * FROM jobs WHERE kind = ? AND owner = ? ORDER BY id DESC LIMIT 1", (kind, owner)
+    ).fetchone()
+    conn.close()
+    return _row_to_job(row) if row else None
+
+
+def is_pending(job: dict | None) -> bool:
+    return job is not None and job["status"] in ("queued", "running")
+
+
+def clear_jobs(kind: str, owner: str = "") -> int:
+    """Delete an owner's finished jobs of this kind. Returns rows removed."""
+    conn = get_connection()
+    cursor = conn.execute(
+        "DELETE FROM jobs WHERE kind = ? AND owner = ? AND status IN ('done', 'failed')", (kind, owner)
+    )
+    conn.commit()
+    conn.close()
+    return cursor.rowcount
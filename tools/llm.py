@@ -0,0 +1,298 @@
+"""
+LLM Registry — process-wide pool of Mistral chat clients.
+One ChatMistralAI per (model, temperature, max_tokens), all sharing keep-alive HTTP
+connections, so Streamlit sessions and threads reuse TLS connections
+instead of opening a new one on every call.
+
+Agents get an AgentLLM handle from get_llm(); its invoke() goes through the
+persistent response cache in tools/llm_cache.py before hitting the API, and
+records an "llm" span (tools/tracing.py) for every call. Concurrent identical
+requests share one API call (tools/singleflight.py), and every API call is
+rate limited, retried and circuit-broken by tools/resilience.py, each attempt
+waiting its turn in the per-user/per-room fair queue (tools/fairshare.py). Latency-
+sensitive calls can be hedged (tools/hedging.py), and requests made inside a
+budgeted graph node are cut off at its deadline (tools/deadlines.py). With
+LLM_CASSETTE_MODE set, HTTP traffic is recorded or replayed by tools/cassette.py.
+"""
+
+import os
+import asyncio
+import threading
+import weakref
+import httpx
+from langchain_mistralai import ChatMistralAI
+from langchain_core.messages import AIMessage
+
+from tools import llm_cache, cassette, singleflight, resilience, hedging, deadlines, fairshare
+from tools.model_tiers import resolve
+from tools.tracing import span
+
+DEFAULT_MODEL = "mistral-large-latest"
+DEFAULT_BASE_URL = "https://api.mistral.ai/v1"
+
+POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "32")),
+    max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "16")),
+    keepalive_expiry=60.0,
+)
+HTTP_TIMEOUT = 120
+
+_lock = threading.Lock()
+_http_clients = {}   # (api_key, base_url, cassette mode) -> httpx.Client
+_models = {}         # (api_key, base_url, model, temperature, max_tokens, cassette mode) -> ChatMistralAI
+# httpx.AsyncClient connections are bound to the event loop that opened them,
+# so async clients and the models that use them are pooled per running loop.
+_async_clients = weakref.WeakKeyDictionary()   # loop -> {(api_key, base_url, cassette mode): httpx.AsyncClient}
+_async_models = weakref.WeakKeyDictionary()    # loop -> {model key: ChatMistralAI}
+_stats = {"hits": 0, "misses": 0}
+
+
+def _settings() -> tuple[str, str]:
+    """Current API key and base URL — read on every call so a key entered in the sidebar applies."""
+    return os.getenv("MISTRAL_API_KEY") or "", os.getenv("MISTRAL_BASE_URL") or DEFAULT_BASE_URL
+
+
+def _headers(api_key: str) -> dict:
+    return {
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Authorization": f"Bearer {api_key}",
+    }
+
+
+def _get_http_client(api_key: str, base_url: str) -> httpx.Client:
+    key = (api_key, base_url, cassette.get_mode())
+    client = _http_clients.get(key)
+    if client is None:
+        client = httpx.Client(
+            base_url=base_url, headers=_headers(api_key), timeout=HTTP_TIMEOUT,
+            transport=cassette.wrap_transport(deadlines.wrap_transport(httpx.HTTPTransport(limits=POOL_LIMITS))),
+        )
+        _http_clients[key] = client
+    return client
+
+
+def _get_async_http_client(loop, api_key: str, base_url: str) -> httpx.AsyncClient:
+    clients = _async_clients.setdefault(loop, {})
+    key = (api_key, base_url, cassette.get_mode())
+    client = clients.get(key)
+    if client is None:
+        client = httpx.AsyncClient(
+            base_url=base_url, headers=_headers(api_key), timeout=HTTP_TIMEOUT,
+            transport=cassette.wrap_async_transport(
+                deadlines.wrap_async_transport(httpx.AsyncHTTPTransport(limits=POOL_LIMITS))
+            ),
+        )
+        clients[key] = client
+    return client
+
+
+def get_chat_model(model: str = DEFAULT_MODEL, temperature: float = 0.1, max_tokens: int = None) -> ChatMistralAI:
+    """Return the pooled chat client for (model, temperature, max_tokens), for synchronous calls."""
+    api_key, base_url = _settings()
+    key = (api_key, base_url, model, temperature, max_tokens, cassette.get_mode())
+
+    with _lock:
+        llm = _models.get(key)
+        if llm is not None:
+            _stats["hits"] += 1
+            return llm
+
+        _stats["misses"] += 1
+        llm = ChatMistralAI(
+            model=model,
+            mistral_api_key=api_key,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            endpoint=base_url,
+            client=_get_http_client(api_key, base_url),
+            max_retries=0,   # retries are handled by tools/resilience.py
+        )
+        _models[key] = llm
+        return llm
+
+
+def get_async_chat_model(model: str = DEFAULT_MODEL, temperature: float = 0.1, max_tokens: int = None) -> ChatMistralAI:
+    """Return the pooled chat client for (model, temperature, max_tokens) on the running event loop."""
+    loop = asyncio.get_running_loop()
+    api_key, base_url = _settings()
+    key = (api_key, base_url, model, temperature, max_tokens, cassette.get_mode())
+
+    with _lock:
+        models = _async_models.setdefault(loop, {})
+        llm = models.get(key)
+        if llm is not None:
+            _stats["hits"] += 1
+            return llm
+
+        _stats["misses"] += 1
+        llm = ChatMistralAI(
+            model=model,
+            mistral_api_key=api_key,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            endpoint=base_url,
+            client=_get_http_client(api_key, base_url),
+            async_client=_get_async_http_client(loop, api_key, base_url),
+            max_retries=0,
+        )
+        models[key] = llm
+        return llm
+
+
+def _open_connections(client) -> int:
+    """Count live connections in an httpx client's pool (0 if not introspectable)."""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    return len(getattr(pool, "connections", []) or [])
+
+
+def get_pool_stats() -> dict:
+    """Registry counters: cache hits/misses, pooled models, open HTTP connections."""
+    with _lock:
+        async_clients = [c for clients in _async_clients.values() for c in clients.values()]
+        open_conns = sum(_open_connections(c) for c in list(_http_clients.values()) + async_clients)
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "models": len(_models) + sum(len(m) for m in _async_models.values()),
+            "http_clients": len(_http_clients) + len(async_clients),
+            "open_connections": open_conns,
+        }
+
+
+# ── Agent Handle ───────────────────────────────────────────────────────────────
+
+def _prompt_chars(messages: list) -> int:
+    return sum(len(m.content) if isinstance(m.content, str) else len(str(m.content)) for m in messages)
+
+
+def _record_response(s, messages: list, response: AIMessage):
+    s.prompt_chars = _prompt_chars(messages)
+    usage = getattr(response, "usage_metadata", None) or {}
+    s.prompt_tokens = usage.get("input_tokens") or s.prompt_chars // 4
+    s.response_chars = len(response.content) if isinstance(response.content, str) else 0
+
+
+def _with_tools(chat_model: ChatMistralAI, tools: list | None, tool_choice: str | None):
+    return chat_model.bind_tools(tools, tool_choice=tool_choice) if tools else chat_model
+
+
+class AgentLLM:
+    """Per-agent view of a pooled chat model; invoke() is cached by default."""
+
+    def __init__(self, agent: str, model: str = DEFAULT_MODEL, temperature: float = 0.1, max_tokens: int = None):
+        self.agent = agent
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+    @property
+    def chat_model(self) -> ChatMistralAI:
+        return get_chat_model(self.model, self.temperature, self.max_tokens)
+
+    def _hedged(self, hedge: bool) -> bool:
+        return hedging.ENABLED and (hedge or hedging.is_requested())
+
+    def invoke(self, messages: list, use_cache: bool = True, stream_tokens: bool = True,
+               hedge: bool = False, tools: list = None, tool_choice: str = None) -> AIMessage:
+        """
+        Run a chat completion.
+
+        Args:
+            messages: LangChain messages to send
+            use_cache: Set False at call sites that must always hit the API
+            stream_tokens: Set False for structured (JSON) output so that
+                orchestrator streaming doesn't show raw tokens to the student
+            hedge: Fire a second request if this one is slow (latency-sensitive
+                paths only). Hedged calls never stream: two racing streams
+                would interleave their tokens.
+            tools: OpenAI-style function schemas the model may call; the calls
+                come back in response.tool_calls. Tool calls are never cached.
+            tool_choice: "auto", "any" (must call a tool) or a tool name
+
+        Identical requests already in flight are coalesced into one API call.
+        """
+        hedge = self._hedged(hedge)
+        # "nostream" is LangGraph's tag for excluding a model from stream_mode="messages"
+        config = None if stream_tokens and not hedge else {"tags": ["nostream"]}
+        # Cassette runs must see every request, not whatever the local cache holds
+        use_cache = use_cache and not cassette.get_mode() and not tools
+        key = llm_cache.make_key(self.model, self.temperature, messages, self.max_tokens, tools)
+
+        with span(self.agent, "llm") as s:
+            if use_cache:
+                cached = llm_cache.lookup(key, self.agent)
+                if cached is not None:
+                    s.cache = "hit"
+                    response = AIMessage(content=cached)
+                    _record_response(s, messages, response)
+                    return response
+                s.cache = "miss"
+            else:
+                llm_cache.record_bypass(self.agent)
+                s.cache = "bypass"
+
+            tokens = _prompt_chars(messages) // 4
+            request = lambda: resilience.call(
+                lambda: _with_tools(self.chat_model, tools, tool_choice).invoke(messages, config=config),
+                tokens, on_start=s.mark_started, slot=fairshare.slot
+            )
+            if hedge:
+                unhedged = request
+                request = lambda: hedging.call(unhedged, self.agent)
+            response, shared = singleflight.do(key, request, agent=self.agent)
+            _record_response(s, messages, response)
+            if shared:
+                s.cache = "coalesced"
+            elif use_cache and isinstance(response.content, str) and response.content:
+                llm_cache.store(key, self.agent, response.content)
+            return response
+
+    async def ainvoke(self, messages: list, use_cache: bool = True, stream_tokens: bool = True,
+                      hedge: bool = False, tools: list = None, tool_choice: str = None) -> AIMessage:
+        """Async invoke(); cache reads and writes run in the default executor."""
+        hedge = self._hedged(hedge)
+        config = None if stream_tokens and not hedge else {"tags": ["nostream"]}
+        use_cache = use_cache and not cassette.get_mode() and not tools
+        key = llm_cache.make_key(self.model, self.temperature, messages, self.max_tokens, tools)
+        chat_model = _with_tools(get_async_chat_model(self.model, self.temperature, self.max_tokens), tools, tool_choice)
+
+        with span(self.agent, "llm") as s:
+            if use_cache:
+                cached = await asyncio.to_thread(llm_cache.lookup, key, self.agent)
+                if cached is not None:
+                    s.cache = "hit"
+                    response = AIMessage(content=cached)
+                    _record_response(s, messages, response)
+                    return response
+                s.cache = "miss"
+            else:
+                llm_cache.record_bypass(self.agent)
+                s.cache = "bypass"
+
+            tokens = _prompt_chars(messages) // 4
+            request = lambda: resilience.acall(
+                lambda: chat_model.ainvoke(messages, config=config), tokens,
+                on_start=s.mark_started, slot=fairshare.aslot
+            )
+            if hedge:
+                unhedged = request
+                request = lambda: hedging.acall(unhedged, self.agent)
+            response, shared = await singleflight.ado(key, request, agent=self.agent)
+            _record_response(s, messages, response)
+            if shared:
+                s.cache = "coalesced"
+            elif use_cache and isinstance(response.content, str) and response.content:
+                await asyncio.to_thread(llm_cache.store, key, self.agent, response.content)
+            return response
+
+
+def get_llm(agent: str, temperature: float = 0.1, model: str = None, task: str = None) -> AgentLLM:
+    """
+    Handle for an agent (and optionally one of its tasks, e.g. "quick_insight").
+    The model and max_tokens cap come from tools/model_tiers.py unless a model is given.
+    """
+    if model is not None:
+        return AgentLLM(agent, model=model, temperature=temperature)
+    model, max_tokens = resolve(agent, task)
+    return AgentLLM(agent, model=model, temperature=temperature, max_tokens=max_tokens)
@@ -0,0 +1,193 @@
+"""
+LLM Response Cache — persistent SQLite cache for chat completions.
+Keyed on a hash of model, temperature and the normalized message list,
+with per-agent TTLs and size-bounded LRU eviction.
+"""
+
+import sqlite3
+import os
+import json
+import hashlib
+import re
+import threading
+import time
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "llm_cache.db")
+# Resolves to project_root/data/llm_cache.db
+
+MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+
+# Seconds a cached response stays valid, per agent. 0 disables caching.
+DEFAULT_TTL = 24 * 3600
+AGENT_TTLS = {
+    "router":         7 * 24 * 3600,
+    "course_agent":   7 * 24 * 3600,
+    "graph_agent":    7 * 24 * 3600,
+    "revision_agent": 24 * 3600,
+    "collab_agent":   24 * 3600,
+    "research_agent": 3600,       # web results go stale quickly
+    "analytics_agent": 3600,
+    "general":        3600,
+    "history":        7 * 24 * 3600,   # summaries are a pure function of the transcript
+    "deadline_agent": 0,          # actions mutate the database — never replay
+}
+
+_stats_lock = threading.Lock()
+_stats = {}  # agent -> {"hits": int, "misses": int, "bypassed": int}
+
+
+_schema_ready = False  # tables are created on first connection, not at import
+
+
+def _connect():
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def init_cache_db():
+    global _schema_ready
+    conn = _connect()
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key          TEXT PRIMARY KEY,
+            agent        TEXT NOT NULL,
+            response     TEXT NOT NULL,
+            created_at   REAL NOT NULL,
+            last_access  REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access);
+    """)
+    conn.commit()
+    conn.close()
+    _schema_ready = True
+
+
+def get_connection():
+    """Open a connection, creating the tables on first use."""
+    if not _schema_ready:
+        init_cache_db()
+    return _connect()
+
+
+# ── Keys ───────────────────────────────────────────────────────────────────────
+
+def normalize_messages(messages: list) -> list:
+    """Reduce LangChain messages to [(type, whitespace-collapsed content), ...]."""
+    normalized = []
+    for m in messages:
+        content = m.content if isinstance(m.content, str) else json.dumps(m.content, sort_keys=True)
+        normalized.append((m.type, re.sub(r"\s+", " ", content).strip()))
+    return normalized
+
+
+def make_key(model: str, temperature: float, messages: list, max_tokens: int = None, tools: list = None) -> str:
+    parts = [model, temperature, normalize_messages(messages)]
+    if max_tokens:
+        parts.append(max_tokens)
+    if tools:
+        parts.append(tools)
+    payload = json.dumps(parts, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_ttl(agent: str) -> int:
+    return AGENT_TTLS.get(agent, DEFAULT_TTL)
+
+
+# ── Stats ──────────────────────────────────────────────────────────────────────
+
+def _record(agent: str, field: str):
+    with _stats_lock:
+        s = _stats.setdefault(agent, {"hits": 0, "misses": 0, "bypassed": 0})
+        s[field] += 1
+
+
+def get_cache_stats() -> dict:
+    """Per-agent hit/miss/bypass counters plus totals and current cache size."""
+    with _stats_lock:
+        per_agent = {a: dict(s) for a, s in _stats.items()}
+    hits = sum(s["hits"] for s in per_agent.values())
+    misses = sum(s["misses"] for s in per_agent.values())
+    conn = get_connection()
+    size = conn.execute("SELECT COUNT(*) AS c FROM llm_cache").fetchone()["c"]
+    conn.close()
+    return {
+        "agents": per_agent,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        "entries": size,
+        "max_entries": MAX_ENTRIES,
+    }
+
+
+# ── Lookup / Store ─────────────────────────────────────────────────────────────
+
+def lookup(key: str, agent: str) -> str | None:
+    """Return the cached response if present and within the agent's TTL."""
+    ttl = get_ttl(agent)
+    if ttl <= 0:
+        _record(agent, "bypassed")
+        return None
+
+    now = time.time()
+    conn = get_connection()
+    row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key=?", (key,)).fetchone()
+    if row and now - row["created_at"] <= ttl:
+        conn.execute("UPDATE llm_cache SET last_access=? WHERE key=?", (now, key))
+        conn.commit()
+        conn.close()
+        _record(agent, "hits")
+        return row["response"]
+
+    if row:
+        conn.execute("DELETE FROM llm_cache WHERE key=?", (key,))
+        conn.commit()
+    conn.close()
+    _record(agent, "misses")
+    return None
+
+
+def store(key: str, agent: str, response: str):
+    """Insert or refresh a response, evicting least-recently-used rows over the size bound."""
+    if get_ttl(agent) <= 0:
+        return
+    now = time.time()
+    conn = get_connection()
+    conn.execute(
+        "INSERT OR REPLACE INTO llm_cache (key, agent, response, created_at, last_access) VALUES (?,?,?,?,?)",
+        (key, agent, response, now, now)
+    )
+    count = conn.execute("SELECT COUNT(*) AS c FROM llm_cache").fetchone()["c"]
+    if count > MAX_ENTRIES:
+        conn.execute(
+            "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+            (count - MAX_ENTRIES,)
+        )
+    conn.commit()
+    conn.close()
+
+
+def forget(key: str):
+    """Remove one entry, e.g. a response its caller couldn't use."""
+    conn = get_connection()
+    conn.execute("DELETE FROM llm_cache WHERE key=?", (key,))
+    conn.commit()
+    conn.close()
+
+
+def record_bypass(agent: str):
+    _record(agent, "bypassed")
+
+
+def clear_cache(agent: str = None):
+    conn = get_connection()
+    if agent:
+        conn.execute("DELETE FROM llm_cache WHERE agent=?", (agent,))
+    else:
+        conn.execute("DELETE FROM llm_cache")
+    conn.commit()
+    conn.close()
@@ -0,0 +1,307 @@
+"""
+Mock Mistral — local stand-in for the chat-completions API, for load tests.
+Speaks POST /v1/chat/completions (plain and SSE streaming) and returns
+schema-valid canned JSON for the router, deadline, quiz and graph prompts
+(and tool calls when the request offers tools), with configurable latency
+distributions and error rates.
+
+Run it and point the app at it:
+    python -m tools.mock_mistral --port 8765 --latency lognormal:600:0.5 --error-rate 0.02
+    MISTRAL_BASE_URL=http://127.0.0.1:8765/v1 MISTRAL_API_KEY=mock streamlit run app.py
+
+Latency specs (milliseconds until the first token):
+    const:300  uniform:200:800  normal:500:120  lognormal:<median>:<sigma>  exp:<mean>
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+
+
+# ── Latency ────────────────────────────────────────────────────────────────────
+
+def parse_latency(spec: str, rng: random.Random = random):
+    """Turn a latency spec into a sampler returning seconds, drawing from rng."""
+    kind, *params = spec.split(":")
+    p = [float(x) for x in params]
+    samplers = {
+        "const":     lambda: p[0],
+        "uniform":   lambda: rng.uniform(p[0], p[1]),
+        "normal":    lambda: max(0.0, rng.gauss(p[0], p[1])),
+        "lognormal": lambda: rng.lognormvariate(math.log(p[0]), p[1]),
+        "exp":       lambda: rng.expovariate(1 / p[0]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution '{kind}' (use {', '.join(samplers)})")
+    sample = samplers[kind]
+    sample()  # fail fast on missing parameters
+    return lambda: sample() / 1000
+
+
+class MockConfig:
+    def __init__(self, latency: str = "const:0", tokens_per_sec: float = 80.0,
+                 error_rate: float = 0.0, error_statuses: tuple = (429, 500), seed: int = None):
+        self.random = random.Random(seed)   # one seeded stream for latency and errors, so runs replay
+        self.latency = latency
+        self.sample_latency = parse_latency(latency, self.random)
+        self.tokens_per_sec = tokens_per_sec
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+
+
+# ── Canned Responses ───────────────────────────────────────────────────────────
+
+def _last_user(messages: list) -> str:
+    for m in reversed(messages):
+        if m.get("role") == "user":
+            content = m.get("content") or ""
+            return content if isinstance(content, str) else json.dumps(content)
+    return ""
+
+
+def _route(text: str) -> dict:
+    from tools.fast_router import fast_route
+    text = re.sub(r"^Student message:\s*", "", text)
+    intent, confidence = fast_route(text)
+    if confidence == 0.0:
+        intent = "general"
+    return {"intent": intent, "intents": [intent], "reasoning": "Mock routing by keyword rules."}
+
+
+def _deadline(text: str) -> dict:
+    lowered = text.lower()
+    if any(w in lowered for w in ("list", "show", "what are")):
+        return {"action": "list", "data": {"status": "pending"}, "user_message": "Here are your deadlines."}
+    if "upcoming" in lowered or "this week" in lowered:
+        return {"action": "upcoming", "data": {"days": 7}, "user_message": "Here's what's coming up."}
+    due = (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d")
+    return {
+        "action": "add",
+        "data": {"title": text[:60] or "Mock deadline", "due_date": due, "subject": "General",
+                 "priority": "medium", "notes": ""},
+        "user_message": "Added — good luck!",
+    }
+
+
+def _questions(n: int, with_source: bool = False) -> list:
+    questions = []
+    for i in range(1, n + 1):
+        q = {
+            "id": i,
+            "question": f"Mock question {i}: which option is correct?",
+            "options": ["A) First", "B) Second", "C) Third", "D) Fourth"],
+            "answer": "ABCD"[i % 4],
+            "explanation": "Canned explanation from the mock server.",
+        }
+        if with_source:
+            q["source"] = "Mock material"
+        questions.append(q)
+    return questions
+
+
+def _revision(text: str) -> dict:
+    lowered = text.lower()
+    if "flashcard" in lowered:
+        return {"type": "flashcards", "title": "Mock Flashcards",
+                "cards": [{"id": i, "front": f"Term {i}", "back": f"Definition {i}"} for i in range(1, 6)]}
+    if "summary" in lowered or "summarize" in lowered:
+        return {"type": "summary", "title": "Mock Summary", "content": "## Key points\n- One\n- Two\n- Three"}
+    return {"type": "quiz", "title": "Mock Quiz", "questions": _questions(5)}
+
+
+def _graph(n_nodes: int = 20) -> dict:
+    categories = ["core", "concept", "method", "definition", "example", "formula"]
+    nodes = [
+        {"id": f"node_{i}", "label": f"Concept {i}", "category": "core" if i == 0 else categories[1 + i % 5],
+         "description": f"Mock concept number {i}.", "importance": 5 - min(4, i // 5)}
+        for i in range(n_nodes)
+    ]
+    edges = [
+        {"source": f"node_{(i - 1) // 2}", "target": f"node_{i}", "relation": "leads to", "strength": 1 + i % 3}
+        for i in range(1, n_nodes)
+    ]
+    return {"title": "Mock Knowledge Graph", "nodes": nodes, "edges": edges}
+
+
+PROSE = ("This is a canned answer from the local mock Mistral server. It is long enough to "
+         "exercise token streaming and markdown rendering without calling the real API.")
+
+
+def canned_response(messages: list) -> str:
+    """Pick a response shape from the agent's system prompt."""
+    system = " ".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+    text = _last_user(messages)
+
+    if "Orchestrator of a Student AI Assistant" in system:
+        return json.dumps(_route(text))
+    if "Deadline Tracker Agent" in system:
+        return json.dumps(_deadline(text))
+    if "group quiz" in system:
+        return json.dumps({"title": "Mock Group Quiz", "questions": _questions(8, with_source=True)})
+    if "Revision Agent — an expert at creating" in system:
+        return json.dumps(_revision(text))
+    if "Knowledge Graph Builder" in system:
+        return json.dumps(_graph())
+    if "running summary" in system:
+        return "The student has been discussing their courses and upcoming work."
+    return PROSE
+
+
+DEADLINE_ACTION_TOOLS = {"add": "add_deadline", "list": "list_deadlines", "upcoming": "upcoming_deadlines"}
+
+
+def canned_tool_calls(messages: list, tools: list) -> list:
+    """Tool calls for a request that offers tools: a deadline action or a route call."""
+    names = [t.get("function", {}).get("name") for t in tools]
+    text = re.sub(r"^Student message:\s*", "", _last_user(messages))
+    route = _route(text)
+    action = _deadline(text) if route["intent"] == "deadline_agent" else None
+    if action and DEADLINE_ACTION_TOOLS[action["action"]] in names:
+        name, args = DEADLINE_ACTION_TOOLS[action["action"]], {**action["data"], "user_message": action["user_message"]}
+    elif "route" in names:
+        name, args = "route", {"intents": route["intents"], "reasoning": route["reasoning"]}
+    else:
+        name, args = names[0], {}
+    return [{"id": uuid.uuid4().hex[:9], "type": "function",
+             "function": {"name": name, "arguments": json.dumps(args)}}]
+
+
+# ── HTTP ───────────────────────────────────────────────────────────────────────
+
+def _tokens(text: str) -> list[str]:
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    config: MockConfig = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mistral-large-latest", "object": "model"}]})
+        else:
+            self._send_json(404, {"object": "error", "message": "Not found", "type": "invalid_request_error"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            return self._send_json(400, {"object": "error", "message": "Invalid JSON", "type": "invalid_request_error"})
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send_json(404, {"object": "error", "message": "Not found", "type": "invalid_request_error"})
+
+        cfg = self.config
+        time.sleep(cfg.sample_latency())
+
+        if cfg.random.random() < cfg.error_rate:
+            status = cfg.random.choice(cfg.error_statuses)
+            kind = "rate_limited" if status == 429 else "internal_server_error"
+            return self._send_json(status, {"object": "error", "message": f"Mock {kind}", "type": kind, "code": status})
+
+        tool_calls = canned_tool_calls(request.get("messages", []), request["tools"]) if request.get("tools") else None
+        content = "" if tool_calls else canned_response(request.get("messages", []))
+        model = request.get("model", "mistral-large-latest")
+        completion_id = uuid.uuid4().hex
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in request.get("messages", [])) // 4 + 1
+        tokens = _tokens(content) or ([json.dumps(tool_calls)] if tool_calls else [])
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                 "total_tokens": prompt_tokens + len(tokens)}
+        per_token = 1 / cfg.tokens_per_sec if cfg.tokens_per_sec > 0 else 0.0
+
+        message = {"role": "assistant", "content": content}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        finish_reason = "tool_calls" if tool_calls else "stop"
+
+        if not request.get("stream"):
+            time.sleep(per_token * len(tokens))
+            return self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage,
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta: dict, finish_reason=None, with_usage=False):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            if with_usage:
+                chunk["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        event({"role": "assistant", "content": ""})
+        if tool_calls:
+            time.sleep(per_token * len(tokens))
+            event({"content": "", "tool_calls": tool_calls})
+        else:
+            for token in tokens:
+                time.sleep(per_token)
+                event({"content": token})
+        event({"content": ""}, finish_reason=finish_reason, with_usage=True)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, config: MockConfig = None,
+          background: bool = False) -> ThreadingHTTPServer:
+    """Start the mock server; with background=True it runs on a daemon thread and returns immediately."""
+    handler = type("ConfiguredMockHandler", (MockHandler,), {"config": config or MockConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    if background:
+        threading.Thread(target=server.serve_forever, name="mock-mistral", daemon=True).start()
+    else:
+        server.serve_forever()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock of the Mistral chat-completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", default="lognormal:600:0.5", help="time-to-first-token distribution (ms)")
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0, help="generation speed; 0 = instant")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-statuses", default="429,500", help="comma-separated HTTP statuses for failures")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        tokens_per_sec=args.tokens_per_sec,
+        error_rate=args.error_rate,
+        error_statuses=tuple(int(s) for s in args.error_statuses.split(",")),
+        seed=args.seed,
+    )
+    print(f"Mock Mistral on http://{args.host}:{args.port}/v1 — latency {args.latency}, "
+          f"{args.tokens_per_sec:g} tok/s, error rate {args.error_rate:.0%}")
+    print(f"Use: MISTRAL_BASE_URL=http://{args.host}:{args.port}/v1 MISTRAL_API_KEY=mock")
+    serve(args.host, args.port, config)
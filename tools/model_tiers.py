@@ -0,0 +1,135 @@
+"""
+Model Tiers — which Mistral model (and max_tokens cap) each agent task uses.
+Short structured tasks (routing JSON, deadline actions, two-sentence insights)
+go to the small model; long-form summaries and knowledge graphs keep the
+large one.
+
+Override without code changes:
+    LLM_MODEL_SMALL / LLM_MODEL_MEDIUM / LLM_MODEL_LARGE   model id per tier
+    LLM_TIER_OVERRIDES="router=medium,graph_agent=large:3000"   task=tier[:max_tokens]
+
+Benchmark latency per tier with:
+    python -m tools.model_tiers [--runs 5]
+"""
+
+import os
+import time
+
+TIER_MODELS = {
+    "small":  os.getenv("LLM_MODEL_SMALL", "mistral-small-latest"),
+    "medium": os.getenv("LLM_MODEL_MEDIUM", "mistral-medium-latest"),
+    "large":  os.getenv("LLM_MODEL_LARGE", "mistral-large-latest"),
+}
+
+DEFAULT_TIER = ("large", None)
+
+# "<agent>" or "<agent>.<task>" -> (tier, max_tokens or None)
+TASK_TIERS = {
+    "router":                        ("small", 150),
+    "router.tools":                  ("small", 600),    # tool-calling router: may emit a full add_deadline call
+    "history":                       ("small", 400),
+    "deadline_agent":                ("small", None),   # plan / chat replies are free-form
+    "deadline_agent.action":         ("small", 500),
+    "general":                       ("medium", None),
+    "research_agent":                ("medium", None),
+    "revision_agent":                ("medium", None),
+    "collab_agent":                  ("medium", None),
+    "collab_agent.room_question":    ("medium", 800),
+    "collab_agent.summary":          ("large", None),
+    "analytics_agent":               ("large", None),
+    "analytics_agent.quick_insight": ("small", 120),
+    "course_agent":                  ("large", None),
+    "graph_agent":                   ("large", None),
+}
+
+
+def _parse_overrides(spec: str) -> dict:
+    overrides = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        task, _, value = item.partition("=")
+        tier, _, max_tokens = value.partition(":")
+        if tier not in TIER_MODELS:
+            raise ValueError(f"LLM_TIER_OVERRIDES: unknown tier '{tier}' for '{task}' (use {', '.join(TIER_MODELS)})")
+        overrides[task.strip()] = (tier, int(max_tokens) if max_tokens else None)
+    return overrides
+
+
+TASK_TIERS.update(_parse_overrides(os.getenv("LLM_TIER_OVERRIDES", "")))
+
+
+def get_tier(agent: str, task: str = None) -> tuple[str, int | None]:
+    """(tier, max_tokens) for a task, falling back to the agent's entry, then the default."""
+    if task and f"{agent}.{task}" in TASK_TIERS:
+        return TASK_TIERS[f"{agent}.{task}"]
+    return TASK_TIERS.get(agent, DEFAULT_TIER)
+
+
+def resolve(agent: str, task: str = None) -> tuple[str, int | None]:
+    """(model id, max_tokens) for a task."""
+    tier, max_tokens = get_tier(agent, task)
+    return TIER_MODELS[tier], max_tokens
+
+
+# ── Benchmark ──────────────────────────────────────────────────────────────────
+
+BENCH_PROMPTS = {
+    "routing JSON": (
+        'Classify the intent. Respond with ONLY {"intent": "<agent>"} using one of: '
+        "course_agent, deadline_agent, revision_agent, research_agent, general.",
+        "Can you remind me that my statistics assignment is due next Thursday?",
+    ),
+    "two-sentence insight": (
+        "You are a supportive academic coach. Write exactly 2 sentences.",
+        "Student stats: 5 study sessions this week, 3-day streak, average quiz score 72%.",
+    ),
+    "long summary": (
+        "Summarize the topic for a university student in structured markdown with headings.",
+        "Explain gradient descent, its variants (SGD, momentum, Adam) and when to use each.",
+    ),
+}
+
+
+def benchmark(runs: int = 3) -> list[dict]:
+    """Time every benchmark prompt on every tier, bypassing the response cache."""
+    from langchain_core.messages import SystemMessage, HumanMessage
+    from tools.llm import get_llm
+
+    results = []
+    for tier, model in TIER_MODELS.items():
+        for name, (system, user) in BENCH_PROMPTS.items():
+            llm = get_llm("benchmark", temperature=0.0, model=model)
+            timings, tokens = [], []
+            for _ in range(runs):
+                start = time.perf_counter()
+                response = llm.invoke([SystemMessage(content=system), HumanMessage(content=user)], use_cache=False)
+                timings.append(time.perf_counter() - start)
+                usage = getattr(response, "usage_metadata", None) or {}
+                tokens.append(usage.get("output_tokens") or len(response.content) // 4)
+            timings.sort()
+            results.append({
+                "tier": tier,
+                "model": model,
+                "prompt": name,
+                "p50_s": round(timings[len(timings) // 2], 3),
+                "max_s": round(timings[-1], 3),
+                "tokens_per_s": round(sum(tokens) / sum(timings), 1) if sum(timings) else 0.0,
+            })
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare latency across model tiers")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print("Task tiers:")
+    for task, (tier, max_tokens) in sorted(TASK_TIERS.items()):
+        cap = f", max_tokens={max_tokens}" if max_tokens else ""
+        print(f"  {task:32s} {tier:6s} ({TIER_MODELS[tier]}{cap})")
+
+    print(f"\nBenchmark ({args.runs} runs per prompt):")
+    print(f"  {'tier':6s}  {'prompt':22s}  {'p50 s':>7s}  {'max s':>7s}  {'tok/s':>7s}")
+    for r in benchmark(args.runs):
+        print(f"  {r['tier']:6s}  {r['prompt']:22s}  {r['p50_s']:7.3f}  {r['max_s']:7.3f}  {r['tokens_per_s']:7.1f}")
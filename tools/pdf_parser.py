@@ -2,14 +2,14 @@
 PDF Parser Tool — extracts text from uploaded PDF files using PyMuPDF.
 """
 
-import fitz  # PyMuPDF
-
 
 def parse_pdf(file_bytes: bytes) -> str:
     """
     Extract all text from a PDF given its raw bytes.
     Returns a single string with all pages joined.
     """
+    import fitz  # PyMuPDF, loaded on first use
+
     doc = fitz.open(stream=file_bytes, filetype="pdf")
     pages_text = []
     for page_num, page in enumerate(doc, start=1):
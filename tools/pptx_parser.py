@@ -2,7 +2,6 @@
 PowerPoint Parser Tool — extracts text from .pptx files using python-pptx.
 """
 
-from pptx import Presentation
 import io
 
 
@@ -11,6 +10,8 @@ def parse_pptx(file_bytes: bytes) -> str:
     Extract all text from a PowerPoint file given its raw bytes.
     Returns a structured string with slide content.
     """
+    from pptx import Presentation
+
     prs = Presentation(io.BytesIO(file_bytes))
     slides_text = []
 
@@ -0,0 +1,315 @@
+"""
+Resilience — rate limiting, retries and a circuit breaker for Mistral calls.
+Every AgentLLM request passes through call()/acall():
+
+  1. Circuit breaker: after repeated upstream failures (5xx, timeouts,
+     connection errors), fail fast for a cool-down period instead of queueing
+     more doomed requests. A 429 is retried but never trips the breaker: the
+     upstream is healthy, only our share of it is used up.
+  2. Token buckets: process-wide requests-per-minute and tokens-per-minute
+     limits; callers wait for capacity instead of provoking 429s.
+  3. Retries: 429 / 5xx / timeouts / connection errors are retried with
+     full-jitter exponential backoff, honouring Retry-After when present.
+
+Inside a budgeted graph node (tools/deadlines.py) no wait, retry or backoff
+runs past the node's deadline; DeadlineExceeded is raised instead.
+"""
+
+import os
+import asyncio
+import math
+import random
+import threading
+import time
+import httpx
+from contextlib import nullcontext
+
+from tools.deadlines import DeadlineExceeded, remaining
+
+REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "120"))
+TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "500000"))
+
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+BACKOFF_BASE = 0.5    # seconds
+BACKOFF_MAX = 20.0
+
+FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURES", "5"))   # consecutive failures that open the circuit
+COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))         # seconds before a trial request
+
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+RATE_LIMITED = 429
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the API while the circuit breaker is open."""
+
+    def __init__(self, retry_in: float):
+        self.retry_in = max(1, math.ceil(retry_in))
+        super().__init__(f"Mistral is temporarily unavailable — try again in {self.retry_in}s.")
+
+
+# ── Token Bucket ───────────────────────────────────────────────────────────────
+
+class TokenBucket:
+    """Refills continuously at rate_per_minute; reserve() may go into debt and returns the wait."""
+
+    def __init__(self, rate_per_minute: int):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` now and return how long the caller must wait before using it."""
+        amount = min(amount, self.capacity)
+        with self.lock:
+            self._refill()
+            self.level -= amount
+            return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def charge(self, amount: float):
+        """Deduct usage discovered after the fact (e.g. completion tokens) without waiting."""
+        with self.lock:
+            self._refill()
+            self.level -= amount
+
+    def available(self) -> float:
+        with self.lock:
+            self._refill()
+            return self.level
+
+
+# ── Circuit Breaker ────────────────────────────────────────────────────────────
+
+class CircuitBreaker:
+    """closed → (FAILURE_THRESHOLD failures) → open → (COOLDOWN) → half_open → one trial call."""
+
+    def __init__(self):
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        with self.lock:
+            if self.state == "open":
+                remaining = self.opened_at + COOLDOWN - time.monotonic()
+                if remaining > 0:
+                    _record("rejected")
+                    raise CircuitOpenError(remaining)
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self.trial_in_flight:
+                    _record("rejected")
+                    raise CircuitOpenError(COOLDOWN)
+                self.trial_in_flight = True
+
+    def success(self):
+        with self.lock:
+            self.state = "closed"
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def release(self):
+        """The call was abandoned (cancelled) before an outcome — free the trial slot."""
+        with self.lock:
+            self.trial_in_flight = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == "half_open" or self.failures >= FAILURE_THRESHOLD:
+                if self.state != "open":
+                    _record("opened")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+_requests = TokenBucket(REQUESTS_PER_MINUTE)
+_tokens = TokenBucket(TOKENS_PER_MINUTE)
+_breaker = CircuitBreaker()
+
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "retries": 0, "failures": 0, "rate_limited": 0, "rejected": 0, "opened": 0,
+          "throttled_ms": 0.0}
+
+
+def _record(field: str, amount: float = 1):
+    with _stats_lock:
+        _stats[field] += amount
+
+
+def get_resilience_stats() -> dict:
+    """Breaker state, remaining bucket capacity and retry / throttle counters."""
+    with _stats_lock:
+        s = dict(_stats)
+    with _breaker.lock:
+        state, failures = _breaker.state, _breaker.failures
+        retry_in = max(0.0, _breaker.opened_at + COOLDOWN - time.monotonic()) if state == "open" else 0.0
+    return {
+        **s,
+        "throttled_ms": round(s["throttled_ms"], 1),
+        "circuit": state,
+        "consecutive_failures": failures,
+        "retry_in": round(retry_in, 1),
+        "requests_available": int(_requests.available()),
+        "requests_per_minute": REQUESTS_PER_MINUTE,
+        "tokens_available": int(_tokens.available()),
+        "tokens_per_minute": TOKENS_PER_MINUTE,
+    }
+
+
+# ── Retry Policy ───────────────────────────────────────────────────────────────
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUSES
+    return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+
+def _rate_limited(error: Exception) -> bool:
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code == RATE_LIMITED
+
+
+def _record_failure(error: Exception):
+    """Count a retryable failure; only 5xx, timeouts and connection errors count towards opening the circuit."""
+    if _rate_limited(error):
+        _record("rate_limited")
+        _breaker.release()   # the upstream answered; a 429 is not a verdict on its health
+    else:
+        _record("failures")
+        _breaker.failure()
+
+
+def _backoff(attempt: int, error: Exception) -> float:
+    """Full-jitter exponential backoff, or the server's Retry-After if it gave one."""
+    if isinstance(error, httpx.HTTPStatusError):
+        retry_after = error.response.headers.get("retry-after")
+        try:
+            return min(BACKOFF_MAX, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def _reserve(tokens: int) -> float:
+    wait = max(_requests.reserve(1), _tokens.reserve(tokens))
+    if wait:
+        _record("throttled_ms", wait * 1000)
+    try:
+        _within_budget(wait)
+    except DeadlineExceeded:
+        _breaker.release()   # before_call() may have handed us the half-open trial slot
+        raise
+    return wait
+
+
+def _within_budget(wait: float):
+    """Raise DeadlineExceeded if waiting `wait` seconds would overrun the node's budget."""
+    left = remaining()
+    if left is not None and wait >= left:
+        raise DeadlineExceeded(f"{wait:.1f}s wait exceeds the {max(0.0, left):.1f}s left in the budget")
+
+
+def _out_of_time() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def _completion_tokens(response) -> int:
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("output_tokens") or 0
+
+
+def call(func, tokens: int = 0, on_start=None, slot=None):
+    """
+    Run func() (one API request) under the limiter, retry policy and breaker.
+
+    Args:
+        tokens: Estimated prompt tokens, reserved from the tokens-per-minute bucket
+        on_start: Called once capacity is granted, before the first attempt
+        slot: Context manager factory (e.g. fairshare.slot) entered around each
+            attempt only, never around backoff or rate-limit waits
+    """
+    _record("calls")
+    for attempt in range(MAX_RETRIES + 1):
+        _breaker.before_call()
+        time.sleep(_reserve(tokens))
+        try:
+            with slot(tokens) if slot else nullcontext():
+                if on_start and attempt == 0:
+                    on_start()
+                response = func()
+        except BaseException as e:
+            if isinstance(e, CircuitOpenError):   # turned away by the queue; not a verdict on the upstream
+                _breaker.release()
+                raise
+            if not isinstance(e, Exception):
+                _breaker.release()
+                raise
+            if isinstance(e, DeadlineExceeded) or _out_of_time():
+                _breaker.release()   # we gave up on the request; not a verdict on the upstream
+                if isinstance(e, DeadlineExceeded):
+                    raise
+                raise DeadlineExceeded("time budget ran out during the request") from e
+            if not is_retryable(e):
+                _breaker.success()   # the upstream answered; the request itself was bad
+                raise
+            _record_failure(e)
+            if attempt == MAX_RETRIES:
+                raise
+            _record("retries")
+            backoff = _backoff(attempt, e)
+            _within_budget(backoff)
+            time.sleep(backoff)
+            continue
+        _breaker.success()
+        _tokens.charge(_completion_tokens(response))
+        return response
+
+
+async def acall(coro_func, tokens: int = 0, on_start=None, slot=None):
+    """Async call(); waits with asyncio.sleep so the event loop keeps serving other requests."""
+    _record("calls")
+    for attempt in range(MAX_RETRIES + 1):
+        _breaker.before_call()
+        await asyncio.sleep(_reserve(tokens))
+        try:
+            async with slot(tokens) if slot else nullcontext():
+                if on_start and attempt == 0:
+                    on_start()
+                response = await coro_func()
+        except BaseException as e:
+            if isinstance(e, CircuitOpenError):
+                _breaker.release()
+                raise
+            if not isinstance(e, Exception):   # cancelled
+                _breaker.release()
+                raise
+            if isinstance(e, DeadlineExceeded) or _out_of_time():
+                _breaker.release()
+                if isinstance(e, DeadlineExceeded):
+                    raise
+                raise DeadlineExceeded("time budget ran out during the request") from e
+            if not is_retryable(e):
+                _breaker.success()
+                raise
+            _record_failure(e)
+            if attempt == MAX_RETRIES:
+                raise
+            _record("retries")
+            backoff = _backoff(attempt, e)
+            _within_budget(backoff)
+            await asyncio.sleep(backoff)
+            continue
+        _breaker.success()
+        _tokens.charge(_completion_tokens(response))
+        return response
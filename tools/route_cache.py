@@ -0,0 +1,195 @@
+"""
+Route Cache — remembers the LLM router's decisions by normalized message.
+Students send the same few messages over and over ("show my deadlines",
+"Quiz me!", the quick-action prompts), so a message the router has already
+classified skips the LLM call entirely.
+
+Messages are casefolded, stripped of punctuation and whitespace-collapsed,
+so "Quiz me!" and "quiz me" share an entry. Entries are kept in an in-process
+LRU shared by every session and persisted to SQLite, bounded at
+ROUTE_CACHE_MAX_ENTRIES (least recently used evicted first) and expire after
+ROUTE_CACHE_TTL seconds. Keys include a version of the router prompt and
+model, so changing either starts a fresh cache. Only decisions parsed cleanly
+from the router's reply are stored, never its "general" fallback.
+"""
+
+import sqlite3
+import os
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "route_cache.db")
+# Resolves to project_root/data/route_cache.db
+
+ENABLED = os.getenv("ROUTE_CACHE", "1") != "0"
+MAX_ENTRIES = int(os.getenv("ROUTE_CACHE_MAX_ENTRIES", "5000"))
+TTL = int(os.getenv("ROUTE_CACHE_TTL", str(7 * 86400)))   # seconds
+
+_lock = threading.Lock()
+_entries = OrderedDict()   # key -> (intents, created_at), least recently used first
+_loaded = False
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+
+_schema_ready = False  # tables are created on first connection, not at import
+
+
+def _connect():
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def init_route_cache_db():
+    global _schema_ready
+    conn = _connect()
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS route_cache (
+            key          TEXT PRIMARY KEY,
+            intents      TEXT NOT NULL,
+            hits         INTEGER DEFAULT 0,
+            created_at   REAL NOT NULL,
+            last_access  REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_route_cache_access ON route_cache(last_access);
+    """)
+    conn.commit()
+    conn.close()
+    _schema_ready = True
+
+
+def get_connection():
+    """Open a connection, creating the tables on first use."""
+    if not _schema_ready:
+        init_route_cache_db()
+    return _connect()
+
+
+# ── Keys ───────────────────────────────────────────────────────────────────────
+
+def normalize(message: str) -> str:
+    """Casefold, drop punctuation and collapse whitespace: "  Quiz me!! " -> "quiz me"."""
+    text = "".join(
+        " " if unicodedata.category(ch).startswith("P") else ch for ch in message.casefold()
+    )
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_key(message: str, version: str = "") -> str:
+    return f"{version}:{normalize(message)}"
+
+
+# ── Lookup / Store ─────────────────────────────────────────────────────────────
+
+def _load():
+    """Fill the in-memory LRU from disk once per process, most recently used last."""
+    global _loaded
+    conn = get_connection()
+    conn.execute("DELETE FROM route_cache WHERE created_at < ?", (time.time() - TTL,))
+    conn.commit()
+    rows = conn.execute(
+        "SELECT key, intents, created_at FROM route_cache ORDER BY last_access DESC LIMIT ?", (MAX_ENTRIES,)
+    ).fetchall()
+    conn.close()
+    with _lock:
+        if _loaded:
+            return
+        for row in reversed(rows):
+            _entries.setdefault(row["key"], (json.loads(row["intents"]), row["created_at"]))
+        _loaded = True
+
+
+def lookup(message: str, version: str = "") -> list[str] | None:
+    """The cached intents for this message, or None."""
+    if not ENABLED:
+        return None
+    if not _loaded:
+        _load()
+    key = make_key(message, version)
+    now = time.time()
+    with _lock:
+        entry = _entries.get(key)
+        expired = entry is not None and now - entry[1] > TTL
+        if entry is None or expired:
+            if expired:
+                del _entries[key]
+                _stats["expired"] += 1
+            _stats["misses"] += 1
+            entry = None
+        else:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+
+    if entry is None and not expired:
+        return None
+    conn = get_connection()
+    if expired:
+        conn.execute("DELETE FROM route_cache WHERE key = ?", (key,))
+        conn.commit()
+        conn.close()
+        return None
+    conn.execute("UPDATE route_cache SET hits = hits + 1, last_access = ? WHERE key = ?", (now, key))
+    conn.commit()
+    conn.close()
+    return list(entry[0])
+
+
+def store(message: str, intents: list[str], version: str = ""):
+    """Remember a routing decision, evicting the least recently used entries over the bound."""
+    if not ENABLED or not normalize(message):
+        return
+    if not _loaded:
+        _load()
+    key = make_key(message, version)
+    now = time.time()
+    with _lock:
+        _entries[key] = (list(intents), now)
+        _entries.move_to_end(key)
+        evicted = []
+        while len(_entries) > MAX_ENTRIES:
+            evicted.append(_entries.popitem(last=False)[0])
+        _stats["stores"] += 1
+        _stats["evictions"] += len(evicted)
+
+    conn = get_connection()
+    conn.execute(
+        "INSERT OR REPLACE INTO route_cache (key, intents, created_at, last_access) VALUES (?,?,?,?)",
+        (key, json.dumps(intents), now, now)
+    )
+    if evicted:
+        conn.executemany("DELETE FROM route_cache WHERE key = ?", [(k,) for k in evicted])
+    conn.commit()
+    conn.close()
+
+
+def clear_route_cache():
+    with _lock:
+        _entries.clear()
+    conn = get_connection()
+    conn.execute("DELETE FROM route_cache")
+    conn.commit()
+    conn.close()
+
+
+# ── Stats ──────────────────────────────────────────────────────────────────────
+
+def get_route_cache_stats() -> dict:
+    """Hits, misses, hit rate and size since the app started."""
+    with _lock:
+        stats = dict(_stats)
+        size = len(_entries)
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        **stats,
+        "enabled": ENABLED,
+        "hit_rate": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+        "entries": size,
+        "max_entries": MAX_ENTRIES,
+        "ttl_s": TTL,
+    }
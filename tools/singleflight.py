@@ -0,0 +1,120 @@
+"""
+Single-flight — coalesce identical in-flight calls into one upstream request.
+The first caller for a key runs the call; callers arriving while it is still
+running wait for it and receive the same result (or exception).
+Used by tools/llm.py with the prompt hash as key, so study-room members
+pressing "Generate Group Quiz" together share one Mistral request.
+"""
+
+import asyncio
+import threading
+import weakref
+
+_lock = threading.Lock()
+_inflight = {}                                 # key -> _Call (sync callers)
+_async_inflight = weakref.WeakKeyDictionary()  # loop -> {key: {"future", "waiters"}}
+_stats = {}  # agent -> {"leaders": int, "waiters": int, "max_waiters": int}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+def _record(agent: str, leaders: int = 0, waiters: int = 0, concurrent: int = 0):
+    with _lock:
+        s = _stats.setdefault(agent, {"leaders": 0, "waiters": 0, "max_waiters": 0})
+        s["leaders"] += leaders
+        s["waiters"] += waiters
+        s["max_waiters"] = max(s["max_waiters"], concurrent)
+
+
+def get_singleflight_stats() -> dict:
+    """Per-agent leader / coalesced-waiter counts and the share of calls that were coalesced."""
+    with _lock:
+        per_agent = {a: dict(s) for a, s in _stats.items()}
+        in_flight = len(_inflight) + sum(len(calls) for calls in _async_inflight.values())
+    leaders = sum(s["leaders"] for s in per_agent.values())
+    waiters = sum(s["waiters"] for s in per_agent.values())
+    return {
+        "agents": per_agent,
+        "leaders": leaders,
+        "waiters": waiters,
+        "coalesced_rate": round(waiters / (leaders + waiters), 3) if leaders + waiters else 0.0,
+        "in_flight": in_flight,
+    }
+
+
+def do(key: str, func, agent: str = "") -> tuple:
+    """
+    Run func() once per key among concurrent callers.
+
+    Returns:
+        (result, shared) — shared is True for callers that waited on another's call
+    """
+    with _lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = _Call()
+        else:
+            call.waiters += 1
+            waiters = call.waiters
+
+    if not leader:
+        _record(agent, waiters=1, concurrent=waiters)
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    _record(agent, leaders=1)
+    try:
+        call.result = func()
+        return call.result, False
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+        call.done.set()
+
+
+async def ado(key: str, coro_func, agent: str = "") -> tuple:
+    """Async do(): coalesces callers on the same event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        calls = _async_inflight.setdefault(loop, {})
+        call = calls.get(key)
+        leader = call is None
+        if leader:
+            call = calls[key] = {"future": loop.create_future(), "waiters": 0}
+        else:
+            call["waiters"] += 1
+            waiters = call["waiters"]
+    future = call["future"]
+
+    if not leader:
+        _record(agent, waiters=1, concurrent=waiters)
+        # shield: a cancelled waiter must not cancel the shared call
+        return await asyncio.shield(future), True
+
+    _record(agent, leaders=1)
+    try:
+        result = await coro_func()
+        future.set_result(result)
+        return result, False
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved in case nobody was waiting
+        raise
+    finally:
+        with _lock:
+            calls.pop(key, None)
@@ -0,0 +1,141 @@
+"""
+Speculative Execution — start the likely agent's preparation while the LLM
+router is still deciding. Preparation must be read-only (DB reads, web
+search, history summaries) so a wrong guess can simply be dropped.
+
+Enable with SPECULATIVE_EXECUTION=1.
+"""
+
+import os
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from tools.deadlines import remaining
+
+ENABLED = os.getenv("SPECULATIVE_EXECUTION", "0") == "1"
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculate")
+_lock = threading.Lock()
+_stats = {"started": 0, "hits": 0, "misses": 0, "timeouts": 0, "saved_ms": 0.0}
+
+
+def _record(field: str, amount: float = 1):
+    with _lock:
+        _stats[field] += amount
+
+
+def get_speculation_stats() -> dict:
+    """Started/hit/miss counters, hit rate and router latency hidden by speculation."""
+    with _lock:
+        s = dict(_stats)
+    decided = s["hits"] + s["misses"]
+    return {
+        **s,
+        "saved_ms": round(s["saved_ms"], 1),
+        "hit_rate": round(s["hits"] / decided, 3) if decided else 0.0,
+        "avg_saved_ms": round(s["saved_ms"] / s["hits"], 1) if s["hits"] else 0.0,
+    }
+
+
+class Speculation:
+    """Preparation for one predicted agent, running in the background."""
+
+    def __init__(self, intent: str, started: float, job):
+        self.intent = intent
+        self.started = started
+        self.finished = None
+        self.decided = None     # when the router's answer arrived
+        self._job = job         # concurrent.futures.Future or asyncio.Task
+
+    def _done(self, _):
+        self.finished = time.perf_counter()
+
+    def resolve(self, intents: list[str]) -> bool:
+        """Router has decided: keep the work if it predicted one of the intents, else cancel it."""
+        self.decided = time.perf_counter()
+        if self.intent in intents:
+            return True
+        self._job.cancel()
+        _record("misses")
+        return False
+
+    def _commit(self):
+        # Time the preparation overlapped with the router's LLM call
+        end = min(self.finished or time.perf_counter(), self.decided or time.perf_counter())
+        _record("hits")
+        _record("saved_ms", max(0.0, end - self.started) * 1000)
+
+    def _wait_time(self, budget: float | None) -> float | None:
+        """Seconds left of `budget` (counted from when the preparation started), capped by the node's deadline."""
+        left = remaining()
+        if budget is not None:
+            budget = max(0.0, budget - (time.perf_counter() - self.started))
+            left = budget if left is None else min(budget, left)
+        return None if left is None else max(0.0, left)
+
+    def take(self, budget: float = None, default=None):
+        """
+        Block for the prepared result (sync graph); None if the preparation failed.
+        If it isn't ready within `budget` seconds of starting, returns default.
+        """
+        try:
+            result = self._job.result(timeout=self._wait_time(budget))
+        except FutureTimeout:
+            self._job.cancel()
+            _record("timeouts")
+            return default
+        except Exception:
+            _record("misses")
+            return None
+        self._commit()
+        return result
+
+    async def atake(self, budget: float = None, default=None):
+        """Await the prepared result (async graph); see take()."""
+        try:
+            result = await asyncio.wait_for(self._job, self._wait_time(budget))
+        except asyncio.TimeoutError:
+            _record("timeouts")
+            return default
+        except Exception:
+            _record("misses")
+            return None
+        self._commit()
+        return result
+
+
+def start(intent: str, func, *args) -> Speculation:
+    """Run func(*args) on the speculation pool, keeping the caller's trace context."""
+    ctx = contextvars.copy_context()
+    spec = Speculation(intent, time.perf_counter(), None)
+    spec._job = _executor.submit(ctx.run, func, *args)
+    spec._job.add_done_callback(spec._done)
+    _record("started")
+    return spec
+
+
+def astart(intent: str, coro_func, *args) -> Speculation:
+    """Async start(): schedules coro_func(*args) as a task on the running loop."""
+    spec = Speculation(intent, time.perf_counter(), None)
+    spec._job = asyncio.get_running_loop().create_task(coro_func(*args))
+    spec._job.add_done_callback(spec._done)
+    _record("started")
+    return spec
+
+
+def take_for(state: dict, intent: str, budget: float = None, default=None):
+    """Prepared result for this agent from a committed speculation, else None (see Speculation.take)."""
+    spec = state.get("speculation")
+    if spec is None or spec.intent != intent or spec.decided is None:
+        return None
+    return spec.take(budget, default)
+
+
+async def atake_for(state: dict, intent: str, budget: float = None, default=None):
+    spec = state.get("speculation")
+    if spec is None or spec.intent != intent or spec.decided is None:
+        return None
+    return await spec.atake(budget, default)
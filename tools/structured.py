@@ -0,0 +1,334 @@
+"""
+Structured Output — turn an LLM's JSON reply into a validated dict.
+Replaces the per-agent `re.search(r'\\{.*\\}')` parsing, which broke on
+trailing commas, truncated replies and prose around the JSON, and then
+returned an empty graph or quiz that the student had to regenerate.
+
+  1. extract_json() decodes the first JSON object in the reply. If that
+     fails, a single scan repairs it locally: trailing commas are dropped,
+     mismatched closers fixed, and a truncated reply is cut back to its last
+     complete value and closed.
+  2. validate() checks the result against the agent's schema (a small
+     JSON-Schema subset). Malformed array items, e.g. the half-written last
+     question of a truncated quiz, are dropped instead of failing the reply.
+  3. Only if nothing usable is left does invoke_structured() make one
+     follow-up request, quoting the problems back to the model.
+
+Every reply is counted per agent as clean, repaired or failed, along with
+retries and calls that stayed unusable (get_structured_stats()).
+"""
+
+import json
+import threading
+from langchain_core.messages import AIMessage, HumanMessage
+
+from tools import llm_cache
+
+MAX_RETRIES = 1
+MAX_CANDIDATES = 20   # "{" positions tried before giving up on a reply
+
+_decoder = json.JSONDecoder()
+_lock = threading.Lock()
+_stats = {}  # agent -> {"clean", "repaired", "failed", "retried", "unrecovered"}
+
+
+# ── Schemas ────────────────────────────────────────────────────────────────────
+# Supported keywords: type, required, properties, items, enum, minItems
+
+SCHEMAS = {
+    "router": {
+        "type": "object",
+        "properties": {"intent": {"type": "string"}, "intents": {"type": "array", "items": {"type": "string"}}},
+    },
+    "deadline_action": {
+        "type": "object",
+        "required": ["action"],
+        "properties": {
+            "action": {"enum": ["add", "list", "complete", "delete", "upcoming", "plan", "chat"]},
+            "data": {"type": "object"},
+            "user_message": {"type": "string"},
+        },
+    },
+    "quiz": {
+        "type": "object",
+        "required": ["questions"],
+        "properties": {"questions": {"type": "array", "minItems": 1, "items": {
+            "type": "object", "required": ["id", "question", "answer"],
+            "properties": {"options": {"type": "array"}},
+        }}},
+    },
+    "flashcards": {
+        "type": "object",
+        "required": ["cards"],
+        "properties": {"cards": {"type": "array", "minItems": 1, "items": {
+            "type": "object", "required": ["id", "front", "back"],
+        }}},
+    },
+    "summary": {
+        "type": "object",
+        "required": ["content"],
+        "properties": {"content": {"type": "string"}},
+    },
+    "graph": {
+        "type": "object",
+        "required": ["nodes", "edges"],
+        "properties": {
+            "nodes": {"type": "array", "minItems": 1, "items": {"type": "object", "required": ["id", "label"]}},
+            "edges": {"type": "array", "items": {"type": "object", "required": ["source", "target"]}},
+        },
+    },
+    "group_quiz": {
+        "type": "object",
+        "required": ["questions"],
+        "properties": {"questions": {"type": "array", "minItems": 1, "items": {
+            "type": "object", "required": ["id", "question", "options", "answer"],
+            "properties": {"options": {"type": "array"}},
+        }}},
+    },
+}
+
+_TYPES = {
+    "object": dict, "array": list, "string": str, "boolean": bool,
+    "integer": int, "number": (int, float),
+}
+
+
+def _check(value, schema: dict, path: str, errors: list) -> int:
+    """Append schema violations to errors; returns how many invalid array items were dropped."""
+    expected = schema.get("type")
+    if expected and (not isinstance(value, _TYPES[expected]) or
+                     (expected in ("integer", "number") and isinstance(value, bool))):
+        errors.append(f"{path or 'value'} should be {expected}")
+        return 0
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path or 'value'} should be one of {schema['enum']}")
+        return 0
+
+    pruned = 0
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}.{key} is missing" if path else f"'{key}' is missing")
+        for key, sub in schema.get("properties", {}).items():
+            if key in value:
+                pruned += _check(value[key], sub, f"{path}.{key}" if path else key, errors)
+    elif isinstance(value, list):
+        if "items" in schema:
+            kept = []
+            for item in value:
+                item_errors = []
+                pruned += _check(item, schema["items"], f"{path}[]", item_errors)
+                if item_errors:
+                    pruned += 1
+                else:
+                    kept.append(item)
+            value[:] = kept
+        if len(value) < schema.get("minItems", 0):
+            errors.append(f"{path} needs at least {schema['minItems']} valid item(s)")
+    return pruned
+
+
+def validate(value, schema: dict) -> tuple[list[str], int]:
+    """(errors, dropped_items) — invalid array items are removed from value in place."""
+    errors = []
+    pruned = _check(value, schema, "", errors)
+    return errors, pruned
+
+
+# ── JSON Extraction and Repair ─────────────────────────────────────────────────
+
+def _strip_trailing_comma(out: list):
+    while out and out[-1] in " \t\r\n":
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def _close(out: list, stack: list) -> str:
+    out = list(out)
+    _strip_trailing_comma(out)
+    return "".join(out) + "".join(reversed(stack))
+
+
+def _loads(text: str):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+
+def _repair(text: str, start: int):
+    """
+    Scan one JSON value from text[start], fixing trailing commas and mismatched
+    closers. If the text ends first, close it — at the end, or else at the last
+    point where every value so far was complete. Returns the parsed value or None.
+    """
+    out, stack, cuts = [], [], []   # cuts: (len(out), stack) after each complete value
+    in_string = escape = False
+    for ch in text[start:]:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+            cuts.append((len(out), list(stack)))
+            continue
+        elif ch in "}]":
+            if not stack:
+                break
+            _strip_trailing_comma(out)
+            out.append(stack.pop())
+            if not stack:
+                return _loads("".join(out))
+            continue
+        elif ch == ",":
+            _strip_trailing_comma(out)
+            cuts.append((len(out), list(stack)))
+        out.append(ch)
+
+    # Truncated: close an open string, then the containers
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    value = _loads(_close(out, stack))
+    if value is not None:
+        return value
+    for length, open_stack in reversed(cuts):
+        value = _loads(_close(out[:length], open_stack))
+        if value is not None:
+            return value
+    return None
+
+
+def extract_json(raw: str) -> tuple[dict | None, bool]:
+    """
+    The first JSON object in an LLM reply (code fences and prose around it are ignored).
+
+    Returns:
+        (value, repaired) — value is None when no object could be recovered
+    """
+    start = raw.find("{")
+    for _ in range(MAX_CANDIDATES):
+        if start < 0:
+            break
+        try:
+            value, _ = _decoder.raw_decode(raw, start)
+            if isinstance(value, dict):
+                return value, False
+        except json.JSONDecodeError:
+            value = _repair(raw, start)
+            if isinstance(value, dict):
+                return value, True
+        start = raw.find("{", start + 1)
+    return None, False
+
+
+# ── Parsing ────────────────────────────────────────────────────────────────────
+
+def _record(agent: str, field: str):
+    with _lock:
+        s = _stats.setdefault(agent, {"clean": 0, "repaired": 0, "failed": 0, "retried": 0, "unrecovered": 0})
+        s[field] += 1
+
+
+def _parse(raw: str, schema: str, agent: str) -> tuple[dict | None, list[str]]:
+    """Parse one reply, counting it as clean, repaired or failed."""
+    value, repaired = extract_json(raw)
+    if value is None:
+        errors, pruned = ["no JSON object found"], 0
+    else:
+        errors, pruned = validate(value, SCHEMAS[schema])
+    if errors:
+        _record(agent, "failed")
+        return None, errors
+    _record(agent, "repaired" if repaired or pruned else "clean")
+    return value, []
+
+
+def parse(raw: str, schema: str, agent: str) -> dict | None:
+    """Extract, repair and validate a reply against SCHEMAS[schema]; None if it's unusable."""
+    value, _ = _parse(raw, schema, agent)
+    if value is None:
+        _record(agent, "unrecovered")
+    return value
+
+
+def _retry_messages(messages: list, raw: str, errors: list[str]) -> list:
+    problems = "; ".join(errors[:5])
+    return [
+        *messages,
+        AIMessage(content=raw),
+        HumanMessage(content=f"That reply could not be used ({problems}). "
+                             "Respond again with ONLY the complete, valid JSON object in the requested format."),
+    ]
+
+
+def _forget(llm, messages: list):
+    """Drop a cached reply that failed to parse so it isn't served again."""
+    llm_cache.forget(llm_cache.make_key(llm.model, llm.temperature, messages, llm.max_tokens))
+
+
+def invoke_structured(llm, messages: list, schema: str, **invoke_kwargs) -> tuple[dict | None, str]:
+    """
+    Call llm (an AgentLLM) and parse its reply against SCHEMAS[schema], repairing
+    locally first and asking the model again at most MAX_RETRIES times.
+
+    Returns:
+        (value or None, raw text of the last reply)
+    """
+    raw = llm.invoke(messages, **invoke_kwargs).content
+    value, errors = _parse(raw, schema, llm.agent)
+    for _ in range(MAX_RETRIES):
+        if value is not None:
+            return value, raw
+        _forget(llm, messages)
+        _record(llm.agent, "retried")
+        raw = llm.invoke(_retry_messages(messages, raw, errors), use_cache=False, stream_tokens=False).content
+        value, errors = _parse(raw, schema, llm.agent)
+    if value is None:
+        _record(llm.agent, "unrecovered")
+    return value, raw
+
+
+async def ainvoke_structured(llm, messages: list, schema: str, **invoke_kwargs) -> tuple[dict | None, str]:
+    """Async invoke_structured()."""
+    raw = (await llm.ainvoke(messages, **invoke_kwargs)).content
+    value, errors = _parse(raw, schema, llm.agent)
+    for _ in range(MAX_RETRIES):
+        if value is not None:
+            return value, raw
+        _forget(llm, messages)
+        _record(llm.agent, "retried")
+        retry = _retry_messages(messages, raw, errors)
+        raw = (await llm.ainvoke(retry, use_cache=False, stream_tokens=False)).content
+        value, errors = _parse(raw, schema, llm.agent)
+    if value is None:
+        _record(llm.agent, "unrecovered")
+    return value, raw
+
+
+# ── Stats ──────────────────────────────────────────────────────────────────────
+
+def get_structured_stats() -> dict:
+    """
+    Per-agent outcomes. failure_rate is the share of replies that couldn't be
+    parsed even after repair; unrecovered counts calls that stayed unusable
+    after the retry.
+    """
+    with _lock:
+        per_agent = {a: dict(s) for a, s in _stats.items()}
+    for s in per_agent.values():
+        replies = s["clean"] + s["repaired"] + s["failed"]
+        s["failure_rate"] = round(s["failed"] / replies, 3) if replies else 0.0
+        s["repair_rate"] = round(s["repaired"] / replies, 3) if replies else 0.0
+    return per_agent
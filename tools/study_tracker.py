@@ -12,7 +12,10 @@ DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "analytics.db")
 # Resolves to project_root/data/analytics.db
 
 
-def get_connection():
+_schema_ready = False  # tables are created on first connection, not at import
+
+
+def _connect():
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
@@ -20,7 +23,8 @@ def get_connection():
 
 
 def init_analytics_db():
-    conn = get_connection()
+    global _schema_ready
+    conn = _connect()
     conn.executescript("""
         CREATE TABLE IF NOT EXISTS study_sessions (
             id           INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -51,6 +55,14 @@ def init_analytics_db():
     """)
     conn.commit()
     conn.close()
+    _schema_ready = True
+
+
+def get_connection():
+    """Open a connection, creating the tables on first use."""
+    if not _schema_ready:
+        init_analytics_db()
+    return _connect()
 
 
 # ── Log Functions ──────────────────────────────────────────────────────────────
@@ -274,6 +286,3 @@ def seed_demo_data():
         )
         conn.commit()
         conn.close()
-
-
-init_analytics_db()
@@ -0,0 +1,335 @@
+"""
+Tracing — per-node and per-LLM-call spans in a local SQLite table.
+Spans carry wall time, queue time, prompt/response size and cache status.
+They are handed to a background writer thread, so recording one never
+blocks a request on disk I/O. If the writer falls MAX_QUEUED spans behind,
+new spans are dropped rather than piling up in memory.
+
+Spans older than TRACING_RETENTION_DAYS (default 90, the Dashboard's longest
+range) are pruned, and the table keeps at most TRACING_MAX_SPANS rows.
+
+Disable with TRACING_ENABLED=0.
+"""
+
+import sqlite3
+import os
+import asyncio
+import contextvars
+import functools
+import math
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "traces.db")
+# Resolves to project_root/data/traces.db
+
+ENABLED = os.getenv("TRACING_ENABLED", "1") != "0"
+BATCH_SIZE = 100
+MAX_QUEUED = 10000
+RETENTION_DAYS = float(os.getenv("TRACING_RETENTION_DAYS", "90"))
+MAX_SPANS = int(os.getenv("TRACING_MAX_SPANS", "200000"))
+PRUNE_EVERY = 300   # seconds between retention passes
+
+# {"id": str, "ready_at": float} for the request being traced. LangGraph copies
+# the context into each task, but the dict itself is shared, so a node finishing
+# in one task is visible to the nodes scheduled after it.
+_current = contextvars.ContextVar("trace", default=None)
+# Span of the graph node currently running, so wrappers can flag it (e.g. a timeout)
+_node_span = contextvars.ContextVar("node_span", default=None)
+
+_queue = queue.Queue(maxsize=MAX_QUEUED)
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_connection():
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def init_tracing_db():
+    conn = get_connection()
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS spans (
+            id              INTEGER PRIMARY KEY AUTOINCREMENT,
+            trace_id        TEXT NOT NULL,
+            name            TEXT NOT NULL,
+            kind            TEXT NOT NULL,          -- node | llm | tool
+            started_at      REAL NOT NULL,
+            wall_ms         REAL NOT NULL,
+            queue_ms        REAL DEFAULT 0,
+            prompt_chars    INTEGER,
+            prompt_tokens   INTEGER,
+            response_chars  INTEGER,
+            cache           TEXT,                   -- hit | miss | bypass
+            error           TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_spans_started ON spans(started_at);
+    """)
+    conn.commit()
+    conn.close()
+
+
+# ── Writer ─────────────────────────────────────────────────────────────────────
+
+def _write(conn, batch: list[dict]):
+    conn.executemany(
+        """INSERT INTO spans (trace_id, name, kind, started_at, wall_ms, queue_ms,
+           prompt_chars, prompt_tokens, response_chars, cache, error)
+           VALUES (:trace_id, :name, :kind, :started_at, :wall_ms, :queue_ms,
+           :prompt_chars, :prompt_tokens, :response_chars, :cache, :error)""",
+        batch
+    )
+    conn.commit()
+
+
+def _prune(conn):
+    conn.execute("DELETE FROM spans WHERE started_at < ?", (time.time() - RETENTION_DAYS * 86400,))
+    conn.execute("DELETE FROM spans WHERE id <= (SELECT MAX(id) FROM spans) - ?", (MAX_SPANS,))
+    conn.commit()
+
+
+def _write_loop():
+    conn = get_connection()
+    pruned_at = 0.0
+    while True:
+        batch = [_queue.get()]
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _write(conn, batch)
+            if time.monotonic() - pruned_at >= PRUNE_EVERY:
+                pruned_at = time.monotonic()
+                _prune(conn)
+        except sqlite3.Error:
+            # e.g. "database is locked": lose this batch, never the writer
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+def _ensure_writer():
+    global _writer
+    if _writer is not None:
+        return
+    with _writer_lock:
+        if _writer is None:
+            init_tracing_db()
+            _writer = threading.Thread(target=_write_loop, name="span-writer", daemon=True)
+            _writer.start()
+
+
+def flush():
+    """Block until every queued span is on disk."""
+    if _writer is not None:
+        _queue.join()
+
+
+# ── Spans ──────────────────────────────────────────────────────────────────────
+
+class Span:
+    """One timed operation. Fill in sizes / cache status before it closes."""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.created = time.perf_counter()
+        self.started = None
+        current = _current.get()
+        self.ready_at = current["ready_at"] if current else None
+        self.prompt_chars = None
+        self.prompt_tokens = None
+        self.response_chars = None
+        self.cache = None
+        self.error = None
+
+    def mark_started(self):
+        """Call when the real work begins; time before this counts as queue time.
+        Only the first call counts (a hedged request starts twice)."""
+        if self.started is None:
+            self.started = time.perf_counter()
+
+    def record(self) -> dict:
+        now = time.perf_counter()
+        started = self.started or self.created
+        waited_from = self.ready_at if self.kind == "node" and self.ready_at is not None else self.created
+        return {
+            "trace_id": (_current.get() or {}).get("id") or uuid.uuid4().hex,
+            "name": self.name,
+            "kind": self.kind,
+            "started_at": time.time() - (now - self.created),
+            "wall_ms": round((now - self.created) * 1000, 3),
+            "queue_ms": round(max(0.0, started - waited_from) * 1000, 3),
+            "prompt_chars": self.prompt_chars,
+            "prompt_tokens": self.prompt_tokens,
+            "response_chars": self.response_chars,
+            "cache": self.cache,
+            "error": self.error,
+        }
+
+
+@contextmanager
+def span(name: str, kind: str = "tool"):
+    """Time a block: `with span("scrape_url") as s: ...`."""
+    s = Span(name, kind)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = type(e).__name__
+        raise
+    finally:
+        if ENABLED:
+            _enqueue(s)
+
+
+def _enqueue(s: Span):
+    _ensure_writer()
+    try:
+        _queue.put_nowait(s.record())
+    except queue.Full:
+        pass   # the writer is behind; a missing span beats unbounded memory
+
+
+@contextmanager
+def trace():
+    """Group all spans of one request under a fresh trace id."""
+    token = _current.set({"id": uuid.uuid4().hex, "ready_at": time.perf_counter()})
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def traced(name: str, kind: str = "tool"):
+    """Decorator form of span() for plain and async functions."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, kind):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def mark_node_error(error: str):
+    """Flag the running node's span, e.g. when it returned a degraded fallback."""
+    s = _node_span.get()
+    if s is not None:
+        s.error = error
+
+
+def mark_node_cache(status: str):
+    """Record the running node's own cache outcome (hit | miss), e.g. the router's decision cache."""
+    s = _node_span.get()
+    if s is not None:
+        s.cache = status
+
+
+def traced_node(name: str, func):
+    """
+    Wrap a LangGraph node. Queue time is measured from when the previous
+    node finished; this node's end becomes the ready time for the next.
+    """
+    def _finished():
+        current = _current.get()
+        if current:
+            current["ready_at"] = time.perf_counter()
+
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_node(state):
+            with span(name, "node") as s:
+                s.mark_started()
+                token = _node_span.set(s)
+                try:
+                    return await func(state)
+                finally:
+                    _node_span.reset(token)
+                    _finished()
+        return async_node
+
+    @functools.wraps(func)
+    def node(state):
+        with span(name, "node") as s:
+            s.mark_started()
+            token = _node_span.set(s)
+            try:
+                return func(state)
+            finally:
+                _node_span.reset(token)
+                _finished()
+    return node
+
+
+# ── Reporting ──────────────────────────────────────────────────────────────────
+
+def _percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def get_latency_stats(days: int = 7) -> list[dict]:
+    """p50/p95/p99 wall time per (kind, name) over the last N days, slowest p95 first."""
+    init_tracing_db()
+    since = time.time() - days * 86400
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT name, kind, wall_ms, queue_ms, prompt_tokens, response_chars, cache, error "
+        "FROM spans WHERE started_at >= ?", (since,)
+    ).fetchall()
+    conn.close()
+
+    groups = {}
+    for r in rows:
+        groups.setdefault((r["kind"], r["name"]), []).append(r)
+
+    stats = []
+    for (kind, name), spans in groups.items():
+        wall = [s["wall_ms"] for s in spans]
+        tokens = [s["prompt_tokens"] for s in spans if s["prompt_tokens"] is not None]
+        cached = [s["cache"] for s in spans if s["cache"]]
+        stats.append({
+            "name": name,
+            "kind": kind,
+            "count": len(spans),
+            "p50_ms": round(_percentile(wall, 50), 1),
+            "p95_ms": round(_percentile(wall, 95), 1),
+            "p99_ms": round(_percentile(wall, 99), 1),
+            "avg_queue_ms": round(sum(s["queue_ms"] or 0 for s in spans) / len(spans), 1),
+            "avg_prompt_tokens": round(sum(tokens) / len(tokens)) if tokens else None,
+            "cache_hit_rate": round(cached.count("hit") / len(cached), 3) if cached else None,
+            "errors": sum(1 for s in spans if s["error"]),
+            "timeouts": sum(1 for s in spans if s["error"] == "DeadlineExceeded"),
+        })
+    return sorted(stats, key=lambda s: -s["p95_ms"])
+
+
+def clear_spans():
+    init_tracing_db()
+    conn = get_connection()
+    conn.execute("DELETE FROM spans")
+    conn.commit()
+    conn.close()
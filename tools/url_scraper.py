@@ -2,39 +2,65 @@
 URL Scraper Tool — fetches and extracts readable text from a web page.
 """
 
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import httpx
 
+from tools.tracing import traced
 
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    )
+}
+
+
+def extract_text(html: str) -> str:
+    """Extract clean readable text from an HTML document."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Remove script and style tags
+    for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
+        tag.decompose()
+
+    # Extract main content
+    main = soup.find("main") or soup.find("article") or soup.find("body")
+    text = main.get_text(separator="\n", strip=True) if main else soup.get_text(separator="\n", strip=True)
+
+    # Clean up excessive blank lines
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return "\n".join(lines)
+
+
+@traced("scrape_url")
 def scrape_url(url: str, timeout: int = 10) -> str:
     """
     Fetch a URL and extract clean readable text.
     Returns extracted text or an error message.
     """
+    import requests
+
     try:
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0.0.0 Safari/537.36"
-            )
-        }
-        response = requests.get(url, headers=headers, timeout=timeout)
+        response = requests.get(url, headers=HEADERS, timeout=timeout)
         response.raise_for_status()
+        return extract_text(response.text)
 
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # Remove script and style tags
-        for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
-            tag.decompose()
+    except (requests.exceptions.RequestException, ValueError) as e:   # ValueError: URLs urllib3 can't parse
+        return f"Error fetching URL: {str(e)}"
 
-        # Extract main content
-        main = soup.find("main") or soup.find("article") or soup.find("body")
-        text = main.get_text(separator="\n", strip=True) if main else soup.get_text(separator="\n", strip=True)
 
-        # Clean up excessive blank lines
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
-        return "\n".join(lines)
+@traced("scrape_url")
+async def ascrape_url(url: str, timeout: int = 10) -> str:
+    """Async scrape_url(): non-blocking fetch, HTML parsing offloaded to a worker thread."""
+    try:
+        async with httpx.AsyncClient(headers=HEADERS, timeout=timeout, follow_redirects=True) as client:
+            response = await client.get(url)
+            response.raise_for_status()
+        return await asyncio.to_thread(extract_text, response.text)
 
-    except requests.exceptions.RequestException as e:
+    except (httpx.HTTPError, httpx.InvalidURL, ValueError) as e:   # InvalidURL isn't an HTTPError
         return f"Error fetching URL: {str(e)}"
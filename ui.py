@@ -1,5 +1,9 @@
 import streamlit as st
 import os
+import hashlib
+import threading
+import uuid
+from contextlib import contextmanager
 
 def render_sidebar(subtitle=""):
     """
@@ -56,3 +60,52 @@ def render_sidebar(subtitle=""):
             st.success("✅ Mistral API Key loaded")
             
         st.markdown("---")
+
+
+def client_id():
+    """
+    A stable ID for this browser, shared by every page. Fair queuing and
+    background jobs are keyed on it: chat session IDs differ per page and
+    change on "Clear Chat", so one student would count as several users.
+
+    Derived from Streamlit's XSRF cookie, which lives as long as the browser
+    keeps it; without one, an ID kept in the URL survives refreshes.
+    """
+    if "client_id" not in st.session_state:
+        cookie = st.context.cookies.get("_streamlit_xsrf")
+        if isinstance(cookie, str) and cookie:
+            cid = hashlib.sha256(cookie.encode()).hexdigest()[:16]
+        else:
+            cid = st.query_params.get("cid") or uuid.uuid4().hex[:16]
+            st.query_params["cid"] = cid
+        st.session_state.client_id = cid
+    return st.session_state.client_id
+
+
+@contextmanager
+def llm_spinner(text, room=""):
+    """
+    st.spinner for work that calls the LLM. Requests made inside are queued
+    fairly under this browser's client_id() (and study room) — see
+    tools/fairshare.py — and while one waits for a slot the spinner shows its
+    place in line.
+    """
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    from tools.fairshare import tenant, on_wait
+    ctx = get_script_run_ctx()
+
+    with tenant(client_id(), room):
+        with st.spinner(text):
+            status = st.empty()
+
+            def show_position(position):
+                # Queued requests may wait on a graph worker thread; let it write to this page
+                add_script_run_ctx(threading.current_thread(), ctx)
+                if position:
+                    status.caption(f"⏳ The AI is busy — you're #{position} in line")
+                else:
+                    status.empty()
+
+            with on_wait(show_position):
+                yield
+            status.empty()